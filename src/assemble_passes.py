@@ -1,6 +1,7 @@
 # assemble_passes.py
 
 import re
+from itertools import accumulate
 
 # 条件码助记符与数字的映射
 cond_map = {
@@ -22,18 +23,28 @@ cond_map = {
     "NV": 15   # Never jump (有的资料写 (无名))
 }
 
-def first_pass(lines):
+# BCOND 位移字段为 8 位有符号数
+BCOND_MIN, BCOND_MAX = -128, 127
+
+class BranchRangeError(ValueError):
+    """BCOND 的标签超出 8 位位移范围（需要分支松弛）"""
+
+
+def first_pass(lines, line_map=None, report=None):
     """
     第一遍扫描：收集标签和指令行对应的地址。
     返回:
       symbol_table: { label(str, upper): address(int) }
       processed_lines: [(addr, original_line_str), ...]
+    若给出列表 line_map，则按地址顺序追加每条指令所在的源文件行号（从1开始），
+    即 line_map[addr] = lineno。
+    标签重复定义时以最后一次为准；若给出列表 report，则在其中追加一条警告（不打印）。
     """
     symbol_table = {}
     processed_lines = []
     current_addr = 0  # 当前指令地址，从0开始
 
-    for line in lines:
+    for lineno, line in enumerate(lines, 1):
         # 去掉注释
         raw = line.split(";")[0].strip()
         if not raw:
@@ -46,18 +57,22 @@ def first_pass(lines):
             instr_part = parts[1].strip()  # 冒号后面的指令
 
             label_upper = label.upper()
-            if label_upper in symbol_table:
-                # 重复定义错误
-                print(f"[WARN] Label {label} redefined!")
+            if label_upper in symbol_table and report is not None:
+                # 重复定义
+                report.append(f"line {lineno}: warning: label {label} redefined")
             symbol_table[label_upper] = current_addr
 
             if instr_part:
                 processed_lines.append((current_addr, instr_part))
                 current_addr += 1
+                if line_map is not None:
+                    line_map.append(lineno)
         else:
             # 普通指令
             processed_lines.append((current_addr, raw))
             current_addr += 1
+            if line_map is not None:
+                line_map.append(lineno)
 
     return symbol_table, processed_lines
 
@@ -89,7 +104,19 @@ def parse_immediate(token):
             return int(token, 10)
     except ValueError:
         raise ValueError(f"Invalid immediate value: {token}")
-    
+
+def parse_raw_word(tokens):
+    """
+    .word 伪指令：原样写入一个 16 位字（反汇编器用它表示无法还原为指令文本的机器码）。
+    tokens 为切分后的整行，返回机器码。
+    """
+    if len(tokens) != 2:
+        raise ValueError(f".word takes 1 operand, got {len(tokens)-1}")
+    value = parse_immediate(tokens[1])
+    if not 0 <= value <= 0xFFFF:
+        raise ValueError(f".word value out of range: {value}")
+    return value
+
 def assemble_line_label_aware(line, current_addr, symbol_table):
     """
     类似 assemble_line，但在遇到标签时根据指令类型计算地址/偏移量。
@@ -104,6 +131,8 @@ def assemble_line_label_aware(line, current_addr, symbol_table):
 
     tokens = re.split(r'[,\s]+', line)
     mnemonic = tokens[0].upper()
+    if mnemonic == ".WORD":
+        return [parse_raw_word(tokens)]
     if mnemonic not in instruction_set:
         raise ValueError(f"Unknown instruction: {mnemonic}")
     instr = instruction_set[mnemonic]
@@ -163,9 +192,15 @@ def assemble_line_label_aware(line, current_addr, symbol_table):
             label_addr = symbol_table[disp_token.upper()]
             # 计算相对偏移：offset = label_addr - (current_addr + 1)
             offset = label_addr - (current_addr + 1)
+            if not BCOND_MIN <= offset <= BCOND_MAX:
+                raise BranchRangeError(f"BCOND target {disp_token} is out of range ({offset})")
             operands["disp"] = offset & 0xFF
         else:
-            operands["disp"] = parse_immediate(tokens[2]) & 0xFF
+            # 数值位移可以写成有符号数或 8 位字段的原始值
+            disp = parse_immediate(tokens[2])
+            if not BCOND_MIN <= disp <= 0xFF:
+                raise ValueError(f"BCOND displacement out of range: {disp}")
+            operands["disp"] = disp & 0xFF
 
 
     elif instr.fmt == "Jcond":
@@ -259,4 +294,476 @@ def build_machine_code(instr, operands):
         raise ValueError(f"Unsupported instruction format: {instr.fmt}")
 
     machine_codes.append(machine_code)
-    return machine_codes
\ No newline at end of file
+    return machine_codes
+
+# --------------------- 单遍汇编 ---------------------
+
+# 预编译的操作数分隔符（与 assemble_line_label_aware 中的 re.split 相同）
+_split_tokens = re.compile(r'[,\s]+').split
+
+def _base_word(instr):
+    """指令中与操作数无关的部分（opcode / ext / 固定值）"""
+    if instr.fmt == "FIX":
+        return instr.fields["value"] & 0xFFFF
+    if instr.fmt == "FIXV":
+        return instr.fields["fixed"] & 0xFFF0
+    word = (instr.opcode & 0xF) << 12
+    if instr.fmt in ("RR", "Jcond", "RS"):
+        word |= (instr.ext & 0xF) << 4
+    return word
+
+# 助记符 -> (格式, 基本机器码)
+_encodings = {mnemonic: (instr.fmt, _base_word(instr))
+              for mnemonic, instr in instruction_set.items()}
+
+# 常见的寄存器写法直接查表，其他写法交给 parse_register（结果相同）
+_registers = {f"{r}{i}": i for i in range(16) for r in ("R", "r")}
+
+def _reg(token):
+    reg = _registers.get(token)
+    return parse_register(token) if reg is None else reg
+
+def _parse_cond(token):
+    cond = token.upper()
+    return cond_map[cond] if cond in cond_map else parse_immediate(token)
+
+def single_pass(lines, line_map=None, report=None):
+    """
+    单遍汇编：每行只切分一次，立即生成机器码。
+    BCOND 的位移操作数若在当时还不是已定义的标签（向前引用，或数值位移），记为待修补项，
+    全部读完后按最终符号表修补；已解析的向后引用若其标签之后被重新定义，也按最终地址重新修补。
+    因此结果与 first_pass + assemble_line_label_aware 完全一致（重复定义的标签以最后一次为准）。
+    标签超出 BCOND 位移范围时抛出 BranchRangeError（单遍汇编不做分支松弛，
+    assemble() 此时改用两遍汇编）。
+    返回:
+      symbol_table: { label(str, upper): address(int) }
+      words: [machine_code, ...]（每条指令一个字）
+    line_map、report 的含义与 first_pass 相同。
+    """
+    symbol_table = {}
+    words = []
+    fixups = []      # (地址, 位移操作数, 行号)
+    backrefs = []    # (地址, 标签)
+    redefined = set()
+    encodings = _encodings
+
+    for lineno, line in enumerate(lines, 1):
+        raw = line.split(";", 1)[0]
+        if ":" in raw:
+            label, raw = raw.split(":", 1)
+            label = label.strip()
+            label_upper = label.upper()
+            if label_upper in symbol_table:
+                if report is not None:
+                    report.append(f"line {lineno}: warning: label {label} redefined")
+                redefined.add(label_upper)
+            symbol_table[label_upper] = len(words)
+        raw = raw.strip()
+        if not raw:
+            continue
+
+        addr = len(words)
+        tokens = _split_tokens(raw)
+        mnemonic = tokens[0].upper()
+        try:
+            fmt, word = encodings[mnemonic]
+        except KeyError:
+            if mnemonic != ".WORD":
+                raise ValueError(f"Line {lineno}: Unknown instruction: {mnemonic}") from None
+            fmt, word = "WORD", 0
+        try:
+            if fmt == "WORD":
+                word = parse_raw_word(tokens)
+            elif fmt in ("FIX", "FIXV"):
+                if len(tokens) != 1:
+                    raise ValueError(f"Instruction {mnemonic} takes no operands")
+            elif len(tokens) != 3:
+                raise ValueError(f"Instruction {mnemonic} requires 2 operands, "
+                                 f"got {len(tokens)-1}")
+            elif fmt == "RR" or fmt == "RS":
+                word |= ((_reg(tokens[1]) & 0xF) << 8
+                         | _reg(tokens[2]) & 0xF)
+            elif fmt == "RI" or fmt == "IR":
+                word |= (_reg(tokens[1]) & 0xF) << 8 | parse_immediate(tokens[2]) & 0xFF
+            elif fmt == "Bcond":
+                word |= (_parse_cond(tokens[1]) & 0xF) << 8
+                target = tokens[2].upper()
+                if target in symbol_table:
+                    disp = symbol_table[target] - (addr + 1)
+                    if disp < BCOND_MIN:
+                        raise BranchRangeError(f"BCOND target {tokens[2]} is out of range ({disp})")
+                    word |= disp & 0xFF
+                    backrefs.append((addr, target))
+                else:
+                    fixups.append((addr, tokens[2], lineno))
+            elif fmt == "Jcond":
+                word |= (_parse_cond(tokens[1]) & 0xF) << 8 | _reg(tokens[2]) & 0xF
+            elif fmt == "RI4":
+                imm = parse_immediate(tokens[2])
+                s = 1 if imm < 0 else 0
+                imm = abs(imm)
+                if not (0 <= imm < 16):
+                    raise ValueError(f"Immediate value out of range for {mnemonic}: {imm}")
+                word |= (_reg(tokens[1]) & 0xF) << 8 | s << 4 | imm
+            else:
+                raise ValueError(f"Unsupported instruction format: {fmt}")
+        except ValueError as e:
+            raise type(e)(f"Line {lineno}: {e}") from None
+        words.append(word)
+        if line_map is not None:
+            line_map.append(lineno)
+
+    # 修补：向前引用 / 数值位移，以及标签被重新定义过的向后引用
+    for addr, token, lineno in fixups:
+        target = token.upper()
+        if target in symbol_table:
+            disp = symbol_table[target] - (addr + 1)
+            if not BCOND_MIN <= disp <= BCOND_MAX:
+                raise BranchRangeError(f"Line {lineno}: BCOND target {token} is out of range ({disp})")
+        else:
+            try:
+                disp = parse_immediate(token)
+            except ValueError as e:
+                raise ValueError(f"Line {lineno}: {e}") from None
+            if not BCOND_MIN <= disp <= 0xFF:
+                raise ValueError(f"Line {lineno}: BCOND displacement out of range: {disp}")
+        words[addr] |= disp & 0xFF
+    if redefined:
+        for addr, target in backrefs:
+            if target in redefined:
+                disp = symbol_table[target] - (addr + 1)
+                if not BCOND_MIN <= disp <= BCOND_MAX:
+                    raise BranchRangeError(f"BCOND target {target} at address {addr} "
+                                           f"is out of range ({disp})")
+                words[addr] = (words[addr] & 0xFF00) | disp & 0xFF
+    return symbol_table, words
+
+
+# --------------------- 窥孔优化 ---------------------
+
+# 各指令写入的标志位（与 simulator 中的处理函数一致）；BCOND/JCOND 读标志位，
+# 不在表中的指令（仿真器不支持或语义不明）一律视为会读标志位
+_flag_writes = {
+    "ADD": "FNZ", "SUB": "FNZ", "CMP": "FNZ", "ADDI": "FNZ", "SUBI": "FNZ", "CMPI": "FNZ",
+    "AND": "NZ", "OR": "NZ", "XOR": "NZ", "MOV": "NZ", "ANDI": "NZ", "ORI": "NZ",
+    "XORI": "NZ", "MOVI": "NZ", "LSH": "NZ", "LUI": "NZ", "LOAD": "NZ",
+    "STOR": "", "WAIT": "",
+}
+
+def _flags_written(tokens):
+    mnemonic = tokens[0].upper()
+    if mnemonic == "LSHI":
+        # 负的移位量不写任何东西
+        try:
+            return "NZ" if parse_immediate(tokens[2]) >= 0 else ""
+        except (ValueError, IndexError):
+            return None
+    return _flag_writes.get(mnemonic)
+
+def _operands(tokens, kinds):
+    """按 kinds（"r" 寄存器 / "i" 立即数）解析操作数，取编码后的值；无法解析时返回 None"""
+    if len(tokens) != len(kinds) + 1:
+        return None
+    try:
+        return [parse_register(t) & 0xF if k == "r" else parse_immediate(t) & 0xFF
+                for t, k in zip(tokens[1:], kinds)]
+    except ValueError:
+        return None
+
+def peephole(symbol_table, processed_lines, line_map=None):
+    """
+    窥孔优化，在 first_pass 之后、编码之前运行。返回
+    (symbol_table, processed_lines, line_map, report)，地址重新连续编号，标签指向原来
+    所指指令（被删除时为其后第一条保留的指令）的新地址；report 为文字说明的列表。
+
+    变换（只在执行结果完全相同时进行）：
+      - MOV Ra, Ra              其写入的 N/Z 在被读取之前会被覆盖时删除
+      - MOV Ra, Rb 之后紧跟 MOV Rb, Ra 或 MOV Ra, Rb   删除后一条（值和标志位都不变）
+      - MOVI Rx, a + ADDI Rx, b  (a + b <= 255)       合并为 MOVI Rx, a+b，要求 F 之后不被读取
+      - LUI Rx, 0 + ORI Rx, b                         合并为 MOVI Rx, b
+      - 跳到下一条指令的 BCOND                        删除
+    被合并/删除的第二条指令不能是标签（跳转目标）。
+    程序中有 JCOND/JAL（目标地址来自寄存器）或数值位移的 BCOND 时，删除指令会改变
+    这些跳转的目标，整个优化被跳过，report 中说明原因；有 .word（原样写入的字，
+    可能是跳转）时同样跳过。
+    """
+    count = len(processed_lines)
+    texts = [line for _, line in processed_lines]
+    tokens = [_split_tokens(line.split(";")[0].strip()) for line in texts]
+    lines = list(line_map) if line_map is not None else None
+
+    def where(i):
+        return f"line {lines[i]}" if lines is not None else f"PC {i}"
+
+    for i, toks in enumerate(tokens):
+        mnemonic = toks[0].upper()
+        if mnemonic in ("JCOND", "JAL"):
+            return symbol_table, processed_lines, line_map, [
+                f"skipped: {where(i)} uses {mnemonic}; register jump targets cannot be relocated"]
+        if mnemonic == ".WORD":
+            return symbol_table, processed_lines, line_map, [
+                f"skipped: {where(i)} has a .word; raw words cannot be relocated"]
+        if mnemonic == "BCOND" and (len(toks) != 3 or toks[2].upper() not in symbol_table):
+            return symbol_table, processed_lines, line_map, [
+                f"skipped: {where(i)} has a BCOND without a label target"]
+
+    # 双向链表 + 每条指令上的标签；count 表示程序末尾
+    nxt = list(range(1, count + 1))
+    prv = list(range(-1, count - 1))
+    alive = [True] * count
+    labels_at = {}
+    for label, addr in symbol_table.items():
+        labels_at.setdefault(addr, []).append(label)
+    report = []
+
+    def next_live(i):
+        return nxt[i] if i < count else count
+
+    def delete(i):
+        alive[i] = False
+        n, p = nxt[i], prv[i]
+        if p >= 0:
+            nxt[p] = n
+        if n < count:
+            prv[n] = p
+        moved = labels_at.pop(i, None)
+        if moved:
+            labels_at.setdefault(n, []).extend(moved)
+
+    label_index = None
+
+    def label_target(i):
+        """BCOND 的标签当前指向的指令下标"""
+        nonlocal label_index
+        if label_index is None:
+            label_index = {label: k for k, labels in labels_at.items() for label in labels}
+        return label_index[tokens[i][2].upper()]
+
+    def flags_dead(i, flags):
+        """i 之后顺序执行的指令在读取 flags 之前把它们全部重写"""
+        needed = set(flags)
+        k = next_live(i)
+        while k < count:
+            written = _flags_written(tokens[k])
+            if written is None or tokens[k][0].upper() in ("BCOND", "JCOND"):
+                return False
+            needed -= set(written)
+            if not needed:
+                return True
+            k = nxt[k]
+        return False    # 程序结束时的标志位仍然可见
+
+    def rewrite(i, text):
+        texts[i] = text
+        tokens[i] = _split_tokens(text)
+
+    i = 0 if count else count
+    while i < count:
+        toks = tokens[i]
+        mnemonic = toks[0].upper()
+        j = nxt[i]
+        j_ok = j < count and j not in labels_at
+        j_mnemonic = tokens[j][0].upper() if j < count else None
+        changed = None
+
+        if mnemonic == "BCOND" and label_target(i) == j:
+            changed = f"removed {texts[i]} (branch to the next instruction)"
+            delete(i)
+        elif mnemonic == "MOV" and _operands(toks, "rr") is not None:
+            ops = _operands(toks, "rr")
+            if ops[0] == ops[1] and flags_dead(i, "NZ"):
+                changed = f"removed {texts[i]} (self-move, flags unused)"
+                delete(i)
+            elif j_ok and j_mnemonic == "MOV" and _operands(tokens[j], "rr") in (ops, ops[::-1]):
+                changed = f"removed {texts[j]} (redundant after {texts[i]})"
+                delete(j)
+        elif mnemonic == "MOVI" and j_ok and j_mnemonic == "ADDI":
+            ops, add = _operands(toks, "ri"), _operands(tokens[j], "ri")
+            if (ops is not None and add is not None and ops[0] == add[0]
+                    and ops[1] + add[1] <= 0xFF and flags_dead(j, "F")):
+                changed = f"folded {texts[i]} + {texts[j]}"
+                rewrite(i, f"MOVI R{ops[0]}, 0x{ops[1] + add[1]:X}")
+                delete(j)
+        elif mnemonic == "LUI" and j_ok and j_mnemonic == "ORI":
+            ops, low = _operands(toks, "ri"), _operands(tokens[j], "ri")
+            if ops is not None and low is not None and ops[0] == low[0] and ops[1] == 0:
+                changed = f"collapsed {texts[i]} + {texts[j]}"
+                rewrite(i, f"MOVI R{ops[0]}, 0x{low[1]:X}")
+                delete(j)
+
+        if changed is None:
+            i = nxt[i]
+            continue
+        report.append(f"{where(i)}: {changed}")
+        label_index = None
+        # 删除/合并之后回到前一条指令重新检查（可能形成新的可优化组合）
+        if not alive[i]:
+            i = prv[i] if prv[i] >= 0 else next_live(i)
+
+    # 重新编号
+    new_addr = [0] * (count + 1)
+    addr = 0
+    new_lines = []
+    new_map = [] if line_map is not None else None
+    for k in range(count):
+        new_addr[k] = addr
+        if alive[k]:
+            new_lines.append((addr, texts[k]))
+            if new_map is not None:
+                new_map.append(lines[k])
+            addr += 1
+    new_addr[count] = addr
+    new_symbols = {label: new_addr[k] for k, labels in labels_at.items() for label in labels}
+    # 保持原符号表的顺序
+    new_symbols = {label: new_symbols[label] for label in symbol_table}
+    return new_symbols, new_lines, new_map, report
+
+
+# --------------------- 分支松弛 ---------------------
+
+# 条件码数字 -> 助记符（条件码两两互反：cond ^ 1 为相反的条件）
+_cond_names = {value: name for name, value in cond_map.items()}
+
+def relax_branches(symbol_table, processed_lines, line_map=None, scratch=15):
+    """
+    分支松弛，在 first_pass（及 peephole）之后、编码之前运行。
+    标签超出 -128..127 位移范围的 BCOND cond, label 改写为经过保留的临时寄存器
+    （默认 R15）的绝对跳转：
+        BCOND <相反条件>, 3      ; cond 为 UC 时省略
+        LUI   R15, hi(label)
+        ORI   R15, lo(label)
+        JCOND UC, R15
+    跳转成立时 R15 和 N/Z 标志位被改写；目标处在重写 N/Z 之前就读取标志位时，
+    report 中对该分支给出警告。
+
+    改写使后面的地址变大，又可能使别的 BCOND 超出范围，因此用不动点迭代：
+    开始时所有分支都是短格式，每一轮按当前各指令长度（前缀和）重新计算地址，
+    把超出范围的分支改为长格式；分支只会变长不会变短，所以迭代必然结束，
+    通常两三轮即可（每轮是对指令数的一次线性扫描）。
+
+    返回 (symbol_table, processed_lines, line_map, report)，含义与 peephole 相同；
+    没有需要松弛的分支时原样返回。需要松弛时，以下情况抛出 ValueError：
+    程序使用 R15；程序有 JCOND/JAL（寄存器中的跳转地址无法随之修改）或 .word；
+    数值位移的 BCOND 跨过被松弛的分支（位移因此改变）。
+    """
+    count = len(processed_lines)
+
+    def lineno(i):
+        return line_map[i] if line_map is not None else i + 1
+
+    # 标签形式的 BCOND：(下标, 目标下标, 条件码)；数值位移的 BCOND：(下标, 位移操作数)
+    branches = []
+    numeric = []
+    for i, (_, text) in enumerate(processed_lines):
+        if text[:5].upper() != "BCOND":
+            continue
+        toks = _split_tokens(text.split(";")[0].strip())
+        if toks[0].upper() != "BCOND" or len(toks) != 3:
+            continue
+        target = toks[2].upper()
+        if target in symbol_table:
+            try:
+                cond = _parse_cond(toks[1]) & 0xF
+            except ValueError as e:
+                raise ValueError(f"Line {lineno(i)}: {e}") from None
+            branches.append((i, symbol_table[target], cond))
+        else:
+            numeric.append((i, toks[2]))
+
+    # 不动点迭代：size[i] 为第 i 条指令当前占用的字数，addr 为其前缀和
+    size = [1] * count
+    addr = list(range(count + 1))
+    grown = []
+    short = branches
+    while short:
+        still_short = []
+        for branch in short:
+            i, target, cond = branch
+            if BCOND_MIN <= addr[target] - (addr[i] + 1) <= BCOND_MAX:
+                still_short.append(branch)
+            else:
+                size[i] = 3 if cond == cond_map["UC"] else 4
+                grown.append(branch)
+        if len(still_short) == len(short):
+            break
+        short = still_short
+        addr = [0]
+        addr.extend(accumulate(size))
+
+    if not grown:
+        return symbol_table, processed_lines, line_map, []
+
+    grown.sort()
+    first = lineno(grown[0][0])
+    reg = f"R{scratch}"
+    reserved = re.compile(rf"[\s,]{reg}\b", re.IGNORECASE)
+    for i, (_, text) in enumerate(processed_lines):
+        code = text.split(";", 1)[0]
+        if reserved.search(code):
+            raise ValueError(f"Line {lineno(i)}: {reg} is reserved as the scratch register "
+                             f"for relaxed branches (BCOND at line {first} is out of range)")
+        mnemonic = code[:5].upper()
+        if mnemonic == "JCOND" or mnemonic[:3] == "JAL" or mnemonic == ".WORD":
+            mnemonic = _split_tokens(code.strip())[0].upper()
+        if mnemonic in ("JCOND", "JAL"):
+            raise ValueError(f"Line {lineno(i)}: {mnemonic} target addresses cannot be "
+                             f"relocated by branch relaxation (BCOND at line {first} "
+                             f"is out of range)")
+        if mnemonic == ".WORD":
+            raise ValueError(f"Line {lineno(i)}: .word cannot be relocated by branch "
+                             f"relaxation (BCOND at line {first} is out of range)")
+    for i, token in numeric:
+        try:
+            disp = parse_immediate(token)
+        except ValueError as e:
+            raise ValueError(f"Line {lineno(i)}: {e}") from None
+        target = i + 1 + disp
+        if target < 0:
+            new_target = target
+        elif target > count:
+            new_target = addr[count] + target - count
+        else:
+            new_target = addr[target]
+        if new_target - (addr[i] + 1) != disp:
+            raise ValueError(f"Line {lineno(i)}: numeric BCOND displacement {disp} spans a "
+                             f"relaxed branch (line {first}); use a label instead")
+
+    def flags_reader(k):
+        """从 k 开始顺序执行时，在重写 N/Z 之前读取标志位的指令下标（没有时为 None）"""
+        needed = {"N", "Z"}
+        while k < count:
+            toks = _split_tokens(processed_lines[k][1].split(";", 1)[0].strip())
+            written = _flags_written(toks)
+            if written is None or toks[0].upper() in ("BCOND", "JCOND"):
+                return k
+            needed -= set(written)
+            if not needed:
+                return None
+            k += 1
+        return None
+
+    report = []
+    expansions = {}
+    for i, target, cond in grown:
+        dest = addr[target]
+        sequence = [f"LUI {reg}, 0x{dest >> 8:02X}", f"ORI {reg}, 0x{dest & 0xFF:02X}",
+                    f"JCOND UC, {reg}"]
+        if cond != cond_map["UC"]:
+            sequence.insert(0, f"BCOND {_cond_names[cond ^ 1]}, 3")
+        expansions[i] = sequence
+        report.append(f"line {lineno(i)}: relaxed {processed_lines[i][1].split(';')[0].strip()} "
+                      f"(distance {dest - (addr[i] + 1)}) into a jump through {reg}")
+        reader = flags_reader(target)
+        if reader is not None:
+            report.append(f"line {lineno(i)}: warning: line {lineno(reader)} reads N/Z after "
+                          f"the relaxed jump overwrites them")
+
+    new_lines = []
+    new_map = [] if line_map is not None else None
+    for i, (_, text) in enumerate(processed_lines):
+        for text_k in expansions.get(i, (text,)):
+            new_lines.append((len(new_lines), text_k))
+            if new_map is not None:
+                new_map.append(line_map[i])
+    new_symbols = {label: addr[index] for label, index in symbol_table.items()}
+    return new_symbols, new_lines, new_map, report
@@ -2,16 +2,39 @@
 import sys
 import os
 import re
+import json
+from array import array
 
-from src.assemble_passes import first_pass, assemble_line_label_aware
+from src.assemble_passes import first_pass, assemble_line_label_aware, peephole
+from src.assemble_passes import relax_branches, BranchRangeError
+from src.assemble_passes import single_pass as _single_pass
+from src.memimage import write_image
 # or just inline them
 
-def assemble_file(input_file, output_file):
-    with open(input_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
+def assemble_lines(lines, source_map=None, optimize=False, report=None):
+    """
+    汇编一组源代码行，返回每条指令的机器码列表 [[code, ...], ...]（不读写文件）
+    若给出字典 source_map，则填入 "symbols"（标签 -> 地址）和 "lines"（地址 -> 源行号）
+    optimize=True 时在编码之前运行窥孔优化（见 assemble_passes.peephole），
+    所做的修改以文字形式追加到列表 report 中（标签重复定义等警告也记入 report）。
+    标签超出范围的 BCOND 总是经过分支松弛（见 assemble_passes.relax_branches），
+    改写同样记入 report。
+    """
     # 第一遍：构建符号表和(地址->指令)列表
-    symbol_table, processed_lines = first_pass(lines)
+    line_map = []
+    symbol_table, processed_lines = first_pass(lines, line_map, report)
+    if optimize:
+        symbol_table, processed_lines, line_map, changes = peephole(
+            symbol_table, processed_lines, line_map)
+        if report is not None:
+            report.extend(changes)
+    symbol_table, processed_lines, line_map, changes = relax_branches(
+        symbol_table, processed_lines, line_map)
+    if report is not None:
+        report.extend(changes)
+    if source_map is not None:
+        source_map["symbols"] = dict(symbol_table)
+        source_map["lines"] = line_map
 
     # 第二遍：对每个行进行assemble_line_label_aware，生成机器码
     machine_codes = []
@@ -19,19 +42,90 @@ def assemble_file(input_file, output_file):
         mc = assemble_line_label_aware(line, addr, symbol_table)
         if mc is not None:
             machine_codes.append(mc)
+    return machine_codes
+
+def _source_lines(source):
+    """字符串按行拆分；文本行列表、已打开的文件等可迭代对象直接逐行读取"""
+    if isinstance(source, str):
+        return source.splitlines()
+    return source
+
+def assemble(source, source_map=None, single_pass=False, optimize=False, report=None):
+    """
+    汇编源代码，返回机器码 array('H')，不读写文件、不打印。
+    source 可以是整段源代码字符串、文本行的可迭代对象或已打开的文件对象（逐行读取）。
+    single_pass=True 时使用单遍汇编（见 assemble_passes.single_pass，结果相同、速度约快一倍；
+    有超出范围的分支时改用两遍汇编）；
+    optimize / report 见 assemble_lines（窥孔优化需要两遍汇编）。
+    """
+    lines = _source_lines(source)
+    if single_pass and optimize:
+        raise ValueError("The peephole optimizer requires the two-pass assembler")
+    if single_pass:
+        lines = list(lines)     # 需要分支松弛时还要再读一遍
+        line_map = []
+        warnings = []
+        try:
+            symbol_table, words = _single_pass(lines, line_map, warnings)
+        except BranchRangeError:
+            pass
+        else:
+            if report is not None:
+                report.extend(warnings)
+            if source_map is not None:
+                source_map["symbols"] = dict(symbol_table)
+                source_map["lines"] = line_map
+            return array("H", words)
+    return array("H", [code for sublist in assemble_lines(lines, source_map, optimize, report)
+                       for code in sublist])
+
+def format_hex(words):
+    """机器码 -> .hex 文本（每行一个 16 位十六进制数）"""
+    return "".join(f"{code:04X}\n" for code in words)
 
-    # 写入hex
+def write_map_file(map_file, source_map):
+    """把符号表/行号映射写成 JSON 旁路文件（供 simulator --profile 使用）"""
+    with open(map_file, "w", encoding="utf-8") as f:
+        json.dump(source_map, f, indent=1)
+
+def write_hex_file(output_file, words):
+    """每行一个 16 位十六进制机器码"""
     with open(output_file, "w", encoding="utf-8") as f:
-        for sublist in machine_codes:
-            for code in sublist:
-                f.write(f"{code:04X}\n")
+        f.write(format_hex(words))
+
+def print_report(report):
+    """命令行输出 report：警告以 [WARN] 开头，优化/松弛的改写以 [OPT] 开头"""
+    for entry in report:
+        print(f"[WARN] {entry}" if ": warning: " in entry else f"[OPT] {entry}")
+
+def assemble_file(input_file, output_file, map_file=None, single_pass=False, optimize=False):
+    source_map = {"source": input_file}
+    report = []
+    with open(input_file, "r", encoding="utf-8") as f:
+        words = assemble(f, source_map, single_pass, optimize, report)
+    print_report(report)
+    if map_file:
+        write_map_file(map_file, source_map)
+
+    if output_file.lower().endswith(".bin"):
+        # 二进制 IMEM 映像（小端 16 位字）
+        write_image(output_file, words, "H")
+    else:
+        # 写入hex
+        write_hex_file(output_file, words)
 
-    print(f"Assembly completed. {len(machine_codes)} instructions written to {output_file}.")
+    # 每条指令一个字
+    print(f"Assembly completed. {len(words)} instructions written to {output_file}.")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: python assembler.py input.asm output.hex")
+    args = sys.argv[1:]
+    flags = {flag: flag in args for flag in ("--single-pass", "--optimize")}
+    args = [arg for arg in args if arg not in flags]
+    if len(args) not in (2, 3):
+        print("Usage: python assembler.py [--single-pass | --optimize] "
+              "input.asm output.hex [output.map]")
         sys.exit(1)
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    assemble_file(input_file, output_file)
+    input_file = args[0]
+    output_file = args[1]
+    map_file = args[2] if len(args) == 3 else None
+    assemble_file(input_file, output_file, map_file, flags["--single-pass"], flags["--optimize"])
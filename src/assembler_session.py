@@ -0,0 +1,205 @@
+# assembler_session.py
+"""
+增量汇编会话：保存源代码行、符号表和每条指令的机器码，编辑之后只重新编码改动的行。
+
+    session = AssemblerSession(open("prog.asm"))
+    session.set_line(120, "ADDI R3, 2")       # 行号从 1 开始，与 .map 文件一致
+    session.insert_lines(300, ["loop2:", "SUBI R1, 1"])
+    session.delete_lines(42)
+    words = session.words                    # array('H')，原地更新
+
+每次编辑：
+  - 改动范围内的行重新解析、编码；其后各行的地址整体平移（只是整数加法）
+  - 地址或标签有变化时重建符号表（只遍历已缓存的标签，不重新解析源代码）
+  - 其余的 BCOND 只在标签距离变化时修补位移字段；引用的标签被新定义或删除的 BCOND 重新编码
+结果与对全文调用 assemble() 完全相同（每条指令一个字，与 first_pass 的地址计算一致）。
+编码出错时撤销这次编辑并抛出 ValueError，会话保持编辑前的状态。
+会话不做分支松弛：使某个 BCOND 超出位移范围的编辑同样被撤销（抛出 BranchRangeError）。
+"""
+
+import re
+from array import array
+
+from src.assemble_passes import BCOND_MIN, BCOND_MAX, BranchRangeError, assemble_line_label_aware
+from src.assembler import _source_lines
+from src.mapping import instruction_set
+
+
+def _parse_line(line):
+    """与 first_pass 相同的拆分：返回 (标签 或 None, 指令文本 或 None)"""
+    raw = line.split(";")[0].strip()
+    if not raw:
+        return None, None
+    if ":" in raw:
+        label, instr = raw.split(":", 1)
+        return label.strip().upper(), instr.strip() or None
+    return None, raw
+
+
+def _branch_token(instr):
+    """BCOND 指令返回位移操作数（大写，可能是标签），其他指令返回 None"""
+    tokens = re.split(r'[,\s]+', instr)
+    info = instruction_set.get(tokens[0].upper())
+    if info is not None and info.fmt == "Bcond" and len(tokens) == 3:
+        return tokens[2].strip().upper()
+    return None
+
+
+class AssemblerSession:
+    def __init__(self, source=()):
+        self.lines = []          # 源代码行（不含换行符）
+        self._labels = []        # 每行定义的标签（大写）或 None
+        self._instrs = []        # 每行的指令文本或 None
+        self._branches = []      # 每行 BCOND 的位移操作数或 None
+        # _addr[i] 为第 i 行（之前没有指令时）的当前地址；末尾多一项为指令总数
+        self._addr = [0]
+        self.symbols = {}
+        self.words = array("H")
+        self.last_encoded = 0    # 上一次操作重新编码/修补的指令数
+        self.load(source)
+
+    # --------------------- 整体装载 ---------------------
+
+    def load(self, source):
+        """丢弃现有内容，汇编整个源代码（字符串、行的可迭代对象或文件对象）"""
+        self.lines = []
+        self._labels = []
+        self._instrs = []
+        self._branches = []
+        self._addr = [0]
+        self.symbols = {}
+        self.words = array("H")
+        self._splice(0, 0, list(_source_lines(source)))
+
+    # --------------------- 编辑（行号从 1 开始） ---------------------
+
+    def set_line(self, lineno, text):
+        self._check_lineno(lineno)
+        self._splice(lineno - 1, lineno, [text])
+
+    def insert_lines(self, lineno, lines):
+        """在第 lineno 行之前插入（lineno = 行数 + 1 时追加到末尾）"""
+        self._check_lineno(lineno, allow_end=True)
+        self._splice(lineno - 1, lineno - 1, list(_source_lines(lines)))
+
+    def delete_lines(self, lineno, count=1):
+        self._check_lineno(lineno)
+        self._splice(lineno - 1, min(lineno - 1 + count, len(self.lines)), [])
+
+    def replace_lines(self, lineno, count, lines):
+        """用 lines 替换从 lineno 开始的 count 行"""
+        self._check_lineno(lineno, allow_end=count == 0)
+        self._splice(lineno - 1, min(lineno - 1 + count, len(self.lines)),
+                     list(_source_lines(lines)))
+
+    def _check_lineno(self, lineno, allow_end=False):
+        last = len(self.lines) + (1 if allow_end else 0)
+        if not 1 <= lineno <= last:
+            raise IndexError(f"Line {lineno} out of range (1..{last})")
+
+    # --------------------- 结果 ---------------------
+
+    def source_map(self):
+        """与 assemble(source, source_map) 填入的 "symbols" / "lines" 相同"""
+        return {
+            "symbols": dict(self.symbols),
+            "lines": [i + 1 for i, instr in enumerate(self._instrs) if instr is not None],
+        }
+
+    def text(self):
+        return "".join(line + "\n" for line in self.lines)
+
+    # --------------------- 增量更新 ---------------------
+
+    def _splice(self, start, stop, new_lines):
+        new_lines = [line.rstrip("\r\n") for line in new_lines]
+        old_lines = self.lines[start:stop]
+        old_symbols = self.symbols
+        try:
+            self._apply(start, stop, new_lines)
+        except ValueError:
+            # 撤销：换回原来的行（原状态可以正常编码）
+            self._apply(start, start + len(new_lines), old_lines, old_symbols)
+            raise
+
+    def _apply(self, start, stop, new_lines, symbols=None):
+        addr = self._addr
+        parsed = [_parse_line(line) for line in new_lines]
+        old_count = addr[stop] - addr[start]
+        new_count = sum(1 for _, instr in parsed if instr is not None)
+        delta = new_count - old_count
+
+        # 行信息与地址
+        first = addr[start]
+        new_addr = []
+        current = first
+        for _, instr in parsed:
+            new_addr.append(current)
+            if instr is not None:
+                current += 1
+        old_defs = [(label, addr[i]) for i, label in enumerate(self._labels[start:stop], start)
+                    if label is not None]
+        new_defs = [(label, a) for (label, _), a in zip(parsed, new_addr) if label is not None]
+        tail = addr[stop:]
+        if delta:
+            tail = [a + delta for a in tail]
+        self.lines[start:stop] = new_lines
+        self._labels[start:stop] = [label for label, _ in parsed]
+        self._instrs[start:stop] = [instr for _, instr in parsed]
+        self._branches[start:stop] = [
+            _branch_token(instr) if instr is not None else None for _, instr in parsed]
+        addr[start:] = new_addr + tail
+
+        # 符号表：只有地址平移或改动范围内有标签时才可能变化
+        old_symbols = self.symbols
+        if symbols is not None:
+            self.symbols = dict(symbols)
+        elif delta or old_defs != new_defs:
+            self.symbols = self._build_symbols()
+        symbols = self.symbols
+
+        # 机器码：先为改动范围占位，再逐条编码
+        words = self.words
+        words[first:first + old_count] = array("H", bytes(2 * new_count))
+        encoded = 0
+        for i in range(start, start + len(new_lines)):
+            instr = self._instrs[i]
+            if instr is not None:
+                words[addr[i]] = self._encode(i)
+                encoded += 1
+
+        if symbols is not old_symbols:
+            # 标签集合变化：引用这些标签的 BCOND 在“标签/数值”之间切换，需要重新编码
+            toggled = old_symbols.keys() ^ symbols.keys()
+            region = range(start, start + len(new_lines))
+            for i, token in enumerate(self._branches):
+                if token is None or i in region:
+                    continue
+                if token in toggled:
+                    words[addr[i]] = self._encode(i)
+                    encoded += 1
+                elif token in symbols:
+                    disp = symbols[token] - addr[i] - 1
+                    if not BCOND_MIN <= disp <= BCOND_MAX:
+                        raise BranchRangeError(
+                            f"Line {i + 1}: BCOND target {token} is out of range ({disp})")
+                    disp &= 0xFF
+                    word = words[addr[i]]
+                    if word & 0xFF != disp:
+                        words[addr[i]] = (word & 0xFF00) | disp
+                        encoded += 1
+        self.last_encoded = encoded
+
+    def _build_symbols(self):
+        symbols = {}
+        addr = self._addr
+        for i, label in enumerate(self._labels):
+            if label is not None:
+                symbols[label] = addr[i]   # 重复定义时以最后一次为准（与 first_pass 一致）
+        return symbols
+
+    def _encode(self, i):
+        try:
+            return assemble_line_label_aware(self._instrs[i], self._addr[i], self.symbols)[0]
+        except ValueError as e:
+            raise ValueError(f"Line {i + 1}: {e}") from None
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+批量仿真：把大量 .asm / .hex 程序分配到进程池中执行，结果汇总到一个 JSON 文件。
+
+用法：
+    python -m src.batch "tests/*.asm" other.hex -j 8 -o results.json
+
+每个工作进程只启动一次 Python 解释器，之后在进程内直接汇编并仿真分到的程序，
+不再为每个程序单独启动 run.py / simulator.py。
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from src.assembler import assemble_lines
+from src.simulator import Simulator, ENGINES
+
+
+def simulate_program(path, engine="interp", limits=None, dmem_image=None):
+    """
+    在当前进程中汇编（.asm）或直接装载（.hex / .bin）并静默仿真一个程序，
+    返回可序列化为 JSON 的结果；出错时返回带 error 字段的结果而不是抛出。
+    limits 是传给 Simulator.run 的终止控制参数（max_steps / timeout / detect_idle）。
+    dmem_image 为初始 DMEM 映像文件，以写时复制方式映射，各工作进程共享同一份物理页。
+    """
+    result = {"program": path}
+    try:
+        sim = Simulator(trace="silent")
+        if dmem_image:
+            sim.load_dmem_image(dmem_image, share=True)
+        if path.lower().endswith(".hex"):
+            sim.load_hex_file(path)
+        elif path.lower().endswith(".bin"):
+            sim.load_imem_image(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                machine_codes = assemble_lines(f.readlines())
+            sim.load_words(code for sublist in machine_codes for code in sublist)
+        sim.run(engine=engine, **(limits or {}))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    result.update({
+        "pc": sim.pc,
+        "steps": sim.steps,
+        "stop_reason": sim.stop_reason,
+        "registers": list(sim.regs),
+        "flags": {"F": sim.flagF, "N": sim.flagN, "Z": sim.flagZ,
+                  "C": sim.flagC, "L": sim.flagL},
+        "dmem": list(sim.dmem),
+    })
+    return result
+
+
+def expand_programs(patterns):
+    """展开通配符；没有匹配的模式按普通路径保留（之后在结果里报告错误）"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return paths
+
+
+def run_batch(paths, workers=None, engine="interp", limits=None, dmem_image=None):
+    """
+    在进程池中仿真 paths 中的所有程序，按输入顺序返回结果列表。
+    workers 为 None 时使用 CPU 核数；workers == 1 时直接在当前进程中执行。
+    """
+    paths = list(paths)
+    if workers == 1 or len(paths) <= 1:
+        return [simulate_program(path, engine, limits, dmem_image) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    # 每个任务很短，按块分发以减少进程间通信次数
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(simulate_program, paths, repeat(engine), repeat(limits),
+                                 repeat(dmem_image), chunksize=chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many programs across a process pool")
+    parser.add_argument("programs", nargs="+", help=".asm/.hex/.bin files or glob patterns")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("-o", "--output", default="batch_results.json",
+                        help="results file (default: batch_results.json)")
+    parser.add_argument("--engine", default="interp", choices=ENGINES,
+                        help="execution engine (default: interp)")
+    parser.add_argument("--max-steps", type=int, default=None,
+                        help="per-program instruction budget")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="per-program wall-clock limit in seconds")
+    parser.add_argument("--detect-idle", action="store_true",
+                        help="stop programs that spin in a loop without changing state")
+    parser.add_argument("--dmem", default=None,
+                        help="initial DMEM image shared (copy-on-write) by every program")
+    args = parser.parse_args()
+
+    limits = {"max_steps": args.max_steps, "timeout": args.timeout,
+              "detect_idle": args.detect_idle}
+    paths = expand_programs(args.programs)
+    results = run_batch(paths, workers=args.workers, engine=args.engine, limits=limits,
+                        dmem_image=args.dmem)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f)
+
+    failed = sum(1 for r in results if "error" in r)
+    print(f"Batch completed. {len(results)} programs simulated ({failed} failed), "
+          f"results written to {args.output}.")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
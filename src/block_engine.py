@@ -0,0 +1,290 @@
+# block_engine.py
+"""
+基本块翻译执行引擎（Simulator 的第二种执行方式）。
+
+程序在 BCOND/JCOND/JAL 处以及 BCOND 的静态目标处被切分成基本块，
+每个基本块第一次执行时被翻译成一个专门的 Python 函数并缓存：
+  - 块内寄存器值保存在局部变量中，只在块出口写回 regs；
+  - 标志位按块内最后一次写入的结果在出口处一次性提交；
+  - 出口返回下一条要执行的 PC（与解释器 “pc += 1” 之后的值相同）。
+
+语法错误 / 不支持的指令 / 操作数错误等伪操作不翻译，仍由解释器的处理函数单步执行，
+因此两种引擎的体系结构结果完全一致。逐条跟踪（branches/full 级别）只由解释器提供。
+"""
+
+from src.simulator import (
+    OP_WAIT, OP_ADD, OP_SUB, OP_CMP, OP_AND, OP_OR, OP_XOR, OP_MOV,
+    OP_ADDI, OP_SUBI, OP_CMPI, OP_ANDI, OP_ORI, OP_XORI, OP_MOVI,
+    OP_LSH, OP_LSHI, OP_LUI, OP_LOAD, OP_STOR,
+    OP_BCOND, OP_JCOND, OP_JAL,
+)
+
+# 块的终结指令
+TERMINATORS = {OP_BCOND, OP_JCOND, OP_JAL}
+# 可以放进基本块的普通指令
+STRAIGHT_OPS = {
+    OP_WAIT, OP_ADD, OP_SUB, OP_CMP, OP_AND, OP_OR, OP_XOR, OP_MOV,
+    OP_ADDI, OP_SUBI, OP_CMPI, OP_ANDI, OP_ORI, OP_XORI, OP_MOVI,
+    OP_LSH, OP_LSHI, OP_LUI, OP_LOAD, OP_STOR,
+}
+# 写 F 标志的指令
+_F_OPS = {OP_ADD, OP_SUB, OP_CMP, OP_ADDI, OP_SUBI, OP_CMPI}
+
+# 条件码 -> 以局部标志变量表示的表达式（与 COND_TESTS 一一对应）
+_COND_EXPRS = (
+    "fZ", "not fZ", "fC", "not fC", "fL", "not fL", "fN", "not fN",
+    "fF", "not fF", "(not fL) and (not fZ)", "fL or fZ",
+    "(not fN) and (not fZ)", "fN or fZ", "True", "False",
+)
+
+_WRAP = "((({}) + 0x8000) & 0xFFFF) - 0x8000"
+
+
+def _sets_flags(op, a, b):
+    """该指令是否写 N/Z 标志（LSHI 负移位直接返回，不写标志）"""
+    if op in (OP_WAIT, OP_STOR):
+        return False
+    if op == OP_LSHI and b < 0:
+        return False
+    return True
+
+
+def find_leaders(program):
+    """块首：程序入口、BCOND 静态目标、终结指令或伪操作之后的下一条"""
+    n = len(program)
+    leaders = {0}
+    for pc, (op, a, b) in enumerate(program):
+        if op in TERMINATORS or op not in STRAIGHT_OPS:
+            leaders.add(pc + 1)
+        if op == OP_BCOND:
+            target = pc + b + 1
+            if 0 <= target < n:
+                leaders.add(target)
+    return leaders
+
+
+class _BlockCompiler:
+    """为 [start, end) 区间内的指令生成一个 Python 函数的源码"""
+
+    def __init__(self, program, start, end):
+        self.program = program
+        self.start = start
+        self.end = end
+        self.lines = []
+        self.loaded = set()    # 已载入局部变量的寄存器
+        self.dirty = set()     # 需要写回的寄存器
+        self.nz_value = None   # 最后写 N/Z 的结果变量
+        self.f_expr = None     # 最后写 F 的表达式
+
+    def reg(self, r):
+        if r not in self.loaded:
+            self.lines.append(f"r{r} = regs[{r}]")
+            self.loaded.add(r)
+        return f"r{r}"
+
+    def set_reg(self, r, expr):
+        self.lines.append(f"r{r} = {expr}")
+        self.loaded.add(r)
+        self.dirty.add(r)
+
+    def emit(self, line):
+        self.lines.append(line)
+
+    def compile(self):
+        program = self.program
+        body = [program[pc] for pc in range(self.start, self.end)]
+        last_f = max((i for i, (op, a, b) in enumerate(body) if op in _F_OPS), default=-1)
+
+        for i, (op, a, b) in enumerate(body):
+            if op in TERMINATORS:
+                break
+            self.straight(i, op, a, b, i == last_f)
+
+        # 写回寄存器与标志
+        for r in sorted(self.dirty):
+            self.emit(f"regs[{r}] = r{r}")
+        flag_locals = set()
+        if self.nz_value is not None:
+            self.emit(f"fN = {self.nz_value} < 0")
+            self.emit(f"fZ = {self.nz_value} == 0")
+            self.emit("sim.flagN = fN")
+            self.emit("sim.flagZ = fZ")
+            flag_locals.update(("fN", "fZ"))
+        if self.f_expr is not None:
+            self.emit(f"fF = {self.f_expr}")
+            self.emit("sim.flagF = fF")
+            flag_locals.add("fF")
+
+        last_pc = self.end - 1
+        op, a, b = program[last_pc]
+        if op in TERMINATORS:
+            self.terminator(last_pc, op, a, b, flag_locals)
+        else:
+            self.emit(f"return {self.end}")
+
+        name = f"_block_{self.start}"
+        src = f"def {name}(sim, regs, dmem):\n" + "".join(f"    {line}\n" for line in self.lines)
+        return name, src
+
+    def straight(self, i, op, a, b, last_f):
+        t = f"t{i}"
+        if op == OP_WAIT:
+            return
+        if op in (OP_ADD, OP_SUB, OP_CMP):
+            self.emit(f"a{i} = {self.reg(a)}")
+            self.emit(f"b{i} = {self.reg(b)}")
+            sign = "+" if op == OP_ADD else "-"
+            self.emit(f"s{i} = a{i} {sign} b{i}")
+            self.emit(f"{t} = " + _WRAP.format(f"s{i}"))
+            if op != OP_CMP:
+                self.set_reg(a, t)
+            if last_f:
+                if op == OP_ADD:
+                    self.f_expr = (f"(a{i} >= 0 and b{i} >= 0 and s{i} < 0) or "
+                                   f"(a{i} < 0 and b{i} < 0 and s{i} >= 0)")
+                else:
+                    self.f_expr = f"((a{i} ^ b{i}) >= 0) and ((a{i} ^ s{i}) < 0)"
+        elif op in (OP_ADDI, OP_SUBI, OP_CMPI):
+            self.emit(f"a{i} = {self.reg(a)}")
+            sign = "+" if op == OP_ADDI else "-"
+            self.emit(f"s{i} = a{i} {sign} {b}")
+            self.emit(f"{t} = " + _WRAP.format(f"s{i}"))
+            if op != OP_CMPI:
+                self.set_reg(a, t)
+            if last_f:
+                if op == OP_ADDI:
+                    self.f_expr = (f"(a{i} >= 0 and {b} >= 0 and s{i} < 0) or "
+                                   f"(a{i} < 0 and {b} < 0 and s{i} >= 0)")
+                else:
+                    self.f_expr = f"((a{i} ^ {b}) >= 0) and ((a{i} ^ s{i}) < 0)"
+        elif op in (OP_AND, OP_OR, OP_XOR):
+            sym = {OP_AND: "&", OP_OR: "|", OP_XOR: "^"}[op]
+            self.emit(f"{t} = " + _WRAP.format(f"{self.reg(a)} {sym} {self.reg(b)}"))
+            self.set_reg(a, t)
+        elif op == OP_MOV:
+            self.emit(f"{t} = " + _WRAP.format(self.reg(b)))
+            self.set_reg(a, t)
+        elif op in (OP_ANDI, OP_ORI, OP_XORI):
+            # 立即数已零扩展到 0..255，结果不会越出16位范围
+            sym = {OP_ANDI: "&", OP_ORI: "|", OP_XORI: "^"}[op]
+            self.emit(f"{t} = {self.reg(a)} {sym} {b}")
+            self.set_reg(a, t)
+        elif op == OP_MOVI:
+            self.emit(f"{t} = {b}")
+            self.set_reg(a, t)
+        elif op == OP_LUI:
+            self.emit(f"{t} = {(((b << 8) + 0x8000) & 0xFFFF) - 0x8000}")
+            self.set_reg(a, t)
+        elif op == OP_LSHI:
+            if b < 0:
+                self.emit("if sim._trace_summary:")
+                self.emit(f"    sim.trace_sink.line({f'[SIM] LSHI negative shift {b} not supported.'!r})")
+                return
+            if b < 16:
+                self.emit(f"{t} = " + _WRAP.format(f"{self.reg(a)} << {b}"))
+            else:
+                self.emit(f"{t} = 0")
+            self.set_reg(a, t)
+        elif op == OP_LSH:
+            self.emit(f"n{i} = {self.reg(b)}")
+            self.emit(f"if n{i} < 0:")
+            self.emit(f"    n{i} &= 0xF")
+            self.emit("    if sim._trace_summary:")
+            self.emit(f"        sim.trace_sink.line(f'[SIM] LSH negative shift adjusted to {{n{i}}}')")
+            self.emit(f"{t} = " + _WRAP.format(f"{self.reg(a)} << n{i}") + f" if n{i} < 16 else 0")
+            self.set_reg(a, t)
+        elif op == OP_LOAD:
+            self.emit(f"{t} = " + _WRAP.format(f"dmem[{self.reg(b)} & 0x1FF]"))
+            self.set_reg(a, t)
+        elif op == OP_STOR:
+            self.emit(f"dmem[{self.reg(b)} & 0x1FF] = " + _WRAP.format(self.reg(a)))
+        if _sets_flags(op, a, b):
+            self.nz_value = t
+
+    def terminator(self, pc, op, a, b, flag_locals):
+        if op == OP_JAL:
+            # 先写链接寄存器，再读目标寄存器（rdest == rsrc 时跳到链接地址）
+            link = ((pc + 1 + 0x8000) & 0xFFFF) - 0x8000
+            self.emit(f"regs[{a}] = {link}")
+            self.emit(f"return regs[{b}]")
+            return
+        cond = a if 0 <= a <= 15 else 15
+        expr = _COND_EXPRS[cond]
+        for flag, attr in (("fN", "flagN"), ("fZ", "flagZ"), ("fF", "flagF"),
+                           ("fC", "flagC"), ("fL", "flagL")):
+            if flag in expr and flag not in flag_locals:
+                self.emit(f"{flag} = sim.{attr}")
+        if op == OP_BCOND:
+            self.emit(f"if {expr}:")
+            self.emit(f"    return {pc + b + 1}")
+            self.emit(f"return {pc + 1}")
+        else:
+            # JCOND：目标寄存器已在上面写回，直接从 regs 读取
+            self.emit(f"if {expr}:")
+            self.emit(f"    return regs[{b}]")
+            self.emit(f"return {pc + 1}")
+
+
+class BlockEngine:
+    """按基本块执行 sim.program；翻译结果按块首 PC 缓存"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.program = sim.program
+        self.leaders = find_leaders(self.program)
+        # 下标为块首 PC：(函数, 块内指令条数)；函数为 None 表示交给解释器单步执行
+        self.blocks = [None] * len(self.program)
+
+    def translate(self, start):
+        program = self.program
+        op = program[start][0]
+        if op not in STRAIGHT_OPS and op not in TERMINATORS:
+            return (None, 1)
+        end = start
+        n = len(program)
+        while end < n:
+            op = program[end][0]
+            if op in TERMINATORS:
+                end += 1
+                break
+            if op not in STRAIGHT_OPS or (end > start and end in self.leaders):
+                break
+            end += 1
+        name, src = _BlockCompiler(program, start, end).compile()
+        namespace = {}
+        exec(compile(src, f"<block {start}-{end - 1}>", "exec"), namespace)
+        return (namespace[name], end - start)
+
+    def run(self, limit=-1):
+        """执行到 PC 超出范围；limit >= 0 时最多执行 limit 条指令（不够一个块时单步解释）"""
+        sim = self.sim
+        regs = sim.regs
+        dmem = sim.dmem
+        program = self.program
+        handlers = sim.handlers
+        blocks = self.blocks
+        n = len(program)
+        steps = 0
+        try:
+            while steps != limit and not sim.halt:
+                pc = sim.pc
+                if not 0 <= pc < n:
+                    if sim._trace_summary:
+                        sim.trace_sink.line(f"[SIM] PC {pc} out of range! Simulation stops.")
+                    break
+                entry = blocks[pc]
+                if entry is None:
+                    entry = blocks[pc] = self.translate(pc)
+                fn, length = entry
+                if fn is None or 0 <= limit < steps + length:
+                    op, a, b = program[pc]
+                    handlers[op](a, b)
+                    steps += 1
+                    if sim.halt:
+                        break
+                    sim.pc += 1
+                else:
+                    sim.pc = fn(sim, regs, dmem)
+                    steps += length
+        finally:
+            sim.steps += steps
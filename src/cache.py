@@ -0,0 +1,176 @@
+# cache.py
+"""
+DMEM 前的数据 cache 模型，用于评估不同 cache 配置（不改变功能仿真的结果）。
+
+    models = CacheModels([Cache(size=64, line_size=4, assoc=1),
+                          Cache(size=64, line_size=4, assoc=2, policy="fifo"),
+                          Cache(size=128, line_size=8, assoc=4, write_back=False)])
+    sim.run(caches=models)       # 一次仿真同时评估所有配置
+    print(models.report())
+
+大小和行长都以 16 位字为单位（DMEM 按字寻址，共 512 字）。
+  - 替换策略：lru / fifo / random（random 使用固定种子，结果可复现）
+  - 写回（write-back）：写分配，被替换的脏行写回主存，写回的延迟计入该次缺失
+  - 写直通（write-through）：写不分配，每次 STOR 都写主存；假定有写缓冲，
+    STOR 缺失不产生停顿周期
+每次缺失的延迟为 miss_penalty 个周期，LOAD 和 STOR 分开统计命中、缺失和缺失周期，
+同时按 PC 统计缺失次数以便找出缺失最多的访存指令。
+"""
+
+import random
+
+from src.simulator import OP_LOAD, OP_STOR
+
+POLICIES = ("lru", "fifo", "random")
+KINDS = ("LOAD", "STOR")
+
+
+class Cache:
+    def __init__(self, size=256, line_size=4, assoc=1, policy="lru", write_back=True,
+                 miss_penalty=10, name=None, seed=0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        if min(size, line_size, assoc) <= 0 or size % (line_size * assoc):
+            raise ValueError(f"Cache size {size} is not a multiple of line size {line_size} "
+                             f"x associativity {assoc}")
+        self.size = size
+        self.line_size = line_size
+        self.assoc = assoc
+        self.policy = policy
+        self.write_back = write_back
+        self.miss_penalty = miss_penalty
+        self.num_sets = size // (line_size * assoc)
+        self.name = name or (f"{size}w/{line_size}w/{assoc}-way/{policy}/"
+                             f"{'WB' if write_back else 'WT'}")
+        self._rng = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        """清空 cache 内容和统计"""
+        # 每组按进入顺序（lru 时按最近使用顺序）保存行号，最前面的最先被替换
+        self.sets = [[] for _ in range(self.num_sets)]
+        self.dirty = set()
+        self.hits = dict.fromkeys(KINDS, 0)
+        self.misses = dict.fromkeys(KINDS, 0)
+        self.miss_cycles = dict.fromkeys(KINDS, 0)
+        self.writebacks = 0
+        self.memory_writes = 0      # 写直通时写主存的次数
+        self.pc_misses = {}
+
+    def access(self, pc, addr, is_write):
+        """一次访存，返回是否命中"""
+        kind = "STOR" if is_write else "LOAD"
+        line = addr // self.line_size
+        ways = self.sets[line % self.num_sets]
+        if line in ways:
+            self.hits[kind] += 1
+            if self.policy == "lru" and ways[-1] != line:
+                ways.remove(line)
+                ways.append(line)
+            if is_write:
+                if self.write_back:
+                    self.dirty.add(line)
+                else:
+                    self.memory_writes += 1
+            return True
+
+        self.misses[kind] += 1
+        self.pc_misses[pc] = self.pc_misses.get(pc, 0) + 1
+        if is_write and not self.write_back:
+            # 写不分配，经写缓冲直接写主存
+            self.memory_writes += 1
+            return False
+        cycles = self.miss_penalty
+        if len(ways) >= self.assoc:
+            victim = ways.pop(self._rng.randrange(len(ways)) if self.policy == "random" else 0)
+            if victim in self.dirty:
+                self.dirty.discard(victim)
+                self.writebacks += 1
+                cycles += self.miss_penalty
+        ways.append(line)
+        if is_write:
+            self.dirty.add(line)
+        self.miss_cycles[kind] += cycles
+        return False
+
+    @property
+    def accesses(self):
+        return sum(self.hits.values()) + sum(self.misses.values())
+
+    @property
+    def hit_rate(self):
+        return sum(self.hits.values()) / self.accesses if self.accesses else 0.0
+
+    def worst_pcs(self, n=5):
+        """缺失次数最多的 n 条访存指令 [(pc, misses), ...]"""
+        return sorted(self.pc_misses.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+def parse_cache_spec(spec):
+    """
+    解析命令行的 cache 配置，例如 "size=64,line=4,assoc=2,policy=lru,write=back,penalty=10"；
+    未给出的字段使用 Cache 的默认值。
+    """
+    keys = {"size": "size", "line": "line_size", "assoc": "assoc", "policy": "policy",
+            "write": "write_back", "penalty": "miss_penalty", "name": "name"}
+    kwargs = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, sep, value = item.partition("=")
+        key = key.strip().lower()
+        value = value.strip()
+        if not sep or key not in keys:
+            raise ValueError(f"Invalid cache option '{item}' in '{spec}'")
+        if key == "write":
+            if value.lower() not in ("back", "through"):
+                raise ValueError(f"Invalid write policy '{value}' (expected back or through)")
+            kwargs["write_back"] = value.lower() == "back"
+        elif key in ("policy", "name"):
+            kwargs[keys[key]] = value.lower() if key == "policy" else value
+        else:
+            kwargs[keys[key]] = int(value, 0)
+    return Cache(**kwargs)
+
+
+class CacheModels:
+    """一组 cache 配置；由 Simulator.run(caches=...) 为 LOAD/STOR 包装处理函数，每次访存送给所有配置"""
+
+    def __init__(self, caches):
+        self.caches = list(caches)
+
+    def instrument(self, sim, code):
+        wrapped = list(code)
+        accesses = [cache.access for cache in self.caches]
+        for pc, (op, a, b) in enumerate(sim.program):
+            if op in (OP_LOAD, OP_STOR):
+                wrapped[pc] = (self._wrap(sim, code[pc][0], pc, op == OP_STOR, accesses), a, b)
+        return wrapped
+
+    @staticmethod
+    def _wrap(sim, handler, pc, is_write, accesses):
+        # LOAD Rdest, Rsrc / STOR Rsrc, Rdest：地址寄存器都是 b，在执行之前取地址
+        def access(a, b):
+            addr = sim.regs[b] & 0x1FF
+            for fn in accesses:
+                fn(pc, addr, is_write)
+            handler(a, b)
+        return access
+
+    def finish(self, sim):
+        pass
+
+    def report(self, sim=None):
+        out = ["", "----- Data cache (hits/misses/miss cycles) -----",
+               f"{'config':<30}{'LOAD':>22}{'STOR':>22}{'hit rate':>10}{'writebacks':>12}"]
+        for cache in self.caches:
+            cols = [f"{cache.hits[k]}/{cache.misses[k]}/{cache.miss_cycles[k]}" for k in KINDS]
+            out.append(f"{cache.name:<30}{cols[0]:>22}{cols[1]:>22}"
+                       f"{cache.hit_rate:>10.2%}{cache.writebacks:>12}")
+        for cache in self.caches:
+            worst = cache.worst_pcs()
+            if not worst:
+                continue
+            out.append(f"Most misses ({cache.name}):")
+            for pc, count in worst:
+                where = f"    ; {sim.source_line(pc)}" if sim is not None else ""
+                out.append(f"  PC {pc:4d}: {count}{where}")
+        return "\n".join(out)
@@ -3,14 +3,32 @@
 简单的 EECS 427 反汇编器
 
 用法：
-    python disassembler.py input.hex output.asm
+    python disassembler.py [--decode-cache DIR] [--binary] [--labels] input.hex output.asm
 
-输入文件为十六进制格式的机器码（每行一个 16 位的机器码），
-输出文件为对应的汇编代码（每行一条）。
+输入文件为十六进制格式的机器码（每行一个 16 位的机器码），或 IMEM 二进制映像
+（.bin 或 --binary，小端 16 位字），输出文件为对应的汇编代码（每行一条）。
+输入按块读取、输出分批写出，内存占用与文件大小无关。
+--labels 由控制流恢复跳转目标的标签（L_XXXX），输出可以重新汇编的源代码。
+
+作为库使用时 disassemble_words（机器码序列）和 disassemble_hex（.hex 文本、行或文件对象）
+直接返回汇编行列表，不读写文件。
+
+每种 16 位机器码的反汇编结果预先算好放在译码表中（decode_table），每个字只需一次下标查找；
+--decode-cache DIR 把译码表缓存在 DIR 中，以 mapping.py 内容的摘要区分。
 """
 
+import hashlib
+import io
+import mmap
+import os
 import sys
+from array import array
+from collections import namedtuple
+from itertools import islice
+
+from src.assemble_passes import assemble_line_label_aware
 from src.mapping import instruction_set
+from src.memimage import read_image
 
 # 在文件开头或适当位置定义 cond_map 和辅助函数
 cond_map = {
@@ -40,123 +58,514 @@ def get_cond_mnemonic(cond_val):
     return str(cond_val)
 
 
-def disassemble_instruction(machine_code):
-    """
-    根据 16 位机器码反汇编出汇编语句字符串。
-    对于 FIX/FIXV 格式，先检查是否匹配；否则根据 opcode 以及格式解析剩余字段。
-    如果无法识别，则返回 "???"。
-    """
-    # 先检查 FIX 格式指令（完全固定值）
+# --------------------- 预计算的译码表 ---------------------
+# 16 位机器码只有 65536 种，按 src/mapping.py 一次性全部译码：
+#   entries[word] = (助记符 或 None, 操作数元组)   texts[word] = 反汇编文本
+# 匹配顺序与逐条扫描 instruction_set 相同：FIX -> FIXV -> 按 instruction_set 顺序的第一种格式
+# （RR / Jcond / RS 还要求扩展码相同）。
+
+DecodeTable = namedtuple("DecodeTable", ["entries", "texts"])
+
+DECODE_TABLE_VERSION = 2      # 译码表内容的格式或文本写法改变时加 1，使磁盘缓存失效
+
+_decode_table = None
+
+
+def mapping_hash():
+    """instruction_set（含顺序）与译码表版本的摘要，用作磁盘缓存的键"""
+    key = repr((DECODE_TABLE_VERSION, list(instruction_set.items())))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _decode(word, forms):
+    """按 (opcode << 4 | ext) 的格式表译码一条机器码，返回 (助记符, 操作数, 文本)"""
+    opcode = word >> 12
+    form = forms[opcode << 4 | (word >> 4) & 0xF]
+    if form is None:
+        return None, (), f"??? (0x{word:04X})"
+    mnemonic, fmt = form
+    hi = (word >> 8) & 0xF
+    lo = word & 0xF
+    if fmt == "RR":
+        return mnemonic, (hi, lo), f"{mnemonic} R{hi}, R{lo}"
+    if fmt == "RS":
+        return mnemonic, (hi, lo), f"{mnemonic} R{hi}, R{lo}"
+    if fmt == "RI" or fmt == "IR":
+        imm = word & 0xFF
+        return mnemonic, (hi, imm), f"{mnemonic} R{hi}, 0x{imm:X}"
+    if fmt == "RI4":
+        imm = -lo if (word >> 4) & 0x1 else lo
+        return mnemonic, (hi, imm), f"{mnemonic} R{hi}, {imm}"
+    if fmt == "Bcond":
+        disp = word & 0xFF
+        # 8 位符号扩展
+        if disp & 0x80:
+            disp -= 256
+        return mnemonic, (hi, disp), f"{mnemonic} {get_cond_mnemonic(hi)}, {disp}"
+    # Jcond
+    return mnemonic, (hi, lo), f"{mnemonic} {get_cond_mnemonic(hi)}, R{lo}"
+
+
+def build_decode_table():
+    """不使用缓存，按当前的 instruction_set 构建完整的译码表"""
+    fixed = {}
+    fixed_vec = {}
     for mnemonic, instr in instruction_set.items():
         if instr.fmt == "FIX":
-            if machine_code == instr.fields["value"]:
-                return mnemonic
+            fixed.setdefault(instr.fields["value"], mnemonic)
+        elif instr.fmt == "FIXV":
+            fixed_vec.setdefault(instr.fields["fixed"] & 0xFFF0, mnemonic)
+    forms = [None] * 256
+    for key in range(256):
+        opcode, ext = key >> 4, key & 0xF
+        for mnemonic, instr in instruction_set.items():
+            if instr.fmt not in ("RR", "RI", "RI4", "Bcond", "Jcond", "RS", "IR"):
+                continue
+            if instr.opcode != opcode:
+                continue
+            if instr.fmt in ("RR", "Jcond", "RS") and instr.ext != ext:
+                continue
+            forms[key] = (mnemonic, instr.fmt)
+            break
 
-    # 检查 FIXV 格式指令（低4位为变量）
-    for mnemonic, instr in instruction_set.items():
-        if instr.fmt == "FIXV":
-            fixed = instr.fields["fixed"] & 0xFFF0
-            if (machine_code & 0xFFF0) == fixed:
-                vector = machine_code & 0xF
-                return f"{mnemonic} 0x{vector:X}"
+    entries = [None] * 0x10000
+    texts = [None] * 0x10000
+    for word in range(0x10000):
+        mnemonic = fixed.get(word)
+        if mnemonic is not None:
+            entries[word] = (mnemonic, ())
+            texts[word] = mnemonic
+            continue
+        mnemonic = fixed_vec.get(word & 0xFFF0)
+        if mnemonic is not None:
+            vector = word & 0xF
+            entries[word] = (mnemonic, (vector,))
+            texts[word] = f"{mnemonic} 0x{vector:X}"
+            continue
+        mnemonic, operands, text = _decode(word, forms)
+        entries[word] = (mnemonic, operands)
+        texts[word] = text
+    return DecodeTable(entries, texts)
 
-    # 非固定格式，先提取高 4 位的 opcode
-    opcode = (machine_code >> 12) & 0xF
 
-    # 针对不同格式的指令进行解析
-    for mnemonic, instr in instruction_set.items():
-        if instr.fmt == "RR":
-            if opcode == instr.opcode:
-                # RR 格式：位15-12: opcode, 11-8: Rdest, 7-4: ext, 3-0: Rsrc
-                ext = (machine_code >> 4) & 0xF
-                if instr.ext is not None and ext == instr.ext:
-                    Rdest = (machine_code >> 8) & 0xF
-                    Rsrc = machine_code & 0xF
-                    return f"{mnemonic} R{Rdest}, R{Rsrc}"
-        elif instr.fmt == "RI":
-            if opcode == instr.opcode:
-                # RI 格式：位15-12: opcode, 11-8: Rdest, 7-0: imm
-                Rdest = (machine_code >> 8) & 0xF
-                imm = machine_code & 0xFF
-                return f"{mnemonic} R{Rdest}, 0x{imm:X}"
-        elif instr.fmt == "RI4":
-            if opcode == instr.opcode:
-                # RI4 格式：位15-12: opcode, 11-8: Rdest, 位7-4: (固定为0 except bit4存 s), 位3-0: immed
-                Rdest = (machine_code >> 8) & 0xF
-                # 提取位4作为 s 位（假设只有这一位有效）
-                s = (machine_code >> 4) & 0x1
-                imm = machine_code & 0xF
-                # 如果 s == 1，则认为立即数为负
-                imm_value = -imm if s == 1 else imm
-                return f"{mnemonic} R{Rdest}, {imm_value}"
-        elif instr.fmt == "Bcond":
-            if opcode == instr.opcode:
-                # BCOND 格式：位15-12: opcode, 11-8: cond, 7-0: disp (8位2's complement)
-                cond = (machine_code >> 8) & 0xF
-                cond_str = get_cond_mnemonic(cond)
-                disp = machine_code & 0xFF
-                # 进行 8 位符号扩展
-                if disp & 0x80:
-                    disp = disp - 256
-                return f"{mnemonic} {cond_str}, {disp}"
-
-        elif instr.fmt == "Jcond":
-            if opcode == instr.opcode:
-                # JCOND 格式：位15-12: opcode, 11-8: cond, 7-4: ext, 3-0: Rtarget
-                cond = (machine_code >> 8) & 0xF
-                cond_str = get_cond_mnemonic(cond)
-                ext = (machine_code >> 4) & 0xF
-                if instr.ext is not None and ext == instr.ext:
-                    Rtarget = machine_code & 0xF
-                    return f"{mnemonic} {cond_str}, R{Rtarget}"
-
-        elif instr.fmt == "RS":
-            if opcode == instr.opcode:
-                # RS 格式（例如 STOR）：位15-12: opcode, 11-8: Rsrc, 7-4: ext, 3-0: Raddr
-                Rsrc = (machine_code >> 8) & 0xF
-                ext = (machine_code >> 4) & 0xF
-                if instr.ext is not None and ext == instr.ext:
-                    Raddr = machine_code & 0xF
-                    return f"{mnemonic} R{Rsrc}, R{Raddr}"
-        elif instr.fmt == "IR":
-            if opcode == instr.opcode:
-                # IR 格式（例如 TBITI）：位15-12: opcode, 11-8: Rsrc, 7-0: imm
-                Rsrc = (machine_code >> 8) & 0xF
-                imm = machine_code & 0xFF
-                return f"{mnemonic} R{Rsrc}, 0x{imm:X}"
-    # 如果无法识别，则返回错误信息
-    return f"??? (0x{machine_code:04X})"
+# 磁盘缓存 decode-<mapping_hash>.table 的内容（读取时不执行任何代码）：
+#   第一行     助记符表，空格分隔
+#   65536 × 4 个小端 int16  每个字的 (助记符下标 或 -1, 操作数个数, 操作数0, 操作数1)
+#   其余部分   texts，UTF-8，以换行分隔
+_CACHE_FIELDS = 4
+
+
+def _encode_decode_table(table):
+    names = sorted({mnemonic for mnemonic, _ in table.entries if mnemonic is not None})
+    index = {mnemonic: i for i, mnemonic in enumerate(names)}
+    fields = array("h")
+    for mnemonic, ops in table.entries:
+        fields.extend((index[mnemonic] if mnemonic is not None else -1, len(ops),
+                       *(ops + (0, 0))[:2]))
+    if sys.byteorder == "big":
+        fields.byteswap()
+    return b"".join((" ".join(names).encode("ascii"), b"\n", fields.tobytes(),
+                     "\n".join(table.texts).encode("utf-8")))
+
+
+def _decode_decode_table(data):
+    """解析缓存文件内容；格式不符时抛出 ValueError"""
+    newline = data.index(b"\n")
+    names = [None] + data[:newline].decode("ascii").split()
+    start = newline + 1
+    end = start + 0x10000 * _CACHE_FIELDS * 2
+    fields = array("h")
+    fields.frombytes(data[start:end])
+    if len(fields) != 0x10000 * _CACHE_FIELDS:
+        raise ValueError("truncated decode table")
+    if sys.byteorder == "big":
+        fields.byteswap()
+    texts = data[end:].decode("utf-8").split("\n")
+    if len(texts) != 0x10000:
+        raise ValueError("decode table has the wrong number of texts")
+    entries = []
+    append = entries.append
+    it = iter(fields)
+    for mnemonic, count, a, b in zip(it, it, it, it):
+        if not -1 <= mnemonic < len(names) - 1 or not 0 <= count <= 2:
+            raise ValueError("bad decode table entry")
+        append((names[mnemonic + 1], (a, b)[:count]))
+    return DecodeTable(entries, texts)
+
+
+def load_decode_table(cache_dir):
+    """
+    读取 cache_dir 中的 decode-<mapping_hash>.table；没有或损坏时构建译码表并写入。
+    mapping.py 改变后摘要不同，旧的缓存文件自然不再使用。
+    缓存是普通的数据文件，目录可写的其他用户最多让输出出错，不能借此执行代码。
+    """
+    path = os.path.join(cache_dir, f"decode-{mapping_hash()}.table")
+    try:
+        with open(path, "rb") as f:
+            return _decode_decode_table(f.read())
+    except (OSError, ValueError):
+        pass
+    table = build_decode_table()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_encode_decode_table(table))
+        os.replace(tmp, path)
+    except OSError:
+        pass     # 缓存只是加速，写不进去时照常工作
+    return table
+
+
+def decode_table(cache_dir=None):
+    """返回译码表，进程内只构建（或从 cache_dir 读取）一次"""
+    global _decode_table
+    if _decode_table is None:
+        _decode_table = load_decode_table(cache_dir) if cache_dir else build_decode_table()
+    return _decode_table
 
-def disassemble_file(input_file, output_file):
+
+def disassemble_instruction(machine_code):
     """
-    读取输入文件中的机器码（每行 16 位十六进制数），
-    反汇编后写入输出文件，每行一条汇编指令。
+    根据 16 位机器码反汇编出汇编语句字符串（查译码表）。
+    如果无法识别（包括超出 16 位的值），则返回 "???"。
     """
-    with open(input_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    if 0 <= machine_code <= 0xFFFF:
+        return decode_table().texts[machine_code]
+    return f"??? (0x{machine_code:04X})"
+
+def disassemble_words(words):
+    """反汇编机器码序列（list / array / 任意可迭代的整数），返回汇编行列表"""
+    texts = decode_table().texts
+    return [texts[word] if 0 <= word <= 0xFFFF else disassemble_instruction(word)
+            for word in words]
 
-    assembly_lines = []
-    for line in lines:
+def iter_disassemble_hex(source):
+    """
+    逐行产生 .hex 文本的反汇编结果（生成器，不保留已处理的行）。
+    source 可以是整段文本字符串，或文本行 / 字节行的可迭代对象（已打开的文件、iter_hex_lines）；
+    空行被跳过，无法解析的行输出为 "; Invalid line: ..." 注释。
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+    texts = decode_table().texts
+    for line in source:
         line = line.strip()
         if not line:
             continue
         try:
             machine_code = int(line, 16)
         except ValueError:
-            assembly_lines.append(f"; Invalid line: {line}")
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", "replace")
+            yield f"; Invalid line: {line}"
             continue
-        asm_line = disassemble_instruction(machine_code)
-        assembly_lines.append(asm_line)
+        yield (texts[machine_code] if 0 <= machine_code <= 0xFFFF
+               else disassemble_instruction(machine_code))
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        for asm in assembly_lines:
-            f.write(asm + "\n")
-    print(f"Disassembly completed. {len(assembly_lines)} instructions written to {output_file}.")
+def disassemble_hex(source):
+    """
+    反汇编 .hex 文本，返回汇编行列表，不读写文件、不打印。
+    source 与 iter_disassemble_hex 相同；大文件请用 iter_disassemble_stream / disassemble_stream。
+    """
+    return list(iter_disassemble_hex(source))
+
+# --------------------- 流式反汇编 ---------------------
+
+STREAM_CHUNK = 1 << 20     # 每次读入的字节数
+WRITE_BATCH = 1 << 14      # 每次写出的行数
+
+def _iter_chunks(f, chunk_size):
+    """按固定大小读取二进制文件对象；普通文件用 mmap 映射后按块切片"""
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        mm = None       # 管道、空文件、内存中的流
+    if mm is None:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                return
+            yield data
+    else:
+        with mm:
+            for pos in range(0, len(mm), chunk_size):
+                yield mm[pos:pos + chunk_size]
+
+def iter_hex_lines(f, chunk_size=STREAM_CHUNK):
+    """从二进制文件对象按块读取 .hex 文本，逐个产生字节行（跨块的行拼接后产生）"""
+    tail = b""
+    for data in _iter_chunks(f, chunk_size):
+        lines = (tail + data).split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+def iter_image_words(f, chunk_size=STREAM_CHUNK):
+    """从 IMEM 二进制映像（小端 16 位字，见 src/memimage.py）按块产生 array('H')"""
+    carry = b""
+    for data in _iter_chunks(f, chunk_size):
+        if carry:
+            data = carry + data
+        if len(data) % 2:
+            carry = data[-1:]
+            data = data[:-1]
+        else:
+            carry = b""
+        words = array("H")
+        words.frombytes(data)
+        if sys.byteorder == "big":
+            words.byteswap()
+        yield words
+    if carry:
+        raise ValueError("Image has an odd number of bytes")
+
+def iter_disassemble_stream(f, binary=False, chunk_size=STREAM_CHUNK):
+    """
+    流式反汇编二进制文件对象 f（.hex 文本，binary=True 时为 IMEM 映像），逐行产生结果。
+    每次只在内存中保留一块输入，内存占用与文件大小无关。
+    """
+    if binary:
+        texts = decode_table().texts
+        for words in iter_image_words(f, chunk_size):
+            yield from map(texts.__getitem__, words)
+    else:
+        yield from iter_disassemble_hex(iter_hex_lines(f, chunk_size))
+
+def disassemble_stream(input_file, output_file, binary=None, chunk_size=STREAM_CHUNK,
+                       batch_lines=WRITE_BATCH):
+    """
+    流式反汇编 input_file 并写出 output_file，每 batch_lines 行写一次，返回行数。
+    binary 为 None 时按扩展名判断：.bin 为 IMEM 二进制映像，其余为 .hex 文本。
+    """
+    if binary is None:
+        binary = input_file.lower().endswith(".bin")
+    count = 0
+    with open(input_file, "rb") as f, open(output_file, "w", encoding="utf-8") as out:
+        lines = iter_disassemble_stream(f, binary, chunk_size)
+        while True:
+            batch = list(islice(lines, batch_lines))
+            if not batch:
+                break
+            out.write("\n".join(batch))
+            out.write("\n")
+            count += len(batch)
+    return count
+
+# --------------------- 控制流与标签恢复 ---------------------
+# 线性扫描：
+#   1. 按 BCOND 的位移找出跳转目标，分支之后的指令也是基本块的首条指令
+#   2. 在基本块内跟踪 MOVI / LUI / ORI / ADDI / MOV 装入寄存器的常量，
+#      得到 JCOND / JAL 的目标地址（块首清空，跨块的值视为未知）；
+#      目标成为新的块首后重新扫描，直到块首不再增加
+# 被跳转到的地址得到标签 L_XXXX，BCOND 的位移改写为标签，输出可以重新汇编。
+
+ControlFlow = namedtuple("ControlFlow", ["blocks", "labels", "jump_targets"])
+
+# 不写目的寄存器的 RR / RI 指令（其余 RR / RI / RI4 指令都写第一个操作数）
+_NO_REG_WRITE = {"CMP", "CMPI", "TBIT", "SPR"}
+
+def label_name(addr):
+    return f"L_{addr:04X}"
+
+def _track_jump_targets(decoded, leader):
+    """在每个块首清空常量，按块内装入的常量求出 JCOND / JAL 的目标 {地址: 目标}"""
+    jump_targets = {}
+    consts = [None] * 16
+    for pc, (mnemonic, ops) in enumerate(decoded):
+        if leader[pc]:
+            consts = [None] * 16
+        if mnemonic == "JCOND" or mnemonic == "JAL":
+            value = consts[ops[1]]
+            if value is not None:
+                jump_targets[pc] = value
+        elif mnemonic == "MOVI":
+            consts[ops[0]] = ops[1]
+        elif mnemonic == "LUI":
+            consts[ops[0]] = ops[1] << 8
+        elif mnemonic in ("ORI", "ADDI"):
+            value = consts[ops[0]]
+            if value is not None:
+                value = value | ops[1] if mnemonic == "ORI" else (value + ops[1]) & 0xFFFF
+            consts[ops[0]] = value
+        elif mnemonic == "MOV":
+            consts[ops[0]] = consts[ops[1]]
+        elif mnemonic in _NO_REG_WRITE or mnemonic == "STOR" or mnemonic == "BCOND":
+            pass
+        elif mnemonic is not None and len(ops) == 2:
+            consts[ops[0]] = None
+        else:
+            consts = [None] * 16     # FIX / FIXV / 无法识别：不再假定任何值
+    return jump_targets
+
+def recover_control_flow(words):
+    """
+    由机器码序列构建控制流图，返回 ControlFlow：
+      blocks       : [(首地址, 末地址+1, [后继首地址, ...]), ...]（按地址顺序，目标未知的
+                     JCOND/JAL 没有该后继；程序末尾之外的后继不列出）
+      labels       : {地址: 标签名}，BCOND 和已知目标的 JCOND/JAL 跳转到的地址（可以等于程序长度）
+      jump_targets : {JCOND/JAL 的地址: 目标地址}（由寄存器常量得出）
+    """
+    entries = decode_table().entries
+    decoded = [entries[word] if 0 <= word <= 0xFFFF else (None, ()) for word in words]
+    n = len(decoded)
+    leader = bytearray(n + 1)
+    leader[0] = 1
+    targets = bytearray(n + 1)
+
+    # 第一遍：BCOND 的目标和分支之后的指令
+    for pc, (mnemonic, ops) in enumerate(decoded):
+        if mnemonic == "BCOND":
+            target = pc + 1 + ops[1]
+            if 0 <= target <= n:
+                leader[target] = targets[target] = 1
+            leader[pc + 1] = 1
+        elif mnemonic in ("JCOND", "JAL"):
+            leader[pc + 1] = 1
+
+    # 第二遍：块内常量跟踪，求出 JCOND / JAL 的目标。新找到的目标是汇合点，之前在它前后
+    # 连续跟踪的常量不再可靠，所以加入块首后重新扫描，直到不再出现新的块首。
+    # 块首越多，块内已知的常量只会越少，得到的目标是上一遍的子集，通常扫描两遍即可。
+    while True:
+        jump_targets = _track_jump_targets(decoded, leader)
+        new_leaders = [value for value in jump_targets.values()
+                       if value <= n and not leader[value]]
+        if not new_leaders:
+            break
+        for value in new_leaders:
+            leader[value] = 1
+    for value in jump_targets.values():
+        if value <= n:
+            targets[value] = 1
+
+    # 基本块与后继
+    blocks = []
+    start = 0
+    for pc in range(1, n + 1):
+        if not leader[pc] and pc < n:
+            continue
+        mnemonic, ops = decoded[pc - 1]
+        successors = []
+        conditional = True
+        if mnemonic == "BCOND":
+            if ops[0] != 15:          # NV 从不跳转
+                successors.append(pc + ops[1])
+            conditional = ops[0] != 14
+        elif mnemonic == "JCOND" or mnemonic == "JAL":
+            if pc - 1 in jump_targets:
+                successors.append(jump_targets[pc - 1])
+            conditional = mnemonic == "JCOND" and ops[0] != 14
+        if conditional and pc not in successors:
+            successors.append(pc)
+        blocks.append((start, pc, [t for t in successors if 0 <= t < n]))
+        start = pc
+    labels = {addr: label_name(addr) for addr in range(n + 1) if targets[addr]}
+    return ControlFlow(blocks, labels, jump_targets)
+
+_roundtrip_cache = {}
+
+def _reassembles(word, text):
+    """text 重新汇编后是否得到同一个机器码（例如 RI4 中未使用的位不为 0 时不是）"""
+    result = _roundtrip_cache.get(word)
+    if result is None:
+        try:
+            result = assemble_line_label_aware(text, 0, {}) == [word]
+        except ValueError:
+            result = False
+        _roundtrip_cache[word] = result
+    return result
+
+def disassemble_labeled(words, flow=None):
+    """
+    带标签的反汇编：返回可以交给 assembler 重新汇编的源代码行列表。
+    BCOND 的目标写成标签，已知目标的 JCOND / JAL 加注释 "; -> 标签"，每个基本块前空一行；
+    重新汇编后得到不同机器码的字（无法识别的指令等）写成 ".word 0xNNNN"，反汇编文本放在注释中，
+    因此输出重新汇编后与原映像逐字相同。
+    """
+    if flow is None:
+        flow = recover_control_flow(words)
+    labels = flow.labels
+    jump_targets = flow.jump_targets
+    starts = {start for start, _, _ in flow.blocks}
+    texts = decode_table().texts
+    lines = []
+    for pc, word in enumerate(words):
+        if pc in starts and pc:
+            lines.append("")
+        if pc in labels:
+            lines.append(f"{labels[pc]}:")
+        text = texts[word] if 0 <= word <= 0xFFFF else disassemble_instruction(word)
+        if text.startswith("BCOND"):
+            cond, disp = text[6:].split(", ")
+            target = pc + 1 + int(disp)
+            if target in labels:
+                text = f"BCOND {cond}, {labels[target]}"
+        elif pc in jump_targets:
+            target = jump_targets[pc]
+            text += f"    ; -> {labels.get(target, f'0x{target:04X}')}"
+        if not _reassembles(word, texts[word] if 0 <= word <= 0xFFFF else text):
+            # 原样写出，指令文本只作注释，重新汇编后得到同一个映像
+            text = f".word 0x{word & 0xFFFF:04X}    ; {text}"
+        lines.append(text)
+    if len(words) in labels:
+        lines.append(f"{labels[len(words)]}:")
+    return lines
+
+def _read_words(input_file, binary):
+    """读取整个程序的机器码（带标签的反汇编需要完整的程序）"""
+    if binary:
+        return read_image(input_file, "H")
+    words = array("H")
+    with open(input_file, "rb") as f:
+        for lineno, line in enumerate(iter_hex_lines(f), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                word = int(line, 16)
+            except ValueError:
+                word = -1
+            if not 0 <= word <= 0xFFFF:
+                raise ValueError(f"Line {lineno}: invalid machine code "
+                                 f"{line.decode('utf-8', 'replace')}")
+            words.append(word)
+    return words
+
+def disassemble_file(input_file, output_file, binary=None, labels=False):
+    """
+    读取输入文件中的机器码（每行 16 位十六进制数，或 .bin 二进制映像），
+    反汇编后写入输出文件，每行一条汇编指令（流式处理，见 disassemble_stream）。
+    labels=True 时读入整个程序，输出带标签、可重新汇编的源代码（见 disassemble_labeled）。
+    """
+    if labels:
+        if binary is None:
+            binary = input_file.lower().endswith(".bin")
+        words = _read_words(input_file, binary)
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in disassemble_labeled(words)))
+        count = len(words)
+    else:
+        count = disassemble_stream(input_file, output_file, binary)
+    print(f"Disassembly completed. {count} instructions written to {output_file}.")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: python disassembler.py input.hex output.asm")
+    args = sys.argv[1:]
+    if "--decode-cache" in args:
+        # 译码表缓存目录：之后的运行直接读取，不再重新构建
+        i = args.index("--decode-cache")
+        if i + 1 >= len(args):
+            print("--decode-cache needs a directory")
+            sys.exit(1)
+        decode_table(args[i + 1])
+        del args[i:i + 2]
+    binary = True if "--binary" in args else None
+    labels = "--labels" in args
+    args = [arg for arg in args if arg not in ("--binary", "--labels")]
+    if len(args) != 2:
+        print("Usage: python disassembler.py [--decode-cache DIR] [--binary] [--labels] "
+              "input.hex|input.bin output.asm")
         sys.exit(1)
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    disassemble_file(input_file, output_file)
+    input_file = args[0]
+    output_file = args[1]
+    disassemble_file(input_file, output_file, binary, labels)
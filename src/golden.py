@@ -0,0 +1,187 @@
+# golden.py
+"""
+与黄金跟踪（例如 RTL 仿真导出的写回记录）逐条流式比对。
+
+跟踪文件每行一条记录，空行和 # / ; 开头的注释行被忽略：
+    <pc> R<n> <value>        指令 pc 把 value 写入寄存器 Rn
+    <pc> M<addr> <value>     指令 pc 把 value 写入 DMEM[addr]
+数值可以是十进制或 0x 十六进制，比较时取低 16 位。
+
+    checker = GoldenChecker("rtl_trace.txt")
+    sim.run(golden=checker)
+    if checker.mismatch:
+        print(checker.report(sim))
+
+run() 只包装会写寄存器或 DMEM 的指令，每产生一次写就从文件读下一条记录比对，
+第一次不一致时停止仿真（stop_reason 为 "golden mismatch"）。除了最近 context 条
+记录之外不保留任何历史，内存占用与跟踪长度无关。
+GoldenWriter 用同样的方式把仿真器自身的写回记录写成这种格式。
+"""
+
+from abc import ABC, abstractmethod
+from collections import deque
+
+from src.simulator import OP_LSHI, OP_STOR, REG_WRITE_OPS, STOP_GOLDEN
+
+
+def format_record(record):
+    pc, kind, index, value = record
+    return f"{pc} {kind}{index} 0x{value & 0xFFFF:04X}"
+
+
+def parse_record(line, lineno=None):
+    """解析一行记录为 (pc, "R"/"M", index, value)；空行/注释返回 None"""
+    text = line.strip()
+    if not text or text[0] in "#;":
+        return None
+    parts = text.split()
+    try:
+        pc, target, value = parts
+        kind = target[0].upper()
+        if kind not in "RM":
+            raise ValueError
+        return (int(pc, 0), kind, int(target[1:], 0), int(value, 0) & 0xFFFF)
+    except ValueError:
+        where = f" at line {lineno}" if lineno is not None else ""
+        raise ValueError(f"Invalid golden trace record{where}: {text}") from None
+
+
+class _WriteObserver(ABC):
+    """在 Simulator.run 中为写寄存器/DMEM 的指令包装处理函数，每次写回调用 _event（子类实现）"""
+
+    def instrument(self, sim, code):
+        wrapped = list(code)
+        for pc, (op, a, b) in enumerate(sim.program):
+            handler = code[pc][0]
+            if op in REG_WRITE_OPS and not (op == OP_LSHI and b < 0):
+                wrapped[pc] = (self._wrap_reg(sim, handler, pc), a, b)
+            elif op == OP_STOR:
+                wrapped[pc] = (self._wrap_mem(sim, handler, pc), a, b)
+        return wrapped
+
+    def _wrap_reg(self, sim, handler, pc):
+        event = self._event
+
+        def write_reg(a, b):
+            handler(a, b)
+            event(sim, pc, "R", a, sim.regs[a])
+        return write_reg
+
+    def _wrap_mem(self, sim, handler, pc):
+        event = self._event
+
+        # STOR Rsrc, Rdest：写 DMEM[regs[b]]，地址在执行前取
+        def write_mem(a, b):
+            addr = sim.regs[b] & 0x1FF
+            handler(a, b)
+            event(sim, pc, "M", addr, sim.dmem[addr])
+        return write_mem
+
+    @abstractmethod
+    def _event(self, sim, pc, kind, index, value):
+        """一次写回：kind 为 "R"（寄存器 index）或 "M"（DMEM[index]），value 为写入的值"""
+
+    def finish(self, sim):
+        pass
+
+
+class GoldenWriter(_WriteObserver):
+    """把仿真器的写回记录写到文本流（可作为之后比对用的黄金跟踪）"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def _event(self, sim, pc, kind, index, value):
+        self.stream.write(format_record((pc, kind, index, value)) + "\n")
+        self.count += 1
+
+
+class GoldenChecker(_WriteObserver):
+    def __init__(self, source, context=8):
+        """source 为文件路径或可迭代的文本行（例如已打开的文件、管道）"""
+        self.source = source
+        self.context = deque(maxlen=context)
+        self.checked = 0
+        self.mismatch = None
+        self._lines = None
+        self._lineno = 0
+        self._file = None
+
+    def _next_expected(self):
+        """读取下一条黄金记录，文件结束时返回 None"""
+        if self._lines is None:
+            if isinstance(self.source, str):
+                self._file = open(self.source, "r", encoding="utf-8")
+                self._lines = iter(self._file)
+            else:
+                self._lines = iter(self.source)
+        for line in self._lines:
+            self._lineno += 1
+            record = parse_record(line, self._lineno)
+            if record is not None:
+                return record
+        return None
+
+    def _fail(self, sim, reason, expected, actual):
+        self.mismatch = {
+            "reason": reason,
+            "record": self.checked,
+            "line": self._lineno,
+            "expected": expected,
+            "actual": actual,
+            "context": list(self.context),
+        }
+        if not sim.halt:
+            sim.halt = True
+            sim.stop_reason = STOP_GOLDEN
+            sim.pc += 1
+        self.close()
+
+    def _event(self, sim, pc, kind, index, value):
+        if self.mismatch is not None:
+            return
+        actual = (pc, kind, index, value & 0xFFFF)
+        expected = self._next_expected()
+        if expected is None:
+            self._fail(sim, "golden trace ended", None, actual)
+        elif expected != actual:
+            self._fail(sim, "mismatch", expected, actual)
+        else:
+            self.checked += 1
+            self.context.append(actual)
+
+    def finish(self, sim):
+        """仿真正常结束后调用：黄金跟踪还有剩余记录也算不一致"""
+        if self.mismatch is None and sim.stop_reason != STOP_GOLDEN:
+            expected = self._next_expected()
+            if expected is not None:
+                self.mismatch = {
+                    "reason": "simulation ended early", "record": self.checked,
+                    "line": self._lineno, "expected": expected, "actual": None,
+                    "context": list(self.context),
+                }
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report(self, sim=None):
+        """生成比对结果的文本"""
+        if self.mismatch is None:
+            return f"[GOLDEN] {self.checked} records matched."
+        m = self.mismatch
+        out = [f"[GOLDEN] {m['reason']} after {m['record']} matching records "
+               f"(golden trace line {m['line']})"]
+        for label in ("expected", "actual"):
+            record = m[label]
+            text = format_record(record) if record is not None else "(none)"
+            if record is not None and sim is not None and 0 <= record[0] < len(sim.program):
+                text += f"    ; {sim.source_line(record[0])}"
+            out.append(f"  {label + ':':<10}{text}")
+        if m["context"]:
+            out.append("  previous records:")
+            out.extend(f"    {format_record(record)}" for record in m["context"])
+        return "\n".join(out)
@@ -0,0 +1,170 @@
+# hooks.py
+"""
+断点、DMEM 观察点和事件回调。
+
+    sim.hooks.add_breakpoint(12)                          # 执行 PC 12 之前停下
+    sim.hooks.add_watchpoint(0x40, on_access, read=False)  # 写 DMEM[0x40] 后回调
+    sim.hooks.on_register_write(on_write, regs=[1, 2])
+    sim.hooks.on_branch(on_taken)
+    sim.run()          # 停下后 sim.stop_reason 为 "breakpoint" / "hook"
+    sim.run()          # 从停下的位置继续
+
+回调签名（返回真值表示停止仿真）：
+  - 断点       callback(sim, pc)                         在指令执行之前
+  - 观察点     callback(sim, pc, addr, value, is_write)  LOAD/STOR 执行之后
+  - 寄存器写   callback(sim, pc, reg, old, new)          指令执行之后
+  - 跳转       callback(sim, pc, target)                 分支/跳转实际跳转之后
+
+run() 开始时只为需要的指令包装处理函数（断点所在的 PC、LOAD/STOR、写被观察寄存器的指令、
+可能跳转的分支），其余指令的分派路径不变；没有注册任何回调时完全不做包装。
+"""
+
+from src.simulator import (
+    OP_LSHI, OP_LOAD, OP_STOR, OP_BCOND, OP_JAL,
+    REG_WRITE_OPS, STOP_BREAKPOINT, STOP_HOOK,
+)
+
+NEVER = 15  # 条件码 NV：永不跳转
+
+
+def _stop_after(sim):
+    """指令执行完之后停下：PC 指向下一条指令，继续 run 时从那里开始"""
+    if not sim.halt:
+        sim.halt = True
+        sim.stop_reason = STOP_HOOK
+        sim.pc += 1
+
+
+class HookSet:
+    def __init__(self):
+        self.breakpoints = {}      # pc -> [callback 或 None]
+        self.read_watches = {}     # addr -> [callback]
+        self.write_watches = {}    # addr -> [callback]
+        self.reg_watches = {}      # reg -> [callback]
+        self.branch_hooks = []
+
+    def __bool__(self):
+        return bool(self.breakpoints or self.read_watches or self.write_watches
+                    or self.reg_watches or self.branch_hooks)
+
+    # --------------------- 注册 ---------------------
+
+    def add_breakpoint(self, pc, callback=None):
+        """callback 为 None 时无条件停下"""
+        self.breakpoints.setdefault(pc, []).append(callback)
+
+    def remove_breakpoint(self, pc):
+        self.breakpoints.pop(pc, None)
+
+    def add_watchpoint(self, addr, callback, read=True, write=True):
+        addr &= 0x1FF
+        if read:
+            self.read_watches.setdefault(addr, []).append(callback)
+        if write:
+            self.write_watches.setdefault(addr, []).append(callback)
+
+    def on_register_write(self, callback, regs=None):
+        for reg in range(16) if regs is None else regs:
+            self.reg_watches.setdefault(reg, []).append(callback)
+
+    def on_branch(self, callback):
+        self.branch_hooks.append(callback)
+
+    def clear(self):
+        self.__init__()
+
+    # --------------------- 包装处理函数 ---------------------
+
+    def instrument(self, sim, code, resume_pc=None):
+        """
+        返回包装后的 code 列表（与 Simulator.run 中的 [(handler, a, b), ...] 同形）。
+        resume_pc 为上次停在断点的 PC：第一次执行它时跳过断点检查。
+        """
+        code = list(code)
+        for pc, (op, a, b) in enumerate(sim.program):
+            handler = code[pc][0]
+            if op in REG_WRITE_OPS and a in self.reg_watches and not (op == OP_LSHI and b < 0):
+                handler = self._wrap_reg_write(sim, handler, pc, self.reg_watches[a])
+            if op == OP_LOAD and self.read_watches:
+                handler = self._wrap_access(sim, handler, pc, self.read_watches, False)
+            elif op == OP_STOR and self.write_watches:
+                handler = self._wrap_access(sim, handler, pc, self.write_watches, True)
+            elif (self.branch_hooks and OP_BCOND <= op <= OP_JAL
+                  and not (op != OP_JAL and a == NEVER)):
+                handler = self._wrap_branch(sim, handler, pc, op)
+            if pc in self.breakpoints:
+                inner = handler
+                handler = self._wrap_breakpoint(sim, handler, pc, self.breakpoints[pc])
+                if pc == resume_pc:
+                    handler = self._resume_once(code, pc, inner, handler)
+            code[pc] = (handler, a, b)
+        return code
+
+    @staticmethod
+    def _resume_once(code, pc, inner, handler):
+        """从断点继续时，第一次执行该指令不再检查断点，之后恢复断点"""
+        def resume(a, b):
+            code[pc] = (handler, a, b)
+            inner(a, b)
+        return resume
+
+    @staticmethod
+    def _wrap_breakpoint(sim, handler, pc, callbacks):
+        def run_breakpoint(a, b):
+            for callback in callbacks:
+                if callback is None or callback(sim, pc):
+                    sim.halt = True
+                    sim.stop_reason = STOP_BREAKPOINT
+                    # 指令没有执行，抵消主循环的计数
+                    sim.steps -= 1
+                    return
+            handler(a, b)
+        return run_breakpoint
+
+    @staticmethod
+    def _wrap_access(sim, handler, pc, watches, is_write):
+        # LOAD Rdest, Rsrc / STOR Rsrc, Rdest：地址寄存器都是 b，在执行之前取地址
+        def run_access(a, b):
+            addr = sim.regs[b] & 0x1FF
+            handler(a, b)
+            callbacks = watches.get(addr)
+            if callbacks:
+                value = sim.dmem[addr] if is_write else sim.regs[a]
+                stop = False
+                for callback in callbacks:
+                    if callback(sim, pc, addr, value, is_write):
+                        stop = True
+                if stop:
+                    _stop_after(sim)
+        return run_access
+
+    @staticmethod
+    def _wrap_reg_write(sim, handler, pc, callbacks):
+        def run_reg_write(a, b):
+            old = sim.regs[a]
+            handler(a, b)
+            new = sim.regs[a]
+            stop = False
+            for callback in callbacks:
+                if callback(sim, pc, a, old, new):
+                    stop = True
+            if stop:
+                _stop_after(sim)
+        return run_reg_write
+
+    def _wrap_branch(self, sim, handler, pc, op):
+        callbacks = self.branch_hooks
+        check = sim.check_condition
+
+        def run_branch(a, b):
+            taken = op == OP_JAL or check(a)
+            handler(a, b)
+            if taken:
+                target = sim.pc + 1
+                stop = False
+                for callback in callbacks:
+                    if callback(sim, pc, target):
+                        stop = True
+                if stop:
+                    _stop_after(sim)
+        return run_branch
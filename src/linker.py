@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+链接器：把多个可重定位目标文件（见 src/objfile.py）按顺序拼接成一个程序。
+
+用法：
+    python -m src.linker prog.hex main.asm lib/math.asm lib/io.o -j 4 --obj-dir output/obj
+
+输入可以是 .asm（需要时先汇编成 .o）或现成的 .o；第一个模块从地址 0 开始。
+.asm 对应的 .o 比源文件新时直接使用，不重新汇编；需要汇编的模块在进程池中并行汇编。
+输出文件以 .bin 结尾时写 IMEM 二进制映像，否则写 .hex。
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from src.assembler import write_hex_file
+from src.memimage import write_image
+from src.objfile import (
+    RELOC_BCOND, RELOC_LO8, RELOC_HI8, assemble_object, read_object, write_object,
+)
+
+
+def link(modules):
+    """
+    链接 ObjectModule 列表，返回 (机器码 array('H'), 全局符号表 {名称: 地址})。
+    重复导出、未定义的导入或超出 BCOND 范围（-128..127）的位移抛出 ValueError。
+    """
+    bases = []
+    symbols = {}
+    owner = {}
+    base = 0
+    for module in modules:
+        bases.append(base)
+        for name, offset in module.exports.items():
+            if name in symbols:
+                raise ValueError(f"Symbol {name} exported by both {owner[name]} and {module.name}")
+            symbols[name] = base + offset
+            owner[name] = module.name
+        base += len(module.words)
+
+    missing = [f"{name} (used in {module.name})" for module in modules
+               for name in module.imports if name not in symbols]
+    if missing:
+        raise ValueError(f"Undefined symbols: {', '.join(missing)}")
+
+    words = array("H")
+    for module in modules:
+        words.extend(module.words)
+    for module, base in zip(modules, bases):
+        for offset, kind, symbol, addend in module.relocations:
+            value = (base if symbol is None else symbols[symbol]) + addend
+            at = base + offset
+            if kind == RELOC_BCOND:
+                field = value - (at + 1)
+                if not -128 <= field <= 127:
+                    raise ValueError(f"{module.name}: BCOND to {symbol} at offset {offset} "
+                                     f"is out of range ({field})")
+            elif kind == RELOC_LO8:
+                field = value
+            elif kind == RELOC_HI8:
+                field = value >> 8
+            words[at] = (words[at] & 0xFF00) | (field & 0xFF)
+    return words, symbols
+
+
+def object_path(source, obj_dir=None):
+    """
+    source 对应的 .o 路径：未给出 obj_dir 时与源文件放在一起；
+    给出时为 obj_dir/<文件名>-<源文件目录绝对路径摘要>.o，不同目录下的同名源文件
+    （lib/util.asm 与 app/util.asm）不会共用一个 .o。
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    if not obj_dir:
+        return os.path.join(os.path.dirname(source), stem + ".o")
+    directory = os.path.abspath(os.path.dirname(source))
+    digest = hashlib.sha256(directory.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(obj_dir, f"{stem}-{digest}.o")
+
+
+def is_up_to_date(source, obj):
+    return os.path.exists(obj) and os.path.getmtime(obj) >= os.path.getmtime(source)
+
+
+def assemble_to_object(source, obj):
+    """汇编一个源文件并写出 .o（在工作进程中执行）"""
+    with open(source, "r", encoding="utf-8") as f:
+        module = assemble_object(f, os.path.splitext(os.path.basename(source))[0], source)
+    write_object(obj, module)
+    return obj
+
+
+def build(inputs, output, workers=None, obj_dir=None):
+    """
+    汇编（只汇编过期的模块，可并行）并链接 inputs，写出 output。
+    返回 (机器码, 全局符号表, 本次重新汇编的源文件列表)。
+    两个输入对应同一个 .o（例如同一个源文件给出两次）时抛出 ValueError。
+    """
+    if obj_dir:
+        os.makedirs(obj_dir, exist_ok=True)
+    objects = []
+    stale = []
+    seen = {}
+    for path in inputs:
+        obj = path if path.lower().endswith(".o") else object_path(path, obj_dir)
+        key = os.path.normcase(os.path.abspath(obj))
+        if key in seen:
+            raise ValueError(f"{path} and {seen[key]} both use object file {obj}")
+        seen[key] = path
+        objects.append(obj)
+        if obj != path and not is_up_to_date(path, obj):
+            stale.append((path, obj))
+
+    if workers == 1 or len(stale) <= 1:
+        for source, obj in stale:
+            assemble_to_object(source, obj)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            list(executor.map(assemble_to_object, *zip(*stale)))
+
+    words, symbols = link([read_object(obj) for obj in objects])
+    if output.lower().endswith(".bin"):
+        write_image(output, words, "H")
+    else:
+        write_hex_file(output, words)
+    return words, symbols, [source for source, _ in stale]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assemble modules and link them into one program")
+    parser.add_argument("output", help="linked program (.hex, or .bin for an IMEM image)")
+    parser.add_argument("inputs", nargs="+", help=".asm sources and/or .o object files")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of assembler processes (default: CPU count)")
+    parser.add_argument("--obj-dir", default=None,
+                        help="directory for .o files (default: next to each source)")
+    args = parser.parse_args()
+
+    try:
+        words, _, assembled = build(args.inputs, args.output, args.workers, args.obj_dir)
+    except (OSError, ValueError) as e:
+        print(f"Link failed: {e}")
+        sys.exit(1)
+    print(f"Link completed. {len(words)} instructions from {len(args.inputs)} modules "
+          f"({len(assembled)} assembled) written to {args.output}.")
+
+if __name__ == '__main__':
+    main()
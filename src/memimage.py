@@ -0,0 +1,58 @@
+# memimage.py
+"""
+DMEM / IMEM 二进制映像文件：每个字 16 位、小端，无文件头。
+
+read_image 有两种方式：
+  - share=False : 读入一个新的 array（typecode 'h' 为 DMEM，'H' 为 IMEM），不足部分补 0
+  - share=True  : 用 mmap 的写时复制（ACCESS_COPY）映射文件，返回 memoryview；
+                  多个进程映射同一个初始映像时共享物理页，只有被写到的页才会复制，
+                  对映像的修改不会写回文件
+write_image 把整个存储器一次性写出。
+"""
+
+import mmap
+import sys
+from array import array
+
+
+def read_image(path, typecode="h", words=None, share=False):
+    """读取映像；words 给定时要求（映射）或补齐（读入）到该字数"""
+    if share and sys.byteorder == "little":
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if words is not None and len(mm) != 2 * words:
+            size = len(mm)
+            mm.close()
+            raise ValueError(f"Image {path} is {size} bytes, expected {2 * words}")
+        if len(mm) % 2:
+            mm.close()
+            raise ValueError(f"Image {path} has an odd number of bytes")
+        # 映射对象由 memoryview 持有，随最后一个引用一起释放
+        return memoryview(mm).cast(typecode)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) % 2:
+        raise ValueError(f"Image {path} has an odd number of bytes")
+    if words is not None and len(data) > 2 * words:
+        raise ValueError(f"Image {path} is {len(data)} bytes, expected at most {2 * words}")
+    image = array(typecode)
+    image.frombytes(data)
+    if sys.byteorder == "big":
+        image.byteswap()
+    if words is not None and len(image) < words:
+        image.extend([0] * (words - len(image)))
+    return image
+
+
+def write_image(path, words, typecode="h"):
+    """把 words（list / array / memoryview）一次写成小端映像文件"""
+    if isinstance(words, memoryview) and sys.byteorder == "little":
+        data = words.cast("B")
+    else:
+        image = array(typecode, words)
+        if sys.byteorder == "big":
+            image.byteswap()
+        data = image.tobytes()
+    with open(path, "wb") as f:
+        f.write(data)
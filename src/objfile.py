@@ -0,0 +1,142 @@
+# objfile.py
+"""
+可重定位目标文件（.o）：把一个源文件单独汇编成从地址 0 开始的代码，由 src/linker.py 链接。
+
+源文件中：
+  - .global NAME[, NAME...]   导出标签（其余标签只在本模块内可见）
+  - BCOND cond, NAME          NAME 不是本模块的标签时作为导入符号，链接时填入位移
+  - MOVI/ORI/ADDI... Rd, NAME  地址常量：链接时填入 NAME 地址的低 8 位
+  - LUI Rd, NAME               地址常量：链接时填入 NAME 地址的高 8 位
+    （16 位地址用 LUI Rd, NAME 加 ORI Rd, NAME 组合，然后 JCOND/JAL 跳转到 Rd）
+本模块内的 BCOND 标签与普通汇编相同直接算出位移，不需要重定位。
+
+文件内容为 JSON：
+    {"format": "eecs427-obj", "version": 1, "name", "source",
+     "words": [...], "exports": {名称: 偏移}, "imports": [名称],
+     "relocations": [[偏移, "BCOND"|"LO8"|"HI8", 符号或 null, 加数], ...],
+     "lines": [源行号, ...]}
+重定位的值为 符号地址 + 加数；符号为 null 时表示本模块内的地址（模块基址 + 加数）。
+"""
+
+import json
+import re
+
+from src.assemble_passes import first_pass, assemble_line_label_aware, parse_immediate
+from src.assembler import _source_lines
+from src.mapping import instruction_set
+
+OBJECT_FORMAT = "eecs427-obj"
+OBJECT_VERSION = 1
+
+RELOC_BCOND = "BCOND"
+RELOC_LO8 = "LO8"
+RELOC_HI8 = "HI8"
+RELOC_KINDS = (RELOC_BCOND, RELOC_LO8, RELOC_HI8)
+
+_split_tokens = re.compile(r'[,\s]+').split
+
+
+class ObjectModule:
+    def __init__(self, name, words, exports=None, imports=None, relocations=None,
+                 lines=None, source=None):
+        self.name = name
+        self.words = list(words)
+        self.exports = dict(exports or {})          # 名称 -> 模块内偏移
+        self.imports = list(imports or [])
+        self.relocations = [tuple(r) for r in relocations or []]
+        self.lines = list(lines or [])               # 偏移 -> 源文件行号
+        self.source = source
+
+    def to_dict(self):
+        return {
+            "format": OBJECT_FORMAT, "version": OBJECT_VERSION,
+            "name": self.name, "source": self.source,
+            "words": self.words, "exports": self.exports, "imports": self.imports,
+            "relocations": [list(r) for r in self.relocations], "lines": self.lines,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != OBJECT_FORMAT or data.get("version") != OBJECT_VERSION:
+            raise ValueError(f"Not an {OBJECT_FORMAT} v{OBJECT_VERSION} object file")
+        for offset, kind, _, _ in data["relocations"]:
+            if kind not in RELOC_KINDS or not 0 <= offset < len(data["words"]):
+                raise ValueError(f"Invalid relocation in {data['name']}: {kind} at {offset}")
+        return cls(data["name"], data["words"], data["exports"], data["imports"],
+                   data["relocations"], data.get("lines"), data.get("source"))
+
+
+def write_object(path, module):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(module.to_dict(), f, indent=1)
+
+
+def read_object(path):
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Object file {path} is not valid JSON: {e}") from None
+    return ObjectModule.from_dict(data)
+
+
+def _is_number(token):
+    try:
+        parse_immediate(token)
+    except ValueError:
+        return False
+    return True
+
+
+def assemble_object(source, name="module", source_path=None):
+    """
+    把一个模块汇编成 ObjectModule（不读写文件）。
+    source 可以是字符串、文本行的可迭代对象或已打开的文件对象。
+    """
+    lines = list(_source_lines(source))
+    exports = []
+    for i, line in enumerate(lines):
+        raw = line.split(";")[0].strip()
+        tokens = _split_tokens(raw)
+        if tokens[0].lower() == ".global":
+            names = [n for n in tokens[1:] if n]
+            if not names:
+                raise ValueError(f"Line {i + 1}: .global needs at least one symbol")
+            exports.extend(n.upper() for n in names)
+            lines[i] = ""     # 保留行号
+
+    line_map = []
+    symbols, processed = first_pass(lines, line_map)
+    words = []
+    imports = []
+    relocations = []
+    for addr, text in processed:
+        tokens = _split_tokens(text.split(";")[0].strip())
+        instr = instruction_set.get(tokens[0].upper())
+        if instr is not None and len(tokens) == 3 and not _is_number(tokens[2]):
+            target = tokens[2].upper()
+            relocation = None
+            if instr.fmt == "Bcond" and target not in symbols:
+                relocation = (addr, RELOC_BCOND, target, 0)
+            elif instr.fmt == "RI":
+                kind = RELOC_HI8 if tokens[0].upper() == "LUI" else RELOC_LO8
+                if target in symbols:
+                    relocation = (addr, kind, None, symbols[target])
+                else:
+                    relocation = (addr, kind, target, 0)
+            if relocation is not None:
+                relocations.append(relocation)
+                if relocation[2] is not None and relocation[2] not in imports:
+                    imports.append(relocation[2])
+                # 占位为 0，链接时填入
+                text = f"{tokens[0]} {tokens[1]}, 0"
+        try:
+            words.extend(assemble_line_label_aware(text, addr, symbols))
+        except ValueError as e:
+            raise ValueError(f"Line {line_map[addr]}: {e}") from None
+
+    missing = [n for n in exports if n not in symbols]
+    if missing:
+        raise ValueError(f"Exported symbols not defined: {', '.join(missing)}")
+    return ObjectModule(name, words, {n: symbols[n] for n in exports}, imports,
+                        relocations, line_map, source_path)
@@ -0,0 +1,146 @@
+# profiler.py
+"""
+按 PC 统计的执行剖析器（可选，默认关闭）。
+
+    prof = Profiler(load_source_map("output/prog.map"))
+    sim.run(profiler=prof)
+    print(prof.report(sim))
+
+计数保存在预分配的 array 中：每个 PC 的执行次数、每条分支的跳转次数
+（未跳转次数 = 执行次数 - 跳转次数），以及按助记符汇总的次数。
+源文件行号和标签来自汇编器输出的 .map 旁路文件（assembler.py 的第三个参数）。
+"""
+
+import json
+from array import array
+from bisect import bisect_right
+
+from src.simulator import MNEMONICS, OP_BCOND, OP_JAL
+
+# 伪操作码在汇总中的名称（与 OP_SYNTAX/OP_UNSUPPORTED/OP_ERROR 顺序一致）
+OP_NAMES = MNEMONICS + ("<syntax>", "<unsupported>", "<error>")
+
+
+def load_source_map(map_path):
+    """读取汇编器生成的 .map 文件：{"source", "symbols": {标签: 地址}, "lines": [行号]}"""
+    with open(map_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Profiler:
+    def __init__(self, source_map=None):
+        self.source_map = source_map
+        self.counts = array('Q')
+        self.taken = array('Q')
+        self.op_counts = array('Q', bytes(8 * len(OP_NAMES)))
+        self._labels = []
+        self._label_addrs = []
+        if source_map:
+            # 同一地址上有多个标签时取第一个
+            by_addr = {}
+            for name, addr in source_map.get("symbols", {}).items():
+                by_addr.setdefault(addr, name)
+            self._label_addrs = sorted(by_addr)
+            self._labels = [by_addr[addr] for addr in self._label_addrs]
+
+    def prepare(self, size):
+        """为 size 条指令分配计数数组；大小不变时继续累加（多次 run）"""
+        if len(self.counts) != size:
+            self.counts = array('Q', bytes(8 * size))
+            self.taken = array('Q', bytes(8 * size))
+
+    def finish(self, program):
+        """运行结束后按操作码汇总"""
+        op_counts = array('Q', bytes(8 * len(OP_NAMES)))
+        for (op, _, _), count in zip(program, self.counts):
+            op_counts[op] += count
+        self.op_counts = op_counts
+
+    # --------------------- 查询 ---------------------
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def not_taken(self, pc):
+        return self.counts[pc] - self.taken[pc]
+
+    def source_line(self, pc):
+        """pc 对应的源文件行号（没有映射时为 None）"""
+        if self.source_map:
+            lines = self.source_map.get("lines", [])
+            if 0 <= pc < len(lines):
+                return lines[pc]
+        return None
+
+    def label(self, pc):
+        """pc 所在位置的符号名：正好是标签地址时为 LABEL，否则为 LABEL+偏移"""
+        i = bisect_right(self._label_addrs, pc) - 1
+        if i < 0:
+            return None
+        offset = pc - self._label_addrs[i]
+        return self._labels[i] if offset == 0 else f"{self._labels[i]}+{offset}"
+
+    def location(self, pc, end=None):
+        """用于报告的位置描述；给出 end 时描述 PC 区间 [pc, end]"""
+        parts = []
+        label = self.label(pc)
+        if label:
+            parts.append(f"label {label}")
+        lineno = self.source_line(pc)
+        if lineno is not None:
+            parts.append(f"source line {lineno}")
+        parts.append(f"PC {pc}" if end is None else f"PC {pc}-{end}")
+        return ", ".join(parts)
+
+    def loops(self, program):
+        """
+        由向后跳转且确实跳转过的分支识别循环：[(head, tail, cycles), ...]，
+        cycles 为循环体 [head, tail] 内所有指令的执行次数，按 cycles 降序。
+        JCOND/JAL 的目标在运行时才知道，这里只考虑 BCOND。
+        """
+        counts = self.counts
+        found = []
+        for pc, (op, _, disp) in enumerate(program):
+            if op == OP_BCOND and disp < 0 and self.taken[pc]:
+                head = max(pc + disp + 1, 0)
+                found.append((head, pc, sum(counts[head:pc + 1])))
+        found.sort(key=lambda loop: -loop[2])
+        return found
+
+    def report(self, sim, top=10):
+        """生成文本报告（sim 用于取指令文本）"""
+        program = sim.program
+        total = self.total or 1
+        out = ["", "----- Profile -----", f"Instructions executed: {self.total}"]
+
+        loops = self.loops(program)
+        if loops:
+            out.append("Loops:")
+            for head, tail, cycles in loops:
+                out.append(f"  loop at {self.location(head, tail)}, {100.0 * cycles / total:.1f}% of cycles")
+
+        out.append("Hot instructions:")
+        hot = sorted(range(len(self.counts)), key=lambda pc: -self.counts[pc])[:top]
+        for pc in hot:
+            count = self.counts[pc]
+            if not count:
+                break
+            out.append(f"  {count:>10}  {100.0 * count / total:5.1f}%  {sim.source_line(pc):<20}"
+                       f"  ({self.location(pc)})")
+
+        branches = [pc for pc, (op, _, _) in enumerate(program)
+                    if OP_BCOND <= op <= OP_JAL and self.counts[pc]]
+        if branches:
+            out.append("Branches:")
+            for pc in branches:
+                out.append(f"  taken {self.taken[pc]:>8}  not taken {self.not_taken(pc):>8}"
+                           f"  {sim.source_line(pc):<20}  ({self.location(pc)})")
+
+        out.append("By mnemonic:")
+        for op in sorted(range(len(OP_NAMES)), key=lambda op: -self.op_counts[op]):
+            count = self.op_counts[op]
+            if not count:
+                break
+            out.append(f"  {OP_NAMES[op]:<14}{count:>10}  {100.0 * count / total:5.1f}%")
+        return "\n".join(out)
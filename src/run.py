@@ -1,14 +1,39 @@
 #!/usr/bin/env python
-import subprocess
+import argparse
 import sys
 import os
 
+# 以脚本方式运行（python3 ./src/run.py）时也能导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.assembler import assemble, print_report, write_hex_file, write_map_file
+from src.disassembler import disassemble_labeled, disassemble_words
+from src.simulator import Simulator
+from src.trace import TraceWriter
+
 def main():
-    if len(sys.argv) < 2:
-        print("用法: python run.py <inputfile>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="汇编并仿真一个 EECS 427 汇编程序")
+    parser.add_argument("input_file", help="输入的 .asm 文件")
+    parser.add_argument("--hex", action="store_true",
+                        help="把机器码写到 <name>.hex（仿真本身直接使用内存中的机器码）")
+    parser.add_argument("--disasm", action="store_true",
+                        help="额外生成反汇编文件 <name>_no_label.asm")
+    parser.add_argument("--labels", action="store_true",
+                        help="额外生成带恢复标签、可重新汇编的反汇编文件 <name>_labels.asm")
+    parser.add_argument("--map", action="store_true",
+                        help="把符号表/行号映射写到 <name>.map")
+    parser.add_argument("--optimize", action="store_true",
+                        help="汇编时运行窥孔优化并列出所做的修改")
+    parser.add_argument("--trace", default="full",
+                        choices=["silent", "summary", "branches", "full"],
+                        help="仿真跟踪级别（默认 full）")
+    parser.add_argument("--engine", default="interp", choices=["interp", "block"],
+                        help="仿真执行引擎：逐条解释或基本块翻译（默认 interp）")
+    parser.add_argument("--profile", action="store_true",
+                        help="输出按 PC/源代码行/标签统计的执行剖析")
+    args = parser.parse_args()
 
-    input_file = sys.argv[1]
+    input_file = args.input_file
 
     # 提取基础文件名，不包含目录和扩展名
     base_name = os.path.splitext(os.path.basename(input_file))[0]
@@ -20,34 +45,48 @@ def main():
     # 构造输出文件路径
     hex_file = os.path.join(output_dir, f"{base_name}.hex")
     asm_file = os.path.join(output_dir, f"{base_name}_no_label.asm")
+    labeled_file = os.path.join(output_dir, f"{base_name}_labels.asm")
     sim_output = os.path.join(output_dir, f"{base_name}.out")
+    map_file = os.path.join(output_dir, f"{base_name}.map")
 
     try:
-        # 调用汇编器
+        # 汇编：各阶段之间直接在内存中传递机器码，中间文件只在指定时写出
         print("Running assembler...")
-        subprocess.run(
-            ["python3", "-m", "src.assembler", input_file, hex_file],
-            check=True
-        )
-
-        # 调用反汇编器
-        print("Running disassembler...")
-        subprocess.run(
-            ["python3", "-m", "src.disassembler", hex_file, asm_file],
-            check=True
-        )
-
-        # 调用仿真器，输出重定向到 simulation.out 文件
+        source_map = {"source": input_file}
+        report = []
+        with open(input_file, "r", encoding="utf-8") as f:
+            words = assemble(f, source_map, optimize=args.optimize, report=report)
+        print_report(report)
+        if args.hex:
+            write_hex_file(hex_file, words)
+        if args.map:
+            write_map_file(map_file, source_map)
+
+        # 反汇编只用于人工查看，仿真器不依赖它
+        if args.disasm:
+            print("Running disassembler...")
+            with open(asm_file, "w", encoding="utf-8") as f:
+                f.write("".join(asm + "\n" for asm in disassemble_words(words)))
+        if args.labels:
+            with open(labeled_file, "w", encoding="utf-8") as f:
+                f.write("".join(asm + "\n" for asm in disassemble_labeled(words)))
+
+        # 仿真器直接执行机器码，输出写到 <name>.out 文件
         print("Running simulator...")
-        with open(sim_output, "w") as f:
-            subprocess.run(
-                ["python3", "./src/simulator.py", asm_file],
-                check=True,
-                stdout=f
-            )
+        with open(sim_output, "w", encoding="utf-8") as out:
+            sim = Simulator(trace=args.trace, trace_sink=TraceWriter(out))
+            sim.load_words(words)
+            profiler = None
+            if args.profile:
+                from src.profiler import Profiler
+                profiler = Profiler(source_map)
+            sim.run(engine=args.engine, profiler=profiler)
+            if profiler is not None:
+                sim.trace_sink.line(profiler.report(sim))
+                sim.trace_sink.flush()
 
         print("所有步骤执行完成！")
-    except subprocess.CalledProcessError as e:
+    except (OSError, ValueError) as e:
         print("执行过程中出错：", e)
         sys.exit(1)
 
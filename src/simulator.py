@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 EECS 427 Processor Simulator (Prototype)
-- IMEM  : asm lines stored in a list
+- IMEM  : asm lines stored in a list, or 16-bit machine words loaded
+          from a .hex file; both are pre-decoded at load time
 - DMEM  : 512 x 16-bit signed
 - RegFile: 16 x 16-bit signed
 - PSR   : flags F, N, Z  (Overflow, Negative, Zero)
@@ -11,8 +12,19 @@ EECS 427 Processor Simulator (Prototype)
   2) WAIT encountered
 """
 
+import argparse
+import os
 import sys
 import re
+import struct
+import time
+from array import array
+
+from src.mapping import instruction_set
+from src.disassembler import disassemble_instruction
+from src.memimage import read_image, write_image
+from src.trace import (TRACE_SUMMARY, TRACE_BRANCHES, TRACE_FULL,
+                       TRACE_LEVELS, TraceWriter, parse_trace_level)
 
 # 定义条件码助记符与数字的映射
 cond_map = {
@@ -34,8 +46,251 @@ cond_map = {
     "NV": 15   # Never Jump: 不跳
 }
 
+# 条件码数字 -> 助记符（用于调试输出）
+cond_names = {val: name for name, val in cond_map.items()}
+
+# 条件码判断表：下标为条件码 0..15，参数为 Simulator 实例
+COND_TESTS = (
+    lambda s: s.flagZ,                          # EQ
+    lambda s: not s.flagZ,                      # NE
+    lambda s: s.flagC,                          # CS
+    lambda s: not s.flagC,                      # CC
+    lambda s: s.flagL,                          # HI
+    lambda s: not s.flagL,                      # LS
+    lambda s: s.flagN,                          # GT
+    lambda s: not s.flagN,                      # LE
+    lambda s: s.flagF,                          # FS
+    lambda s: not s.flagF,                      # FC
+    lambda s: (not s.flagL) and (not s.flagZ),  # LO
+    lambda s: s.flagL or s.flagZ,               # HS
+    lambda s: (not s.flagN) and (not s.flagZ),  # LT
+    lambda s: s.flagN or s.flagZ,               # GE
+    lambda s: True,                             # UC
+    lambda s: False,                            # NV
+)
+
+# ---------------- 预解码指令流 ----------------
+# 每条指令在装载时被解码为 (op, a, b) 三元组，op 为下面的操作码编号，
+# a/b 为整数操作数（寄存器号、立即数、条件码或位移）。
+MNEMONICS = (
+    "WAIT",
+    "ADD", "SUB", "CMP", "AND", "OR", "XOR", "MOV",
+    "ADDI", "SUBI", "CMPI", "ANDI", "ORI", "XORI", "MOVI",
+    "LSH", "LSHI", "LUI",
+    "LOAD", "STOR",
+    "BCOND", "JCOND", "JAL",
+)
+(OP_WAIT,
+ OP_ADD, OP_SUB, OP_CMP, OP_AND, OP_OR, OP_XOR, OP_MOV,
+ OP_ADDI, OP_SUBI, OP_CMPI, OP_ANDI, OP_ORI, OP_XORI, OP_MOVI,
+ OP_LSH, OP_LSHI, OP_LUI,
+ OP_LOAD, OP_STOR,
+ OP_BCOND, OP_JCOND, OP_JAL) = range(len(MNEMONICS))
+
+# 非指令的伪操作：语法错误 / 不支持的指令 / 操作数解析失败
+# 它们在执行到时才报告，与逐行解释时的行为保持一致
+OP_SYNTAX = len(MNEMONICS)
+OP_UNSUPPORTED = OP_SYNTAX + 1
+OP_ERROR = OP_SYNTAX + 2
+
+OPCODES = {name: op for op, name in enumerate(MNEMONICS)}
+
+# 以 a 为目的寄存器的指令（LSHI 的负移位实际不写寄存器）；STOR 写 DMEM[regs[b]]
+REG_WRITE_OPS = frozenset((
+    OP_ADD, OP_SUB, OP_AND, OP_OR, OP_XOR, OP_MOV,
+    OP_ADDI, OP_SUBI, OP_ANDI, OP_ORI, OP_XORI, OP_MOVI,
+    OP_LSH, OP_LSHI, OP_LUI, OP_LOAD, OP_JAL,
+))
+
+# 可选的执行引擎：逐条解释 / 基本块翻译
+ENGINES = ("interp", "block")
+
+# 结束原因（Simulator.stop_reason）
+STOP_OUT_OF_RANGE = "pc out of range"
+STOP_HALT = "halt"
+STOP_MAX_STEPS = "max steps"
+STOP_TIMEOUT = "timeout"
+STOP_IDLE = "idle loop"
+STOP_BREAKPOINT = "breakpoint"
+STOP_HOOK = "hook"
+STOP_GOLDEN = "golden mismatch"
+# 设置 timeout 时每执行这么多条指令检查一次时间
+TIMEOUT_SLICE = 4096
+
+# 状态快照格式（小端）：头部 magic/版本/标志位/pc/steps，随后是 16 个寄存器和 512 个 DMEM 字（int16）
+SNAPSHOT_MAGIC = b"S427"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT = struct.Struct("<4sBBiq16h512h")
+# 标志位字段中各位的含义
+_SNAP_F, _SNAP_N, _SNAP_Z, _SNAP_C, _SNAP_L, _SNAP_HALT = 1, 2, 4, 8, 16, 32
+
+# 操作数形式：两个寄存器 / 寄存器+立即数（可选零扩展掩码）/ 条件码+位移或寄存器
+_RR_OPS = {"ADD", "SUB", "CMP", "AND", "OR", "XOR", "MOV", "LSH", "LOAD", "STOR", "JAL"}
+_RI_OPS = {"ADDI": None, "SUBI": None, "CMPI": None, "LSHI": None,
+           "ANDI": 0xFF, "ORI": 0xFF, "XORI": 0xFF, "MOVI": 0xFF, "LUI": 0xFF}
+
+# 语法错误提示（与原逐行解释器的输出保持一致）
+_SYNTAX_HINTS = {
+    "ADD": "ADD Rsrc, Rdest", "SUB": "SUB Rsrc, Rdest", "CMP": "CMP Rsrc, Rdest",
+    "AND": "AND Rsrc, Rdest", "OR": "OR Rsrc, Rdest", "XOR": "XOR Rsrc, Rdest",
+    "MOV": "MOV Rsrc, Rdest",
+    "ADDI": "ADDI Rdest, imm", "SUBI": "SUBI Rdest, imm", "CMPI": "CMPI Rdest, imm",
+    "ANDI": "ANDI Rdest, imm", "ORI": "ORI Rdest, imm", "XORI": "XORI Rdest, imm",
+    "MOVI": "MOVI Rdest, imm",
+    "LSH": "LSH Rsrc, Rdest", "LSHI": "LSHI Rdest, imm", "LUI": "LUI Rdest, imm",
+    "LOAD": "LOAD Rdest, Rsrc", "STOR": "STOR Rsrc, Rdest",
+    "BCOND": "Bcond cond, disp", "JCOND": "Jcond cond, Rsrc", "JAL": "JAL Rdest, Rsrc",
+}
+_SYNTAX_NAMES = {"BCOND": "Bcond", "JCOND": "Jcond"}
+
+
+def parse_reg(token):
+    token = token.strip().upper()
+    if not token.startswith('R'):
+        raise ValueError(f"Invalid register token: {token}")
+    idx = int(token[1:])
+    if idx < 0 or idx > 15:
+        raise ValueError(f"Register index out of range: {idx}")
+    return idx
+
+
+def parse_imm(token):
+    token = token.strip().upper()
+    if token.startswith("0X"):
+        return int(token, 16)
+    else:
+        return int(token, 10)
+
+
+def parse_cond(token):
+    """条件码：支持助记符，也支持立即数"""
+    try:
+        return cond_map[token.upper()]
+    except KeyError:
+        return parse_imm(token)
+
+
+def decode_line(asm_line):
+    """
+    将一行汇编文本解码为 (op, a, b)。
+    空行返回 None；语法错误、不支持的指令和操作数解析失败被编码为伪操作，
+    在执行时才打印或抛出，保证与逐行解析执行的结果一致。
+    """
+    line = asm_line.split(";")[0].strip()
+    if not line:
+        return None
+
+    tokens = re.split(r'[,\s]+', line)
+    mnemonic = tokens[0].upper()
+
+    if mnemonic == "WAIT":
+        return (OP_WAIT, 0, 0)
+    if mnemonic not in OPCODES:
+        return (OP_UNSUPPORTED, mnemonic, 0)
+    if len(tokens) != 3:
+        name = _SYNTAX_NAMES.get(mnemonic, mnemonic)
+        return (OP_SYNTAX, f"[SIM] Syntax error in {name} (expected {_SYNTAX_HINTS[mnemonic]})", 0)
+
+    op = OPCODES[mnemonic]
+    try:
+        if mnemonic in _RR_OPS:
+            return (op, parse_reg(tokens[1]), parse_reg(tokens[2]))
+        if mnemonic in _RI_OPS:
+            rdest = parse_reg(tokens[1])
+            imm = parse_imm(tokens[2])
+            mask = _RI_OPS[mnemonic]
+            if mask is not None:
+                imm &= mask
+            return (op, rdest, imm)
+        if mnemonic == "BCOND":
+            return (op, parse_cond(tokens[1]), parse_imm(tokens[2]))
+        # JCOND
+        return (op, parse_cond(tokens[1]), parse_reg(tokens[2]))
+    except ValueError as e:
+        return (OP_ERROR, e, 0)
+
+
+# ---------------- 机器码直接解码 ----------------
+# 按 src/mapping.py 中的字段布局用位掩码提取操作数，得到与 decode_line 相同的 (op, a, b)。
+# 指令匹配顺序与 disassemble_instruction 保持一致（FIX -> FIXV -> 按 instruction_set 顺序），
+# 因此直接执行 .hex 与 “反汇编后再执行” 的结果完全相同。
+
+def _field(word, span):
+    """按 (低位, 高位) 提取字段"""
+    lo, hi = span
+    return (word >> lo) & ((1 << (hi - lo + 1)) - 1)
+
+
+def _build_word_tables():
+    fixed = {}       # 完整机器码 -> 助记符
+    fixed_vec = {}   # 高12位 -> 助记符
+    forms = [None] * 256  # (opcode << 4 | ext) -> (助记符, 指令)
+    for mnemonic, instr in instruction_set.items():
+        if instr.fmt == "FIX":
+            fixed.setdefault(instr.fields["value"], mnemonic)
+        elif instr.fmt == "FIXV":
+            fixed_vec.setdefault(instr.fields["fixed"] & 0xFFF0, mnemonic)
+    for key in range(256):
+        opcode, ext = key >> 4, key & 0xF
+        for mnemonic, instr in instruction_set.items():
+            if instr.fmt in ("FIX", "FIXV") or instr.opcode != opcode:
+                continue
+            # RR / Jcond / RS 需要扩展码匹配，其余格式只看 opcode
+            if instr.fmt in ("RR", "Jcond", "RS") and instr.ext != ext:
+                continue
+            forms[key] = (mnemonic, instr)
+            break
+    return fixed, fixed_vec, forms
+
+
+_FIXED_WORDS, _FIXED_VECTOR_WORDS, _WORD_FORMS = _build_word_tables()
+
+
+def decode_word(word):
+    """将一条16位机器码解码为 (op, a, b)，不经过任何字符串处理"""
+    word &= 0xFFFF
+    mnemonic = _FIXED_WORDS.get(word)
+    if mnemonic is None:
+        mnemonic = _FIXED_VECTOR_WORDS.get(word & 0xFFF0)
+    if mnemonic is not None:
+        if mnemonic == "WAIT":
+            return (OP_WAIT, 0, 0)
+        return (OP_UNSUPPORTED, mnemonic, 0)
+
+    form = _WORD_FORMS[(word >> 12) << 4 | (word >> 4) & 0xF]
+    if form is None:
+        return (OP_UNSUPPORTED, "???", 0)
+    mnemonic, instr = form
+    op = OPCODES.get(mnemonic)
+    if op is None:
+        return (OP_UNSUPPORTED, mnemonic, 0)
+
+    fields = instr.fields
+    fmt = instr.fmt
+    if fmt == "RR":
+        return (op, _field(word, fields["Rdest"]), _field(word, fields["Rsrc"]))
+    if fmt == "RS":
+        return (op, _field(word, fields["Rsrc"]), _field(word, fields["Raddr"]))
+    if fmt == "RI":
+        return (op, _field(word, fields["Rdest"]), _field(word, fields["imm"]))
+    if fmt == "RI4":
+        imm = _field(word, fields["imm"])
+        if _field(word, fields["s"]):
+            imm = -imm
+        return (op, _field(word, fields["Rdest"]), imm)
+    if fmt == "Bcond":
+        disp = _field(word, fields["disp"])
+        # 8 位符号扩展
+        if disp & 0x80:
+            disp -= 256
+        return (op, _field(word, fields["cond"]), disp)
+    if fmt == "Jcond":
+        return (op, _field(word, fields["cond"]), _field(word, fields["Rtarget"]))
+    return (OP_UNSUPPORTED, mnemonic, 0)
+
+
 class Simulator:
-    def __init__(self):
+    def __init__(self, trace=TRACE_FULL, trace_sink=None):
         # 16个16位寄存器
         self.regs = [0] * 16
         # 512个16位有符号数
@@ -51,12 +306,47 @@ class Simulator:
         self.pc = 0
         # 存储asm代码行
         self.program_lines = []
+        # 从 .hex 装载的机器码（16位无符号）
+        self.imem = array('H')
+        # 预解码后的指令流：[(op, a, b), ...]，与 program_lines 或 imem 一一对应
+        self.program = []
         # 是否结束模拟
         self.halt = False
+        # 已执行的指令条数
+        self.steps = 0
+        # run(snapshot_every=N) 自动保存的快照（bytes）
+        self.snapshots = []
+        # 最近一次 run 的结束原因（STOP_* 常量）
+        self.stop_reason = None
+        # 断点/观察点/事件回调（src.hooks.HookSet，首次访问 self.hooks 时创建）
+        self._hooks = None
+        # 反向执行记录器（src.timetravel.TimeTravel 创建时自行挂上）
+        self.time_travel = None
+        # 跟踪输出：级别 + 带缓冲的输出端
+        self.trace_sink = trace_sink if trace_sink is not None else TraceWriter()
+        self.set_trace(trace)
+        # 操作码 -> 处理函数
+        self.handlers = [getattr(self, "_op_" + name.lower()) for name in MNEMONICS]
+        self.handlers += [self._op_syntax, self._op_unsupported, self._op_error]
+
+    @property
+    def hooks(self):
+        if self._hooks is None:
+            from src.hooks import HookSet
+            self._hooks = HookSet()
+        return self._hooks
+
+    def set_trace(self, level):
+        """设置跟踪级别（名称或 TRACE_* 常量）"""
+        self.trace = parse_trace_level(level)
+        # 处理函数里只检查这几个布尔量；silent 时不做任何格式化
+        self._trace_summary = self.trace >= TRACE_SUMMARY
+        self._trace_branches = self.trace >= TRACE_BRANCHES
+        self._trace_full = self.trace >= TRACE_FULL
 
     def load_asm_file(self, asm_path):
         """
-        读取asm文件内容到program_lines，去除注释和空行
+        读取asm文件内容到program_lines，去除注释和空行，并完成预解码
         """
         with open(asm_path, "r", encoding="utf-8") as f:
             lines = f.readlines()
@@ -64,21 +354,311 @@ class Simulator:
             line = line.split(";")[0].strip()
             if line:
                 self.program_lines.append(line)
+                self.program.append(decode_line(line))
+
+    def load_hex_file(self, hex_path):
+        """
+        读取 .hex 文件（每行一个16位十六进制机器码）到 imem，并直接按位解码。
+        无法解析的行被跳过（与反汇编器输出注释行后再装载的效果一致）。
+        """
+        with open(hex_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    word = int(line, 16)
+                except ValueError:
+                    continue
+                self.imem.append(word & 0xFFFF)
+                self.program.append(decode_word(word))
+
+    def load_words(self, words):
+        """直接装载机器码序列（如汇编器的输出）"""
+        for word in words:
+            self.imem.append(word & 0xFFFF)
+            self.program.append(decode_word(word))
+
+    def load_imem_image(self, image_path):
+        """装载二进制 IMEM 映像（小端 16 位字，见 src/memimage.py）"""
+        self.load_words(read_image(image_path, "H"))
+
+    def load_dmem_image(self, image_path, share=False):
+        """
+        用二进制映像初始化 DMEM（不足 512 字的部分补 0）。
+        share=True 时以写时复制方式 mmap 映像文件（必须正好 512 字），
+        dmem 成为其上的 memoryview，多进程共享同一初始映像而不复制。
+        """
+        self.dmem = read_image(image_path, "h", words=len(self.dmem), share=share)
+
+    def write_dmem_image(self, image_path):
+        """把当前 DMEM 一次性写成二进制映像"""
+        write_image(image_path, self.dmem, "h")
+
+    def source_line(self, pc):
+        """返回 pc 处指令的文本（机器码装载时按需反汇编，仅用于调试输出）"""
+        if pc < len(self.program_lines):
+            return self.program_lines[pc]
+        return disassemble_instruction(self.imem[pc])
+
+    def decode_program(self):
+        """重新解码 program_lines（外部直接修改 program_lines 后调用）"""
+        self.program = [decode_line(line) for line in self.program_lines]
+
+    def run(self, engine="interp", snapshot_every=None, profiler=None,
+            max_steps=None, timeout=None, detect_idle=False, golden=None, timing=None,
+            caches=None):
+        """
+        主执行循环：按预解码指令流逐条分派，直到PC超出范围或遇到WAIT
+        engine="block" 时使用基本块翻译引擎（见 src/block_engine.py）；
+        该引擎不产生逐条跟踪，branches/full 级别下自动退回解释执行。
+        snapshot_every=N 时每执行 N 条指令把 snapshot() 追加到 self.snapshots。
+        profiler 为 src.profiler.Profiler 时逐条计数（见 _run_profiled，只用解释执行）。
+        终止控制（结束原因见 self.stop_reason）：
+          - max_steps   : 本次 run 最多执行的指令条数
+          - timeout     : 墙钟时间上限（秒），每 TIMEOUT_SLICE 条指令检查一次
+          - detect_idle : 向后跳转回到同一 PC 时状态与上次完全相同（且期间没有 STOR）
+                          即判定为死循环并停止（只用解释执行）
+        注册了 self.hooks 回调或挂有 self.time_travel 时只用解释执行（见 src/hooks.py、
+        src/timetravel.py）；上次因断点或回调停下时，再次调用 run 从停下的位置继续。
+        golden 为 src.golden.GoldenChecker 时与黄金跟踪逐条比对写回（GoldenWriter 则记录）；
+        timing 为 src.timing.PipelineTiming 时统计流水线周期数，caches 为 src.cache.CacheModels
+        时用一组数据 cache 配置统计 LOAD/STOR 的命中与缺失。这些同样只用解释执行。
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if self.program_lines and len(self.program) != len(self.program_lines):
+            self.decode_program()
+        handlers = self.handlers
+        code = [(handlers[op], a, b) for (op, a, b) in self.program]
+        if detect_idle:
+            code = self._guard_idle(code)
+        resume_pc = None
+        if self.halt and self.stop_reason in (STOP_BREAKPOINT, STOP_HOOK):
+            if self.stop_reason == STOP_BREAKPOINT:
+                resume_pc = self.pc
+            self.halt = False
+        if self.time_travel is not None:
+            code = self.time_travel.instrument(code)
+        observers = [obs for obs in (golden, timing, caches) if obs is not None]
+        for obs in observers:
+            code = obs.instrument(self, code)
+        if self._hooks:
+            code = self._hooks.instrument(self, code, resume_pc)
+        instrumented = (detect_idle or self.time_travel is not None or bool(self._hooks)
+                        or bool(observers))
+        if profiler is not None:
+            profiler.prepare(len(code))
+            runner = lambda code, limit=-1: self._run_profiled(code, profiler, limit)
+        elif self._trace_full:
+            runner = self._run_traced
+        elif engine == "block" and not self._trace_branches and not instrumented:
+            from src.block_engine import BlockEngine
+            block_engine = BlockEngine(self)
+            runner = lambda code, limit=-1: block_engine.run(limit)
+        else:
+            runner = self._run_fast
+        self.stop_reason = None
+        try:
+            if snapshot_every or max_steps is not None or timeout is not None:
+                self._run_sliced(code, runner, snapshot_every, max_steps, timeout)
+            else:
+                runner(code)
+            if self.stop_reason is None:
+                self.stop_reason = STOP_HALT if self.halt else STOP_OUT_OF_RANGE
+            for obs in observers:
+                obs.finish(self)
+            if profiler is not None:
+                profiler.finish(self.program)
+            if self._trace_summary:
+                self.dump_state()
+        finally:
+            self.trace_sink.flush()
+
+    def _run_sliced(self, code, runner, snapshot_every, max_steps, timeout):
+        """
+        分段执行：每段长度取快照间隔、剩余指令预算和超时检查间隔中的最小值，
+        段与段之间保存快照、检查预算和时间，主循环本身不增加额外开销。
+        """
+        n = len(code)
+        start = self.steps
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            done = self.steps - start
+            chunk = -1
+            if snapshot_every:
+                chunk = snapshot_every - done % snapshot_every
+            if max_steps is not None:
+                if done >= max_steps:
+                    # 最后一条指令恰好用完预算时，按停机/PC 越界结束（由 run 设置 stop_reason）
+                    if 0 <= self.pc < n and not self.halt:
+                        self.stop_reason = STOP_MAX_STEPS
+                        if self._trace_summary:
+                            self.trace_sink.line(f"[SIM] Step budget of {max_steps} instructions "
+                                                 f"exhausted at PC {self.pc}. Simulation stops.")
+                    return
+                chunk = max_steps - done if chunk < 0 else min(chunk, max_steps - done)
+            if deadline is not None:
+                if time.monotonic() >= deadline and 0 <= self.pc < n and not self.halt:
+                    self.stop_reason = STOP_TIMEOUT
+                    if self._trace_summary:
+                        self.trace_sink.line(f"[SIM] Timeout after {timeout}s at PC {self.pc}. "
+                                             f"Simulation stops.")
+                    return
+                chunk = TIMEOUT_SLICE if chunk < 0 else min(chunk, TIMEOUT_SLICE)
+
+            before = self.steps
+            runner(code, chunk)
+            if self.steps - before < chunk or self.halt:
+                return
+            if snapshot_every and (self.steps - start) % snapshot_every == 0:
+                self.snapshots.append(self.snapshot())
 
-    def run(self):
+    def _guard_idle(self, code):
         """
-        主执行循环：逐行执行，直到PC超出范围或遇到WAIT
+        为空转检测包装分支和 STOR 的处理函数（只在 detect_idle 时使用）。
+        向后跳转到 target 时记录 (寄存器, 标志位, STOR 计数)；再次以相同状态
+        回到 target 说明 DMEM 也未改变，之后的执行必然重复，于是停在 target。
         """
-        while not self.halt:
-            if self.pc < 0 or self.pc >= len(self.program_lines):
-                print(f"[SIM] PC {self.pc} out of range! Simulation stops.")
+        seen = {}
+        stores = [0]
+
+        def guard_stor(handler):
+            def run_stor(a, b):
+                stores[0] += 1
+                handler(a, b)
+            return run_stor
+
+        def guard_branch(handler, pc):
+            def run_branch(a, b):
+                handler(a, b)
+                target = self.pc + 1
+                if target <= pc:
+                    state = (tuple(self.regs), self.flagF, self.flagN, self.flagZ,
+                             self.flagC, self.flagL, stores[0])
+                    if seen.get(target) == state:
+                        self.halt = True
+                        self.pc = target
+                        self.stop_reason = STOP_IDLE
+                        if self._trace_summary:
+                            self.trace_sink.line(f"[SIM] Idle loop detected at PC {target}. "
+                                                 f"Simulation stops.")
+                    else:
+                        seen[target] = state
+            return run_branch
+
+        guarded = []
+        for pc, ((handler, a, b), (op, _, _)) in enumerate(zip(code, self.program)):
+            if op == OP_STOR:
+                handler = guard_stor(handler)
+            elif OP_BCOND <= op <= OP_JAL:
+                handler = guard_branch(handler, pc)
+            guarded.append((handler, a, b))
+        return guarded
+
+    def _run_fast(self, code, limit=-1):
+        """不输出逐条跟踪信息的主循环；limit >= 0 时最多执行 limit 条指令"""
+        n = len(code)
+        steps = 0
+        try:
+            while steps != limit and not self.halt:
+                pc = self.pc
+                if not 0 <= pc < n:
+                    if self._trace_summary:
+                        self.trace_sink.line(f"[SIM] PC {pc} out of range! Simulation stops.")
+                    break
+                handler, a, b = code[pc]
+                handler(a, b)
+                steps += 1
+                if self.halt:
+                    break
+                self.pc += 1
+        finally:
+            self.steps += steps
+
+    def _run_traced(self, code, limit=-1):
+        """full 级别：每条指令先输出 PC 和指令文本"""
+        n = len(code)
+        line = self.trace_sink.line
+        while limit != 0 and not self.halt:
+            limit -= 1
+            pc = self.pc
+            if not 0 <= pc < n:
+                line(f"[SIM] PC {pc} out of range! Simulation stops.")
                 break
-            asm_line = self.program_lines[self.pc]
-            print(f"\n[SIM] PC={self.pc}, executing: {asm_line}")
-            self.execute_line(asm_line)
-            if not self.halt:
+            handler, a, b = code[pc]
+            line(f"\n[SIM] PC={pc}, executing: {self.source_line(pc)}")
+            handler(a, b)
+            self.steps += 1
+            if self.halt:
+                break
+            self.pc += 1
+
+    def _run_profiled(self, code, profiler, limit=-1):
+        """
+        剖析用的主循环：记录每个 PC 的执行次数，以及分支在执行前求得的跳转结果。
+        full 级别下照常输出逐条跟踪。
+        """
+        n = len(code)
+        counts = profiler.counts
+        taken = profiler.taken
+        ops = [op for (op, _, _) in self.program]
+        check = self.check_condition
+        traced = self._trace_full
+        steps = 0
+        try:
+            while steps != limit and not self.halt:
+                pc = self.pc
+                if not 0 <= pc < n:
+                    if self._trace_summary:
+                        self.trace_sink.line(f"[SIM] PC {pc} out of range! Simulation stops.")
+                    break
+                handler, a, b = code[pc]
+                if traced:
+                    self.trace_sink.line(f"\n[SIM] PC={pc}, executing: {self.source_line(pc)}")
+                counts[pc] += 1
+                op = ops[pc]
+                if OP_BCOND <= op <= OP_JAL and (op == OP_JAL or check(a)):
+                    taken[pc] += 1
+                handler(a, b)
+                steps += 1
+                if self.halt:
+                    break
                 self.pc += 1
-        self.dump_state()
+        finally:
+            self.steps += steps
+
+    # --------------------- 快照 ---------------------
+
+    def snapshot(self):
+        """
+        把体系结构状态（寄存器、DMEM、F/N/Z/C/L、pc、halt）和已执行指令数
+        打包成约 1KB 的 bytes。程序本身不在快照中。
+        """
+        bits = ((_SNAP_F if self.flagF else 0) | (_SNAP_N if self.flagN else 0)
+                | (_SNAP_Z if self.flagZ else 0) | (_SNAP_C if self.flagC else 0)
+                | (_SNAP_L if self.flagL else 0) | (_SNAP_HALT if self.halt else 0))
+        return _SNAPSHOT.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, bits, self.pc, self.steps,
+                              *self.regs, *self.dmem)
+
+    def restore(self, data):
+        """从 snapshot() 的结果恢复状态；已装载的程序保持不变"""
+        if len(data) != _SNAPSHOT.size:
+            raise ValueError(f"Invalid snapshot size: {len(data)}")
+        values = _SNAPSHOT.unpack(data)
+        magic, version, bits, pc, steps = values[:5]
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Invalid snapshot header")
+        self.regs = list(values[5:21])
+        self.dmem = list(values[21:])
+        self.flagF = bool(bits & _SNAP_F)
+        self.flagN = bool(bits & _SNAP_N)
+        self.flagZ = bool(bits & _SNAP_Z)
+        self.flagC = bool(bits & _SNAP_C)
+        self.flagL = bool(bits & _SNAP_L)
+        self.halt = bool(bits & _SNAP_HALT)
+        self.pc = pc
+        self.steps = steps
 
     def execute_line(self, asm_line):
         """
@@ -90,375 +670,303 @@ class Simulator:
           - LOAD, STOR
           - Bcond, Jcond, JAL, WAIT
         """
-        # 去除注释
-        line = asm_line.split(";")[0].strip()
-        if not line:
+        decoded = decode_line(asm_line)
+        if decoded is None:
             return
+        op, a, b = decoded
+        self.handlers[op](a, b)
 
-        tokens = re.split(r'[,\s]+', line)
-        if not tokens:
-            return
-        mnemonic = tokens[0].upper()
+    # --------------------- 指令处理函数 ---------------------
+    # 结果截断为16位有符号数：((x + 0x8000) & 0xFFFF) - 0x8000，等价于 to_16bit
 
+    def _op_wait(self, a, b):
         # 特殊指令 WAIT
-        if mnemonic == "WAIT":
-            # print(f"[SIM] WAIT encountered at PC={self.pc}. Simulation stops.")
+        if self._trace_full:
             self.debug_print(f"WAIT")
-            # self.halt = True
-            # return
-
-        # -------------- 寄存器-寄存器型 --------------
-        elif mnemonic == "ADD":
-            # ADD Rsrc, Rdest => Rdest = Rdest + Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in ADD (expected ADD Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc  = self.parse_reg(tokens[2])
-            a = self.regs[rdest]
-            b = self.regs[rsrc]
-            result = a + b
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
-            self.check_overflow_add(a, b, result)
+
+    # -------------- 寄存器-寄存器型 --------------
+    def _op_add(self, rdest, rsrc):
+        # ADD Rsrc, Rdest => Rdest = Rdest + Rsrc
+        regs = self.regs
+        a = regs[rdest]
+        b = regs[rsrc]
+        result = a + b
+        val_16 = ((result + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        self.flagF = (a >= 0 and b >= 0 and result < 0) or (a < 0 and b < 0 and result >= 0)
+        if self._trace_full:
             self.debug_print(f"ADD => R{rdest} = {a} + {b} => {val_16}")
 
-        elif mnemonic == "SUB":
-            # SUB Rsrc, Rdest => Rdest = Rdest - Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in SUB (expected SUB Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc  = self.parse_reg(tokens[2])
-            a = self.regs[rdest]
-            b = self.regs[rsrc]
-            result = a - b
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
-            self.check_overflow_sub(a, b, result)
+    def _op_sub(self, rdest, rsrc):
+        # SUB Rsrc, Rdest => Rdest = Rdest - Rsrc
+        regs = self.regs
+        a = regs[rdest]
+        b = regs[rsrc]
+        result = a - b
+        val_16 = ((result + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        self.flagF = ((a ^ b) >= 0) and ((a ^ result) < 0)
+        if self._trace_full:
             self.debug_print(f"SUB => R{rdest} = {a} - {b} => {val_16}")
 
-        elif mnemonic == "CMP":
-            # CMP Rsrc, Rdest => (Rdest - Rsrc)更新标志，不写回
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in CMP (expected CMP Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc  = self.parse_reg(tokens[2])
-            a = self.regs[rdest]
-            b = self.regs[rsrc]
-            result = a - b
-            val_16 = self.to_16bit(result)
-            self.update_flags(val_16)
-            self.check_overflow_sub(a, b, result)
+    def _op_cmp(self, rdest, rsrc):
+        # CMP Rsrc, Rdest => (Rdest - Rsrc)更新标志，不写回
+        regs = self.regs
+        a = regs[rdest]
+        b = regs[rsrc]
+        result = a - b
+        val_16 = ((result + 0x8000) & 0xFFFF) - 0x8000
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        self.flagF = ((a ^ b) >= 0) and ((a ^ result) < 0)
+        if self._trace_full:
             self.debug_print(f"CMP => compare R{rdest}({a}) - R{rsrc}({b}) = {val_16} => flags updated")
 
-        elif mnemonic == "AND":
-            # AND Rsrc, Rdest => Rdest = Rdest & Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in AND (expected AND Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc  = self.parse_reg(tokens[2])
-            a = self.regs[rdest]
-            b = self.regs[rsrc]
-            result = a & b
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_and(self, rdest, rsrc):
+        # AND Rsrc, Rdest => Rdest = Rdest & Rsrc
+        regs = self.regs
+        a = regs[rdest]
+        b = regs[rsrc]
+        val_16 = (((a & b) + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"AND => R{rdest} = {a} & {b} => {val_16}")
 
-        elif mnemonic == "OR":
-            # OR Rsrc, Rdest => Rdest = Rdest | Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in OR (expected OR Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc  = self.parse_reg(tokens[2])
-            a = self.regs[rdest]
-            b = self.regs[rsrc]
-            result = a | b
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_or(self, rdest, rsrc):
+        # OR Rsrc, Rdest => Rdest = Rdest | Rsrc
+        regs = self.regs
+        a = regs[rdest]
+        b = regs[rsrc]
+        val_16 = (((a | b) + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"OR => R{rdest} = {a} | {b} => {val_16}")
 
-        elif mnemonic == "XOR":
-            # XOR Rsrc, Rdest => Rdest = Rdest ^ Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in XOR (expected XOR Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc  = self.parse_reg(tokens[2])
-            a = self.regs[rdest]
-            b = self.regs[rsrc]
-            result = a ^ b
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_xor(self, rdest, rsrc):
+        # XOR Rsrc, Rdest => Rdest = Rdest ^ Rsrc
+        regs = self.regs
+        a = regs[rdest]
+        b = regs[rsrc]
+        val_16 = (((a ^ b) + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"XOR => R{rdest} = {a} ^ {b} => {val_16}")
 
-        elif mnemonic == "MOV":
-            # MOV Rsrc, Rdest => Rdest = Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in MOV (expected MOV Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc  = self.parse_reg(tokens[2])
-            val = self.regs[rsrc]
-            self.regs[rdest] = self.to_16bit(val)
-            self.update_flags(self.regs[rdest])
+    def _op_mov(self, rdest, rsrc):
+        # MOV Rsrc, Rdest => Rdest = Rsrc
+        regs = self.regs
+        val = regs[rsrc]
+        val_16 = ((val + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"MOV => R{rdest} = R{rsrc} ({val})")
 
-        #-------------- 寄存器-立即数型指令 --------------
-        elif mnemonic == "ADDI":
-            # ADDI Rdest, imm => Rdest = Rdest + imm (有符号扩展)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in ADDI (expected ADDI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2])
-            old_val = self.regs[rdest]
-            result = old_val + imm
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
-            self.check_overflow_add(old_val, imm, result)
+    #-------------- 寄存器-立即数型指令 --------------
+    def _op_addi(self, rdest, imm):
+        # ADDI Rdest, imm => Rdest = Rdest + imm (有符号扩展)
+        regs = self.regs
+        old_val = regs[rdest]
+        result = old_val + imm
+        val_16 = ((result + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        self.flagF = ((old_val >= 0 and imm >= 0 and result < 0)
+                      or (old_val < 0 and imm < 0 and result >= 0))
+        if self._trace_full:
             self.debug_print(f"ADDI => R{rdest} = {old_val} + {imm} => {val_16}")
 
-        elif mnemonic == "SUBI":
-            # SUBI Rdest, imm => Rdest = Rdest - imm (有符号扩展)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in SUBI (expected SUBI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2])
-            old_val = self.regs[rdest]
-            result = old_val - imm
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
-            self.check_overflow_sub(old_val, imm, result)
+    def _op_subi(self, rdest, imm):
+        # SUBI Rdest, imm => Rdest = Rdest - imm (有符号扩展)
+        regs = self.regs
+        old_val = regs[rdest]
+        result = old_val - imm
+        val_16 = ((result + 0x8000) & 0xFFFF) - 0x8000
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        self.flagF = ((old_val ^ imm) >= 0) and ((old_val ^ result) < 0)
+        if self._trace_full:
             self.debug_print(f"SUBI => R{rdest} = {old_val} - {imm} => {val_16}")
 
-        elif mnemonic == "CMPI":
-            # CMPI Rdest, imm => (Rdest - imm)只更新标志
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in CMPI (expected CMPI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2])
-            a = self.regs[rdest]
-            result = a - imm
-            val_16 = self.to_16bit(result)
-            self.update_flags(val_16)
-            self.check_overflow_sub(a, imm, result)
+    def _op_cmpi(self, rdest, imm):
+        # CMPI Rdest, imm => (Rdest - imm)只更新标志
+        a = self.regs[rdest]
+        result = a - imm
+        val_16 = ((result + 0x8000) & 0xFFFF) - 0x8000
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        self.flagF = ((a ^ imm) >= 0) and ((a ^ result) < 0)
+        if self._trace_full:
             self.debug_print(f"CMPI => compare R{rdest}({a}) - {imm} => {val_16}")
 
-        elif mnemonic == "ANDI":
-            # ANDI Rdest, imm => Rdest = Rdest & zero_extend(imm)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in ANDI (expected ANDI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2]) & 0xFF
-            old_val = self.regs[rdest]
-            result = old_val & imm
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_andi(self, rdest, imm):
+        # ANDI Rdest, imm => Rdest = Rdest & zero_extend(imm)
+        regs = self.regs
+        old_val = regs[rdest]
+        val_16 = old_val & imm
+        regs[rdest] = val_16
+        self.flagN = False
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"ANDI => R{rdest} = {old_val} & 0x{imm:02X} => {val_16}")
 
-        elif mnemonic == "ORI":
-            # ORI Rdest, imm => Rdest = Rdest | zero_extend(imm)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in ORI (expected ORI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2]) & 0xFF
-            old_val = self.regs[rdest]
-            result = old_val | imm
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_ori(self, rdest, imm):
+        # ORI Rdest, imm => Rdest = Rdest | zero_extend(imm)
+        regs = self.regs
+        old_val = regs[rdest]
+        val_16 = old_val | imm
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"ORI => R{rdest} = {old_val} | 0x{imm:02X} => {val_16}")
 
-        elif mnemonic == "XORI":
-            # XORI Rdest, imm => Rdest = Rdest ^ zero_extend(imm)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in XORI (expected XORI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2]) & 0xFF
-            old_val = self.regs[rdest]
-            result = old_val ^ imm
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_xori(self, rdest, imm):
+        # XORI Rdest, imm => Rdest = Rdest ^ zero_extend(imm)
+        regs = self.regs
+        old_val = regs[rdest]
+        val_16 = old_val ^ imm
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"XORI => R{rdest} = {old_val} ^ 0x{imm:02X} => {val_16}")
 
-        elif mnemonic == "MOVI":
-            # MOVI Rdest, imm => Rdest = zero_extend(imm)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in MOVI (expected MOVI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2]) & 0xFF
-            val_16 = self.to_16bit(imm)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
-            self.debug_print(f"MOVI => R{rdest} = 0x{imm:02X} => {val_16}")
-
-        #-------------- 移位指令 --------------
-        elif mnemonic == "LSH":
-            # LSH Rsrc, Rdest => Rdest = Rdest << Rsrc (仅正移位)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in LSH (expected LSH Rsrc, Rdest)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc = self.parse_reg(tokens[2])
-            shift_val = self.regs[rsrc]
-            if shift_val < 0:
-                # 当负数时取无符号低4位
-                shift_val = shift_val & 0xF
-                print(f"[SIM] LSH negative shift adjusted to {shift_val}")
-            old_val = self.regs[rdest]
-            result = old_val << shift_val
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_movi(self, rdest, imm):
+        # MOVI Rdest, imm => Rdest = zero_extend(imm)
+        self.regs[rdest] = imm
+        self.flagN = False
+        self.flagZ = imm == 0
+        if self._trace_full:
+            self.debug_print(f"MOVI => R{rdest} = 0x{imm:02X} => {imm}")
+
+    #-------------- 移位指令 --------------
+    def _op_lsh(self, rdest, rsrc):
+        # LSH Rsrc, Rdest => Rdest = Rdest << Rsrc (仅正移位)
+        regs = self.regs
+        shift_val = regs[rsrc]
+        if shift_val < 0:
+            # 当负数时取无符号低4位
+            shift_val = shift_val & 0xF
+            if self._trace_summary:
+                self.trace_sink.line(f"[SIM] LSH negative shift adjusted to {shift_val}")
+        old_val = regs[rdest]
+        # 移位 >= 16 时低16位全为0
+        val_16 = (((old_val << shift_val) + 0x8000) & 0xFFFF) - 0x8000 if shift_val < 16 else 0
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"LSH => R{rdest} = {old_val} << {shift_val} => {val_16}")
 
-        elif mnemonic == "LSHI":
-            # LSHI Rdest, imm => Rdest = Rdest << imm (仅支持正移位)
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in LSHI (expected LSHI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            shift_amt = self.parse_imm(tokens[2])
-            if shift_amt < 0:
-                print(f"[SIM] LSHI negative shift {shift_amt} not supported.")
-                return
-            old_val = self.regs[rdest]
-            result = old_val << shift_amt
-            val_16 = self.to_16bit(result)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_lshi(self, rdest, shift_amt):
+        # LSHI Rdest, imm => Rdest = Rdest << imm (仅支持正移位)
+        if shift_amt < 0:
+            if self._trace_summary:
+                self.trace_sink.line(f"[SIM] LSHI negative shift {shift_amt} not supported.")
+            return
+        regs = self.regs
+        old_val = regs[rdest]
+        val_16 = (((old_val << shift_amt) + 0x8000) & 0xFFFF) - 0x8000 if shift_amt < 16 else 0
+        regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"LSHI => R{rdest} = {old_val} << {shift_amt} => {val_16}")
 
-        elif mnemonic == "LUI":
-            # LUI Rdest, imm => Rdest = imm << 8
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in LUI (expected LUI Rdest, imm)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            imm = self.parse_imm(tokens[2]) & 0xFF
-            val_16 = self.to_16bit(imm << 8)
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    def _op_lui(self, rdest, imm):
+        # LUI Rdest, imm => Rdest = imm << 8
+        val_16 = (((imm << 8) + 0x8000) & 0xFFFF) - 0x8000
+        self.regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"LUI => R{rdest} = 0x{imm:02X} << 8 => {val_16}")
 
-        #-------------- 内存访问指令 --------------
-        elif mnemonic == "LOAD":
-            # LOAD Rdest, Rsrc => Rdest = DMEM[Rsrc]
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in LOAD (expected LOAD Rdest, Rsrc)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc = self.parse_reg(tokens[2])
-            addr = self.regs[rsrc] & 0x1FF
-            val_16 = self.to_16bit(self.dmem[addr])
-            self.regs[rdest] = val_16
-            self.update_flags(val_16)
+    #-------------- 内存访问指令 --------------
+    def _op_load(self, rdest, rsrc):
+        # LOAD Rdest, Rsrc => Rdest = DMEM[Rsrc]
+        addr = self.regs[rsrc] & 0x1FF
+        val_16 = ((self.dmem[addr] + 0x8000) & 0xFFFF) - 0x8000
+        self.regs[rdest] = val_16
+        self.flagN = val_16 < 0
+        self.flagZ = val_16 == 0
+        if self._trace_full:
             self.debug_print(f"LOAD => R{rdest} = DMEM[{addr}] => {val_16}")
 
-        elif mnemonic == "STOR":
-            # STOR Rsrc, Rdest => DMEM[Rdest] = Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in STOR (expected STOR Rsrc, Rdest)")
-                return
-            rsrc = self.parse_reg(tokens[1])
-            rdest = self.parse_reg(tokens[2])
-            addr = self.regs[rdest] & 0x1FF
-            self.dmem[addr] = self.to_16bit(self.regs[rsrc])
-            self.debug_print(f"STOR => DMEM[{addr}] = R{rsrc} ({self.regs[rsrc]})")
-
-        #-------------- 分支、跳转指令 --------------
-        elif mnemonic == "BCOND":
-            # Bcond cond, disp => if(check_condition(cond)) pc += disp
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in Bcond (expected Bcond cond, disp)")
-                return
-            # 解析条件码：支持助记符
-            cond_token = tokens[1].upper()
-            try:
-                cond_val = cond_map[cond_token]
-            except KeyError:
-                cond_val = self.parse_imm(tokens[1])
-            # 解析位移：这里直接当作立即数（应为8位2's complement）
-            disp = self.parse_imm(tokens[2])
-            if self.check_condition(cond_val):
-                old_pc = self.pc
-                self.pc += disp
-                self.debug_print(f"BCOND => cond {cond_token} true, jump from {old_pc} to {self.pc+1}")
-            else:
-                self.debug_print(f"BCOND => cond {cond_token} false, no jump")
+    def _op_stor(self, rsrc, rdest):
+        # STOR Rsrc, Rdest => DMEM[Rdest] = Rsrc
+        regs = self.regs
+        addr = regs[rdest] & 0x1FF
+        self.dmem[addr] = ((regs[rsrc] + 0x8000) & 0xFFFF) - 0x8000
+        if self._trace_full:
+            self.debug_print(f"STOR => DMEM[{addr}] = R{rsrc} ({regs[rsrc]})")
 
-        elif mnemonic == "JCOND":
-            # Jcond cond, Rsrc => if(check_condition(cond)) pc = Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in Jcond (expected Jcond cond, Rsrc)")
-                return
-            cond_token = tokens[1].upper()
-            try:
-                cond_val = cond_map[cond_token]
-            except KeyError:
-                cond_val = self.parse_imm(tokens[1])
-            rsrc = self.parse_reg(tokens[2])
-            if self.check_condition(cond_val):
-                old_pc = self.pc
-                new_pc = self.regs[rsrc]
-                self.debug_print(f"JCOND => cond {cond_token} true, jump from {old_pc} to {new_pc}")
-                self.pc = new_pc - 1
-            else:
-                self.debug_print(f"JCOND => cond {cond_token} false, no jump")
+    #-------------- 分支、跳转指令 --------------
+    def _op_bcond(self, cond, disp):
+        # Bcond cond, disp => if(check_condition(cond)) pc += disp
+        if self.check_condition(cond):
+            old_pc = self.pc
+            self.pc += disp
+            if self._trace_branches:
+                self.branch_print(old_pc, f"BCOND => cond {cond_names.get(cond, cond)} true, jump from {old_pc} to {self.pc+1}")
+        elif self._trace_branches:
+            self.branch_print(self.pc, f"BCOND => cond {cond_names.get(cond, cond)} false, no jump")
 
-        elif mnemonic == "JAL":
-            # JAL Rdest, Rsrc => Rdest = PC+1, PC = Rsrc
-            if len(tokens) != 3:
-                print("[SIM] Syntax error in JAL (expected JAL Rdest, Rsrc)")
-                return
-            rdest = self.parse_reg(tokens[1])
-            rsrc = self.parse_reg(tokens[2])
-            link_val = self.pc + 1
-            self.regs[rdest] = self.to_16bit(link_val)
-            new_pc = self.regs[rsrc]
+    def _op_jcond(self, cond, rsrc):
+        # Jcond cond, Rsrc => if(check_condition(cond)) pc = Rsrc
+        if self.check_condition(cond):
             old_pc = self.pc
+            new_pc = self.regs[rsrc]
+            if self._trace_branches:
+                self.branch_print(old_pc, f"JCOND => cond {cond_names.get(cond, cond)} true, jump from {old_pc} to {new_pc}")
             self.pc = new_pc - 1
-            self.debug_print(f"JAL => R{rdest} = {link_val}, jump from {old_pc} to {new_pc}")
+        elif self._trace_branches:
+            self.branch_print(self.pc, f"JCOND => cond {cond_names.get(cond, cond)} false, no jump")
 
-        else:
-            print(f"[SIM] Unsupported instruction: {mnemonic}")
+    def _op_jal(self, rdest, rsrc):
+        # JAL Rdest, Rsrc => Rdest = PC+1, PC = Rsrc
+        regs = self.regs
+        link_val = self.pc + 1
+        regs[rdest] = ((link_val + 0x8000) & 0xFFFF) - 0x8000
+        new_pc = regs[rsrc]
+        old_pc = self.pc
+        self.pc = new_pc - 1
+        if self._trace_branches:
+            self.branch_print(old_pc, f"JAL => R{rdest} = {link_val}, jump from {old_pc} to {new_pc}")
+
+    #-------------- 伪操作 --------------
+    def _op_syntax(self, msg, b):
+        if self._trace_summary:
+            self.trace_sink.line(msg)
+
+    def _op_unsupported(self, mnemonic, b):
+        if self._trace_summary:
+            self.trace_sink.line(f"[SIM] Unsupported instruction: {mnemonic}")
+
+    def _op_error(self, exc, b):
+        raise exc
 
     # --------------------- 工具函数 ---------------------
 
     def parse_reg(self, token):
-        token = token.strip().upper()
-        if not token.startswith('R'):
-            raise ValueError(f"Invalid register token: {token}")
-        idx = int(token[1:])
-        if idx < 0 or idx > 15:
-            raise ValueError(f"Register index out of range: {idx}")
-        return idx
+        return parse_reg(token)
 
     def parse_imm(self, token):
-        token = token.strip().upper()
-        if token.startswith("0X"):
-            return int(token, 16)
-        else:
-            return int(token, 10)
+        return parse_imm(token)
 
     def to_16bit(self, val):
         masked = val & 0xFFFF
@@ -485,61 +993,127 @@ class Simulator:
             self.flagF = False
 
     def check_condition(self, cond):
-        # cond 是数字0..15
-        if cond == 0:   # EQ
-            return self.flagZ
-        elif cond == 1: # NE
-            return not self.flagZ
-        elif cond == 2: # CS
-            return self.flagC
-        elif cond == 3: # CC
-            return not self.flagC
-        elif cond == 4: # HI
-            return self.flagL
-        elif cond == 5: # LS
-            return not self.flagL
-        elif cond == 6: # GT
-            return self.flagN
-        elif cond == 7: # LE
-            return not self.flagN
-        elif cond == 8: # FS
-            return self.flagF
-        elif cond == 9: # FC
-            return not self.flagF
-        elif cond == 10: # LO
-            return (not self.flagL) and (not self.flagZ)
-        elif cond == 11: # HS
-            return self.flagL or self.flagZ
-        elif cond == 12: # LT
-            return (not self.flagN) and (not self.flagZ)
-        elif cond == 13: # GE
-            return self.flagN or self.flagZ
-        elif cond == 14: # UC
-            return True
-        elif cond == 15:
-            return False
-        else:
-            return False
+        # cond 是数字0..15，超出范围视为不成立
+        if 0 <= cond <= 15:
+            return COND_TESTS[cond](self)
+        return False
 
     def debug_print(self, msg):
-        print(f"  [DEBUG] {msg}")
+        self.trace_sink.line(f"  [DEBUG] {msg}")
+
+    def branch_print(self, pc, msg):
+        # full 级别沿用 DEBUG 格式；branches 级别没有逐条的 PC 行，因此带上 PC
+        if self._trace_full:
+            self.debug_print(msg)
+        else:
+            self.trace_sink.line(f"[SIM] PC={pc}: {msg}")
 
     def dump_state(self):
-        print("\n----- Simulation Finished -----")
-        print("Registers:")
+        line = self.trace_sink.line
+        line("\n----- Simulation Finished -----")
+        line(f"Instructions executed: {self.steps}")
+        line(f"Stop reason: {self.stop_reason}")
+        line("Registers:")
         for i in range(16):
-            print(f"  R{i} = {self.regs[i]}")
-        print(f"Flags: F={self.flagF}, N={self.flagN}, Z={self.flagZ}")
+            line(f"  R{i} = {self.regs[i]}")
+        line(f"Flags: F={self.flagF}, N={self.flagN}, Z={self.flagZ}")
         # 可打印部分 DMEM 内容
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python simulate.py input.asm")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="EECS 427 processor simulator")
+    parser.add_argument("input_file", help="input.asm, input.hex or a binary IMEM image (.bin)")
+    parser.add_argument("--trace", default="full", choices=list(TRACE_LEVELS),
+                        help="trace verbosity (default: full)")
+    parser.add_argument("--engine", default="interp", choices=ENGINES,
+                        help="execution engine (default: interp)")
+    parser.add_argument("--max-steps", type=int, default=None,
+                        help="stop after this many instructions")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="stop after this many seconds of wall-clock time")
+    parser.add_argument("--detect-idle", action="store_true",
+                        help="stop when a backward branch revisits a PC with identical state")
+    parser.add_argument("--profile", action="store_true",
+                        help="count executions per PC and print a profile report")
+    parser.add_argument("--map", default=None,
+                        help="symbol/line map from the assembler (default: <input>.map if present)")
+    parser.add_argument("--golden", default=None,
+                        help="compare register/memory writes against this golden trace")
+    parser.add_argument("--write-golden", default=None,
+                        help="record register/memory writes to this file in golden trace format")
+    parser.add_argument("--timing", action="store_true",
+                        help="model the 5-stage pipeline and report cycles, CPI and stalls")
+    parser.add_argument("--no-forwarding", action="store_true",
+                        help="timing model: disable operand forwarding")
+    parser.add_argument("--branch-stage", default="EX", choices=["ID", "EX", "MEM"],
+                        help="timing model: stage that resolves branches (default: EX)")
+    parser.add_argument("--cache", action="append", default=[], metavar="SPEC",
+                        help="model a data cache, e.g. size=64,line=4,assoc=2,policy=lru,"
+                             "write=back,penalty=10 (repeat to compare configurations)")
+    parser.add_argument("--dmem", default=None,
+                        help="initial DMEM image (little-endian 16-bit words)")
+    parser.add_argument("--dmem-out", default=None,
+                        help="write the final DMEM image to this file")
+    args = parser.parse_args()
+
+    sim = Simulator(trace=args.trace)
+    if args.input_file.lower().endswith(".hex"):
+        sim.load_hex_file(args.input_file)
+    elif args.input_file.lower().endswith(".bin"):
+        sim.load_imem_image(args.input_file)
+    else:
+        sim.load_asm_file(args.input_file)
+    if args.dmem:
+        sim.load_dmem_image(args.dmem)
 
-    sim = Simulator()
-    sim.load_asm_file(sys.argv[1])
-    sim.run()
+    profiler = None
+    if args.profile:
+        from src.profiler import Profiler, load_source_map
+        map_file = args.map or os.path.splitext(args.input_file)[0] + ".map"
+        source_map = load_source_map(map_file) if os.path.exists(map_file) else None
+        profiler = Profiler(source_map)
+    golden = None
+    golden_out = None
+    if args.golden:
+        from src.golden import GoldenChecker
+        golden = GoldenChecker(args.golden)
+    elif args.write_golden:
+        from src.golden import GoldenWriter
+        golden_out = open(args.write_golden, "w", encoding="utf-8")
+        golden = GoldenWriter(golden_out)
+    timing = None
+    if args.timing:
+        from src.timing import PipelineTiming
+        timing = PipelineTiming(forwarding=not args.no_forwarding, branch_stage=args.branch_stage)
+    caches = None
+    if args.cache:
+        from src.cache import CacheModels, parse_cache_spec
+        try:
+            caches = CacheModels(parse_cache_spec(spec) for spec in args.cache)
+        except ValueError as e:
+            parser.error(str(e))
+    try:
+        sim.run(engine=args.engine, profiler=profiler, max_steps=args.max_steps,
+                timeout=args.timeout, detect_idle=args.detect_idle, golden=golden,
+                timing=timing, caches=caches)
+    finally:
+        if golden_out is not None:
+            golden_out.close()
+    if profiler is not None:
+        sim.trace_sink.line(profiler.report(sim))
+        sim.trace_sink.flush()
+    if timing is not None:
+        sim.trace_sink.line(timing.report())
+        sim.trace_sink.flush()
+    if caches is not None:
+        sim.trace_sink.line(caches.report(sim))
+        sim.trace_sink.flush()
+    if args.dmem_out:
+        sim.write_dmem_image(args.dmem_out)
+    if args.golden:
+        sim.trace_sink.line(golden.report(sim))
+        sim.trace_sink.flush()
+        if golden.mismatch:
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,193 @@
+# timetravel.py
+"""
+反向执行（时间旅行调试）。
+
+    tt = TimeTravel(sim, max_records=1 << 20)
+    sim.run()
+    tt.step_back()                 # 撤销最后一条指令
+    tt.reverse_continue({12})      # 倒退到上一次即将执行 PC 12 的时刻
+    tt.back_to(1000)               # 回到第 1000 条指令执行之前
+    sim.run()                      # 从当前状态继续正向执行（并继续记录）
+
+正向执行时每条指令在执行前写一条撤销记录到环形缓冲区（array('q')，每条 8 字节）：
+PC、F/N/Z/C/L、被覆盖的位置（寄存器号或 DMEM 地址）及其旧值。倒退一步只需取出一条记录并
+还原，代价 O(1)；缓冲区满后覆盖最旧的记录，内存占用固定为 max_records * 8 字节。
+
+更早的时刻通过检查点到达：每 checkpoint_every 条指令保存一次 Simulator.snapshot()，
+检查点数超过 max_checkpoints 时隔一个删一个并把间隔加倍，始终保留开始时的检查点。
+倒退到缓冲区之外时，从之前最近的检查点静默重新执行到当前位置，重新填充缓冲区后继续倒退。
+"""
+
+from array import array
+
+from src.simulator import OP_STOR, REG_WRITE_OPS
+
+# 撤销记录的位布局：pc(24) | 标志位(5) | 类型(2) | 下标(9) | 旧值(16)
+_KIND_NONE, _KIND_REG, _KIND_MEM = 0, 1, 2
+_PC_MASK = (1 << 24) - 1
+
+
+class TimeTravel:
+    def __init__(self, sim, max_records=1 << 20, checkpoint_every=1 << 16, max_checkpoints=64):
+        self.sim = sim
+        self.records = array('q', bytes(8 * max_records))
+        self.capacity = max_records
+        self.head = 0            # 下一条记录写入的位置
+        self.count = 0           # 缓冲区中有效记录数
+        self.checkpoint_every = checkpoint_every
+        self.max_checkpoints = max_checkpoints
+        self.checkpoints = []    # [(position, snapshot), ...]，按 position 升序
+        self.position = sim.steps
+        self._countdown = 0
+        self._replaying = False
+        sim.time_travel = self
+        self._checkpoint()
+
+    def detach(self):
+        self.sim.time_travel = None
+
+    # --------------------- 正向记录 ---------------------
+
+    def instrument(self, code):
+        """由 Simulator.run 调用：为每条指令包装一个先记录、后执行的处理函数"""
+        sim = self.sim
+        self.position = sim.steps
+        self._countdown = self.checkpoint_every
+        wrapped = []
+        for pc, ((handler, a, b), (op, _, _)) in enumerate(zip(code, sim.program)):
+            if op in REG_WRITE_OPS:
+                kind = _KIND_REG
+            elif op == OP_STOR:
+                kind = _KIND_MEM
+            else:
+                kind = _KIND_NONE
+            wrapped.append((self._wrap(handler, pc, kind), a, b))
+        return wrapped
+
+    def _wrap(self, handler, pc, kind):
+        sim = self.sim
+        push = self._push
+
+        if kind == _KIND_REG:
+            def record(a, b):
+                push(pc, _KIND_REG, a, sim.regs[a])
+                handler(a, b)
+        elif kind == _KIND_MEM:
+            # STOR Rsrc, Rdest：写 DMEM[regs[b]]
+            def record(a, b):
+                addr = sim.regs[b] & 0x1FF
+                push(pc, _KIND_MEM, addr, sim.dmem[addr])
+                handler(a, b)
+        else:
+            def record(a, b):
+                push(pc, _KIND_NONE, 0, 0)
+                handler(a, b)
+        return record
+
+    def _push(self, pc, kind, index, old):
+        sim = self.sim
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._checkpoint(pc)
+        flags = (sim.flagF | sim.flagN << 1 | sim.flagZ << 2 | sim.flagC << 3 | sim.flagL << 4)
+        self.records[self.head] = (pc | flags << 24 | kind << 29 | index << 31
+                                   | (old & 0xFFFF) << 40)
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.position += 1
+
+    def _checkpoint(self, pc=None):
+        """保存当前状态；在 run 内部调用时 sim.pc/steps 可能尚未更新，按参数修正"""
+        sim = self.sim
+        self._countdown = self.checkpoint_every
+        saved_pc = sim.pc
+        if pc is not None:
+            sim.pc = pc
+        snapshot = sim.snapshot()
+        sim.pc = saved_pc
+        checkpoints = self.checkpoints
+        while checkpoints and checkpoints[-1][0] >= self.position:
+            checkpoints.pop()
+        checkpoints.append((self.position, snapshot))
+        if len(checkpoints) > self.max_checkpoints:
+            # 稀疏化：保留第一个，其余隔一个删一个，之后的间隔加倍
+            self.checkpoints = checkpoints[:1] + checkpoints[2::2]
+            self.checkpoint_every *= 2
+
+    # --------------------- 反向执行 ---------------------
+
+    def _pop(self):
+        """撤销最后一条记录（O(1)）"""
+        sim = self.sim
+        self.head = (self.head - 1) % self.capacity
+        self.count -= 1
+        rec = self.records[self.head]
+        kind = rec >> 29 & 3
+        if kind:
+            old = rec >> 40 & 0xFFFF
+            old = old - 0x10000 if old & 0x8000 else old
+            index = rec >> 31 & 0x1FF
+            if kind == _KIND_REG:
+                sim.regs[index] = old
+            else:
+                sim.dmem[index] = old
+        sim.flagF = bool(rec >> 24 & 1)
+        sim.flagN = bool(rec >> 25 & 1)
+        sim.flagZ = bool(rec >> 26 & 1)
+        sim.flagC = bool(rec >> 27 & 1)
+        sim.flagL = bool(rec >> 28 & 1)
+        sim.pc = rec & _PC_MASK
+        sim.halt = False
+        sim.steps -= 1
+        self.position -= 1
+
+    def _refill(self):
+        """缓冲区已空：从更早的检查点重新执行到当前位置。没有更早的检查点时返回 False"""
+        sim = self.sim
+        target = sim.steps
+        earlier = [cp for cp in self.checkpoints if cp[0] < target]
+        if not earlier:
+            return False
+        position, snapshot = earlier[-1]
+        trace, hooks = sim.trace, sim._hooks
+        sim.set_trace("silent")
+        sim._hooks = None
+        try:
+            sim.restore(snapshot)
+            sim.steps = position
+            self.count = 0
+            sim.run(max_steps=target - position)
+        finally:
+            sim.set_trace(trace)
+            sim._hooks = hooks
+        return sim.steps == target
+
+    def step_back(self):
+        """倒退一条指令；已经在最早可达的时刻时返回 False"""
+        if not self.count and not self._refill():
+            return False
+        self._pop()
+        return True
+
+    def back_to(self, steps):
+        """倒退到已执行 steps 条指令的时刻"""
+        while self.sim.steps > steps:
+            if not self.step_back():
+                return False
+        return True
+
+    def reverse_continue(self, pcs=None):
+        """
+        倒退直到 PC 落在 pcs 中（即回到上一次即将执行这些指令的时刻）；
+        pcs 为 None 时倒退到最早可达的时刻。找到时返回 True。
+        """
+        while self.step_back():
+            if pcs is not None and self.sim.pc in pcs:
+                return True
+        return False
+
+    @property
+    def memory_bytes(self):
+        """撤销缓冲区和检查点占用的字节数（近似）"""
+        return self.capacity * self.records.itemsize + sum(len(s) for _, s in self.checkpoints)
@@ -0,0 +1,166 @@
+# timing.py
+"""
+五级流水线（IF ID EX MEM WB）的时序模型，可选地挂在功能仿真上统计周期数。
+
+    timing = PipelineTiming(forwarding=True, branch_stage="EX")
+    sim.run(timing=timing)
+    print(timing.report())
+
+模型假设（单发射、顺序执行）：
+  - 数据相关：有旁路时 ALU 结果在 EX 之后、LOAD 结果在 MEM 之后可用；
+    没有旁路时只能在 WB 写回寄存器堆后于 ID 读取（同周期先写后读）。
+    标志位（CMP/CMPI 等写，Bcond/Jcond 读）按一个额外的寄存器处理。
+  - LOAD 紧跟着使用其结果的指令时产生 load-use 停顿，其余 RAW 停顿记为 data。
+  - 分支/跳转在 branch_stage（ID/EX/MEM）解析，按“预测不跳转”取指；
+    实际跳转时冲刷其后已取的指令，损失 1/2/3 个周期（记为 control）。
+    在 ID 或 EX 解析时分支所需的标志位/寄存器也必须在该级可用。
+  - 没有分支延迟槽：汇编器 build_machine_code 中为 Bcond 插入 NOP 的代码仍是注释掉的，
+    仿真器的语义也没有延迟槽。
+"""
+
+from src.simulator import (
+    OP_ADD, OP_SUB, OP_CMP, OP_AND, OP_OR, OP_XOR, OP_MOV,
+    OP_ADDI, OP_SUBI, OP_CMPI, OP_ANDI, OP_ORI, OP_XORI,
+    OP_LSH, OP_LSHI, OP_LOAD, OP_STOR,
+    OP_BCOND, OP_JCOND, OP_JAL, REG_WRITE_OPS,
+)
+
+STAGES = ("IF", "ID", "EX", "MEM", "WB")
+# 相对 ID 级的偏移
+_ID, _EX, _MEM = 0, 1, 2
+BRANCH_STAGES = {"ID": _ID, "EX": _EX, "MEM": _MEM}
+
+FLAGS = 16  # 标志位按第 17 个“寄存器”处理
+STALL_CAUSES = ("load-use", "data", "control")
+
+# 读两个寄存器 (a, b) / 只读 a 的指令
+_READ_AB = {OP_ADD, OP_SUB, OP_CMP, OP_AND, OP_OR, OP_XOR, OP_LSH}
+_READ_A = {OP_ADDI, OP_SUBI, OP_CMPI, OP_ANDI, OP_ORI, OP_XORI, OP_LSHI}
+# 写标志位的指令（JAL 只写链接寄存器）
+_WRITE_FLAGS = (REG_WRITE_OPS - {OP_JAL}) | {OP_CMP, OP_CMPI}
+
+
+class PipelineTiming:
+    def __init__(self, forwarding=True, branch_stage="EX"):
+        if branch_stage not in BRANCH_STAGES:
+            raise ValueError(f"Unknown branch resolution stage: {branch_stage}")
+        self.forwarding = forwarding
+        self.branch_stage = branch_stage
+        self.instructions = 0
+        self.stalls = dict.fromkeys(STALL_CAUSES, 0)
+        # 上一条指令进入 ID 的周期；第一条指令在周期 1 取指、周期 2 译码
+        self._last_id = 1
+        self._next_id = 2
+        # 每个寄存器（及标志位）的值最早可被使用的周期，以及产生它的是否为 LOAD
+        self._ready = [0] * 17
+        self._from_load = [False] * 17
+
+    @property
+    def cycles(self):
+        """最后一条指令完成 WB 的周期"""
+        return self._last_id + 3 if self.instructions else 0
+
+    @property
+    def cpi(self):
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+    # --------------------- 静态信息 ---------------------
+
+    def _operands(self, op, a, b):
+        """返回 (读 [(寄存器, 所需级)], 写 [寄存器], 是否分支)"""
+        branch_need = BRANCH_STAGES[self.branch_stage]
+        if op in _READ_AB:
+            reads = [(a, _EX), (b, _EX)]
+        elif op in _READ_A:
+            reads = [(a, _EX)]
+        elif op == OP_MOV:
+            reads = [(b, _EX)]
+        elif op == OP_LOAD:
+            reads = [(b, _EX)]
+        elif op == OP_STOR:
+            # 地址在 EX 计算，数据在 MEM 写入
+            reads = [(b, _EX), (a, _MEM)]
+        elif op == OP_BCOND:
+            reads = [(FLAGS, branch_need)]
+        elif op == OP_JCOND:
+            reads = [(FLAGS, branch_need), (b, branch_need)]
+        elif op == OP_JAL:
+            reads = [(b, branch_need)]
+        else:
+            reads = []
+        if not self.forwarding:
+            # 没有旁路时所有操作数都在 ID 从寄存器堆读取
+            reads = [(reg, _ID) for reg, _ in reads]
+        writes = []
+        if op in REG_WRITE_OPS and not (op == OP_LSHI and b < 0):
+            writes.append(a)
+        if op in _WRITE_FLAGS and not (op == OP_LSHI and b < 0):
+            writes.append(FLAGS)
+        return reads, writes, OP_BCOND <= op <= OP_JAL
+
+    # --------------------- 逐条计时 ---------------------
+
+    def issue(self, reads, writes, is_load, taken):
+        """一条指令进入流水线：计算停顿并更新各寄存器的可用周期"""
+        earliest = self._next_id
+        id_cycle = earliest
+        cause = None
+        ready = self._ready
+        for reg, need in reads:
+            t = ready[reg] - need
+            if t > id_cycle:
+                id_cycle = t
+                cause = "load-use" if self._from_load[reg] else "data"
+        if cause is not None:
+            self.stalls[cause] += id_cycle - earliest
+
+        if self.forwarding:
+            avail = id_cycle + (_MEM if is_load else _EX) + 1
+        else:
+            avail = id_cycle + 3
+        for reg in writes:
+            ready[reg] = avail
+            self._from_load[reg] = is_load
+
+        self.instructions += 1
+        self._last_id = id_cycle
+        self._next_id = id_cycle + 1
+        if taken:
+            penalty = BRANCH_STAGES[self.branch_stage] + 1
+            self.stalls["control"] += penalty
+            self._next_id += penalty
+
+    def instrument(self, sim, code):
+        """由 Simulator.run 调用：每条指令执行前送入时序模型"""
+        issue = self.issue
+        check = sim.check_condition
+        wrapped = []
+        for (handler, a, b), (op, _, _) in zip(code, sim.program):
+            reads, writes, is_branch = self._operands(op, a, b)
+            is_load = op == OP_LOAD
+            if is_branch:
+                def timed(a, b, handler=handler, reads=reads, writes=writes, op=op):
+                    issue(reads, writes, False, op == OP_JAL or check(a))
+                    handler(a, b)
+            else:
+                def timed(a, b, handler=handler, reads=reads, writes=writes, is_load=is_load):
+                    issue(reads, writes, is_load, False)
+                    handler(a, b)
+            wrapped.append((timed, a, b))
+        return wrapped
+
+    def finish(self, sim):
+        pass
+
+    def report(self):
+        fwd = "on" if self.forwarding else "off"
+        total = sum(self.stalls.values())
+        out = ["", f"----- Pipeline timing (5-stage, forwarding {fwd}, "
+                   f"branches resolved in {self.branch_stage}) -----",
+               f"Instructions: {self.instructions}",
+               f"Cycles: {self.cycles}",
+               f"CPI: {self.cpi:.3f}",
+               f"Stall cycles: {total}"]
+        for cause in STALL_CAUSES:
+            out.append(f"  {cause:<9} {self.stalls[cause]}")
+        return "\n".join(out)
@@ -0,0 +1,73 @@
+# trace.py
+"""
+仿真器的跟踪输出：跟踪级别定义与带缓冲的输出端。
+
+跟踪级别（数值越大输出越多）：
+  - silent   : 不输出任何内容
+  - summary  : 只输出警告和结束时的寄存器/标志汇总
+  - branches : summary + 每条分支/跳转指令的结果
+  - full     : 每条指令的 PC、指令文本和执行细节（原有格式）
+"""
+
+import sys
+
+TRACE_SILENT = 0
+TRACE_SUMMARY = 1
+TRACE_BRANCHES = 2
+TRACE_FULL = 3
+
+TRACE_LEVELS = {
+    "silent": TRACE_SILENT,
+    "summary": TRACE_SUMMARY,
+    "branches": TRACE_BRANCHES,
+    "full": TRACE_FULL,
+}
+
+
+def parse_trace_level(value):
+    """接受级别名称（silent/summary/branches/full）或数字 0..3"""
+    if isinstance(value, int):
+        level = value
+    elif value.lower() in TRACE_LEVELS:
+        level = TRACE_LEVELS[value.lower()]
+    else:
+        level = int(value)
+    if not TRACE_SILENT <= level <= TRACE_FULL:
+        raise ValueError(f"Invalid trace level: {value}")
+    return level
+
+
+class TraceWriter:
+    """
+    把跟踪文本先攒在内存里，累计超过 buffer_size 个字符后一次性写出，
+    避免每条指令一次 print 造成的大量小 I/O。
+    stream 为 None 时在写出时才取 sys.stdout（方便被重定向）。
+    """
+
+    def __init__(self, stream=None, buffer_size=1 << 20):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def line(self, text):
+        self.write(text + "\n")
+
+    def flush(self):
+        if self._parts:
+            stream = self.stream if self.stream is not None else sys.stdout
+            stream.write("".join(self._parts))
+            stream.flush()
+            self._parts = []
+            self._size = 0
+
+    def close(self):
+        self.flush()
+        if self.stream is not None and self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
@@ -0,0 +1,210 @@
+# vector_sim.py
+"""
+向量化锁步仿真：同一程序在 N 组初始数据（DMEM 映像，可选寄存器初值）上同时执行。
+
+regs / dmem 分别是 (N,16) / (N,512) 的 int16 数组，每条指令一次作用于所有处在
+同一 PC 的通道（lane）。分支结果不同的通道按 PC 分组：每一步执行 PC 最小的那组，
+较快离开循环的通道会在后面的 PC 等待其余通道汇合。
+
+语义与 Simulator 解释器一致（见 src/simulator.py 中的 _op_* 处理函数），
+但不产生任何跟踪输出。需要 numpy。
+"""
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，只有向量化模式需要
+    np = None
+
+from src.simulator import (
+    OP_ADD, OP_SUB, OP_CMP, OP_AND, OP_OR, OP_XOR, OP_MOV,
+    OP_ADDI, OP_SUBI, OP_CMPI, OP_ANDI, OP_ORI, OP_XORI, OP_MOVI,
+    OP_LSH, OP_LSHI, OP_LUI, OP_LOAD, OP_STOR,
+    OP_BCOND, OP_JCOND, OP_JAL, OP_ERROR,
+)
+
+
+class VectorSimulator:
+    def __init__(self, program, dmem_images, regs=None):
+        """
+        program     : 预解码指令流（Simulator.program）
+        dmem_images : (N, 512) 的初始 DMEM，每行一个数据集
+        regs        : 可选的 (N, 16) 寄存器初值
+        """
+        if np is None:
+            raise ImportError("VectorSimulator requires numpy")
+        self.program = list(program)
+        self.dmem = np.array(dmem_images, dtype=np.int16).reshape(-1, 512)
+        lanes = self.dmem.shape[0]
+        self.lanes = lanes
+        if regs is None:
+            self.regs = np.zeros((lanes, 16), dtype=np.int16)
+        else:
+            self.regs = np.array(regs, dtype=np.int16).reshape(lanes, 16)
+        self.flagF = np.zeros(lanes, dtype=bool)
+        self.flagN = np.zeros(lanes, dtype=bool)
+        self.flagZ = np.zeros(lanes, dtype=bool)
+        self.flagC = np.zeros(lanes, dtype=bool)
+        self.flagL = np.zeros(lanes, dtype=bool)
+        self.pc = np.zeros(lanes, dtype=np.int64)
+        # 每个通道实际执行的指令条数
+        self.steps = np.zeros(lanes, dtype=np.int64)
+        self._all = np.arange(lanes)
+
+    @classmethod
+    def from_simulator(cls, sim, dmem_images, regs=None):
+        """使用已装载程序的 Simulator 的指令流"""
+        return cls(sim.program, dmem_images, regs)
+
+    def run(self, max_issues=None):
+        """
+        执行直到所有通道的 PC 都超出程序范围。
+        max_issues 限制向量指令发射次数（每次发射作用于一组通道），防止死循环。
+        返回发射次数。
+        """
+        n = len(self.program)
+        pc = self.pc
+        issues = 0
+        while max_issues is None or issues < max_issues:
+            active = (pc >= 0) & (pc < n)
+            if not active.any():
+                break
+            pcs = pc[active]
+            cur = int(pcs.min())
+            if active.all() and int(pcs.max()) == cur:
+                lanes = self._all
+            else:
+                lanes = np.nonzero(active & (pc == cur))[0]
+            self.step(cur, lanes)
+            issues += 1
+        return issues
+
+    def cond_mask(self, cond, lanes):
+        """条件码在各通道上的取值（与 COND_TESTS 对应）"""
+        if not 0 <= cond <= 15:
+            return np.zeros(len(lanes), dtype=bool)
+        if cond == 14:
+            return np.ones(len(lanes), dtype=bool)
+        if cond == 15:
+            return np.zeros(len(lanes), dtype=bool)
+        Z = self.flagZ[lanes]
+        if cond <= 1:
+            return Z if cond == 0 else ~Z
+        if cond <= 3:
+            C = self.flagC[lanes]
+            return C if cond == 2 else ~C
+        if cond <= 5:
+            L = self.flagL[lanes]
+            return L if cond == 4 else ~L
+        if cond <= 7:
+            N = self.flagN[lanes]
+            return N if cond == 6 else ~N
+        if cond <= 9:
+            F = self.flagF[lanes]
+            return F if cond == 8 else ~F
+        if cond == 10:
+            return ~self.flagL[lanes] & ~Z
+        if cond == 11:
+            return self.flagL[lanes] | Z
+        if cond == 12:
+            return ~self.flagN[lanes] & ~Z
+        return self.flagN[lanes] | Z
+
+    def _write(self, lanes, rdest, result):
+        """截断为16位写回寄存器，并按结果更新 N/Z"""
+        val = result.astype(np.int16)
+        self.regs[lanes, rdest] = val
+        self.flagN[lanes] = val < 0
+        self.flagZ[lanes] = val == 0
+        return val
+
+    def step(self, cur, lanes):
+        op, a, b = self.program[cur]
+        regs = self.regs
+        next_pc = cur + 1
+
+        if op in (OP_ADD, OP_SUB, OP_CMP, OP_ADDI, OP_SUBI, OP_CMPI):
+            x = regs[lanes, a].astype(np.int32)
+            y = regs[lanes, b].astype(np.int32) if op in (OP_ADD, OP_SUB, OP_CMP) else np.int32(b)
+            if op in (OP_ADD, OP_ADDI):
+                result = x + y
+                self.flagF[lanes] = ((x >= 0) & (y >= 0) & (result < 0)) | ((x < 0) & (y < 0) & (result >= 0))
+            else:
+                result = x - y
+                self.flagF[lanes] = ((x ^ y) >= 0) & ((x ^ result) < 0)
+            if op in (OP_CMP, OP_CMPI):
+                val = result.astype(np.int16)
+                self.flagN[lanes] = val < 0
+                self.flagZ[lanes] = val == 0
+            else:
+                self._write(lanes, a, result)
+        elif op in (OP_AND, OP_OR, OP_XOR):
+            x = regs[lanes, a]
+            y = regs[lanes, b]
+            if op == OP_AND:
+                result = x & y
+            elif op == OP_OR:
+                result = x | y
+            else:
+                result = x ^ y
+            self._write(lanes, a, result)
+        elif op == OP_MOV:
+            self._write(lanes, a, regs[lanes, b])
+        elif op in (OP_ANDI, OP_ORI, OP_XORI):
+            x = regs[lanes, a].astype(np.int32)
+            if op == OP_ANDI:
+                result = x & b
+            elif op == OP_ORI:
+                result = x | b
+            else:
+                result = x ^ b
+            self._write(lanes, a, result)
+        elif op == OP_MOVI:
+            self._write(lanes, a, np.full(len(lanes), b, dtype=np.int32))
+        elif op == OP_LUI:
+            self._write(lanes, a, np.full(len(lanes), b << 8, dtype=np.int32))
+        elif op == OP_LSHI:
+            # 负移位不执行（与解释器一致）
+            if b >= 0:
+                x = regs[lanes, a].astype(np.int32)
+                result = x << b if b < 16 else np.zeros(len(lanes), dtype=np.int32)
+                self._write(lanes, a, result)
+        elif op == OP_LSH:
+            shift = regs[lanes, b].astype(np.int32)
+            shift = np.where(shift < 0, shift & 0xF, shift)
+            x = regs[lanes, a].astype(np.int32)
+            result = np.where(shift < 16, x << np.minimum(shift, 15), 0)
+            self._write(lanes, a, result)
+        elif op == OP_LOAD:
+            addr = regs[lanes, b].astype(np.int32) & 0x1FF
+            self._write(lanes, a, self.dmem[lanes, addr])
+        elif op == OP_STOR:
+            addr = regs[lanes, b].astype(np.int32) & 0x1FF
+            self.dmem[lanes, addr] = regs[lanes, a]
+        elif op == OP_BCOND:
+            taken = self.cond_mask(a, lanes)
+            next_pc = np.where(taken, cur + b + 1, cur + 1)
+        elif op == OP_JCOND:
+            taken = self.cond_mask(a, lanes)
+            next_pc = np.where(taken, regs[lanes, b].astype(np.int64), cur + 1)
+        elif op == OP_JAL:
+            # 先写链接寄存器，再读目标寄存器
+            regs[lanes, a] = np.int16(((cur + 1 + 0x8000) & 0xFFFF) - 0x8000)
+            next_pc = regs[lanes, b].astype(np.int64)
+        elif op == OP_ERROR:
+            raise a
+        # OP_WAIT / 语法错误 / 不支持的指令：不改变体系结构状态
+
+        self.pc[lanes] = next_pc
+        self.steps[lanes] += 1
+
+    def lane_state(self, lane):
+        """返回单个通道的状态，格式与 batch 结果一致"""
+        return {
+            "pc": int(self.pc[lane]),
+            "steps": int(self.steps[lane]),
+            "registers": self.regs[lane].tolist(),
+            "flags": {"F": bool(self.flagF[lane]), "N": bool(self.flagN[lane]),
+                      "Z": bool(self.flagZ[lane]), "C": bool(self.flagC[lane]),
+                      "L": bool(self.flagL[lane])},
+            "dmem": self.dmem[lane].tolist(),
+        }
@@ -3,7 +3,10 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import unittest
-from src.assembler import assemble_file
+import io
+from contextlib import redirect_stdout
+from src.assembler import assemble, assemble_file, format_hex
+from src.simulator import Simulator
 
 class TestAssembler(unittest.TestCase):
     def setUp(self):
@@ -90,5 +93,156 @@ STOR R6, R7
         ]
         self.assertEqual(lines, expected)
 
+class TestAssembleInMemory(unittest.TestCase):
+    SOURCE = "start: MOVI R1, 0x5 ; 注释\n\nloop: SUBI R1, 1\nBCOND NE, loop\n"
+
+    def test_sources(self):
+        expected = [0xD105, 0x9101, 0xC1FE]
+        # 字符串、行列表和文件对象得到相同的结果
+        self.assertEqual(list(assemble(self.SOURCE)), expected)
+        self.assertEqual(list(assemble(self.SOURCE.splitlines(True))), expected)
+        self.assertEqual(list(assemble(io.StringIO(self.SOURCE))), expected)
+        self.assertEqual(format_hex(expected), "D105\n9101\nC1FE\n")
+
+    def test_source_map(self):
+        source_map = {}
+        assemble(self.SOURCE, source_map)
+        self.assertEqual(source_map["symbols"], {"START": 0, "LOOP": 1})
+        self.assertEqual(source_map["lines"], [1, 3, 4])
+
+    def test_single_pass_matches_two_pass(self):
+        source = """
+        BCOND UC, done        ; 向前引用
+again: ADDI R1, 1
+        BCOND NE, again       ; 向后引用
+        BCOND EQ, -2          ; 数值位移
+        LSHI R2, -3
+        JCOND UC, R4
+again: SUBI R1, 1             ; 重新定义：之前的向后引用改用最后一次定义
+        BCOND NE, again
+        EXCP
+done:
+        WAIT
+"""
+        for source_map in ({}, None):
+            two_pass_map = {} if source_map is not None else None
+            self.assertEqual(list(assemble(source, source_map, single_pass=True)),
+                             list(assemble(source, two_pass_map)))
+            self.assertEqual(source_map, two_pass_map)
+
+    def test_redefined_label_reported(self):
+        source = "a: ADD R1, R2\na: SUB R1, R2\nBCOND NE, a\n"
+        for single_pass in (False, True):
+            report = []
+            with redirect_stdout(io.StringIO()) as out:
+                assemble(source, single_pass=single_pass, report=report)
+            self.assertEqual(out.getvalue(), "")
+            self.assertEqual(report, ["line 2: warning: label a redefined"])
+
+    def test_single_pass_errors(self):
+        with self.assertRaisesRegex(ValueError, "Line 2: .*missing"):
+            assemble("ADD R1, R2\nBCOND NE, missing\n", single_pass=True)
+        with self.assertRaisesRegex(ValueError, "Line 1: Unknown instruction"):
+            assemble("FOO R1\n", single_pass=True)
+
+class TestPeephole(unittest.TestCase):
+    SOURCE = """start: MOVI R1, 0x10
+ADDI R1, 0x5
+MOV R2, R2
+ADD R2, R1
+MOV R3, R2
+MOV R2, R3
+LUI R4, 0
+ORI R4, 0x7F
+BCOND UC, next
+next: CMPI R1, 0x15
+BCOND EQ, start
+MOV R5, R5
+"""
+
+    def test_rewrites(self):
+        source_map, report = {}, []
+        words = assemble(self.SOURCE, source_map, optimize=True, report=report)
+        self.assertEqual(list(words), list(assemble(
+            "MOVI R1, 0x15\nADD R2, R1\nMOV R3, R2\nMOVI R4, 0x7F\n"
+            "CMPI R1, 0x15\nBCOND EQ, -6\nMOV R5, R5\n")))
+        # 标签指向原来的指令（或其后第一条保留的指令）的新地址
+        self.assertEqual(source_map["symbols"], {"START": 0, "NEXT": 4})
+        self.assertEqual(source_map["lines"], [1, 4, 5, 7, 10, 11, 12])
+        self.assertEqual(len(report), 5)
+        self.assertIn("line 3: removed MOV R2, R2", report[1])
+
+    def test_flags_must_be_dead(self):
+        # MOV 写的 N/Z 被 BCOND 读取；ADDI 写的 F 被 BCOND FS 读取：都不能改动
+        source = "MOVI R1, 0x1\nADDI R1, 0x1\nMOV R1, R1\nBCOND FS, end\nMOVI R2, 0x1\nend:\n"
+        report = []
+        self.assertEqual(list(assemble(source, optimize=True, report=report)),
+                         list(assemble(source)))
+        self.assertEqual(report, [])
+
+    def test_skipped_for_register_jumps(self):
+        report = []
+        source = self.SOURCE + "JCOND UC, R1\n"
+        self.assertEqual(list(assemble(source, optimize=True, report=report)),
+                         list(assemble(source)))
+        self.assertTrue(report[0].startswith("skipped: line 13 uses JCOND"))
+
+    def test_skipped_for_raw_words(self):
+        report = []
+        source = self.SOURCE + ".word 0x00F0\n"
+        words = assemble(source, optimize=True, report=report)
+        self.assertEqual(list(words), list(assemble(source)))
+        self.assertEqual(words[-1], 0x00F0)
+        self.assertTrue(report[0].startswith("skipped: line 13 has a .word"))
+
+class TestBranchRelaxation(unittest.TestCase):
+    # 循环体 200 条指令：BCOND NE, loop 和 BCOND EQ, done 都超出 -128..127；
+    # 跳转成立时 N/Z 被改写，所以 loop 处重新比较
+    SOURCE = ("MOVI R1, 0x3\nloop: CMPI R1, 0\nBCOND EQ, done\n" + "ADDI R2, 1\n" * 200 +
+              "SUBI R1, 1\nBCOND NE, loop\nBCOND UC, loop\ndone: STOR R2, R0\n")
+
+    def test_relaxed(self):
+        source_map, report = {}, []
+        words = assemble(self.SOURCE, source_map, report=report)
+        # 松弛之后 loop = 1，done = 2 + 4 + 201 + 4 + 3 = 214 (0x00D6)
+        self.assertEqual(source_map["symbols"], {"LOOP": 1, "DONE": 214})
+        self.assertEqual(list(words[2:6]), list(assemble(
+            "BCOND NE, 3\nLUI R15, 0x00\nORI R15, 0xD6\nJCOND UC, R15\n")))
+        self.assertEqual(list(words[207:214]), list(assemble(
+            "BCOND EQ, 3\nLUI R15, 0x00\nORI R15, 0x01\nJCOND UC, R15\n"
+            "LUI R15, 0x00\nORI R15, 0x01\nJCOND UC, R15\n")))
+        # 展开的指令都对应原来的源行
+        self.assertEqual(source_map["lines"][2:6], [3] * 4)
+        self.assertEqual(len(report), 3)
+        self.assertIn("line 205: relaxed BCOND NE, loop", report[1])
+        # 单遍汇编遇到超出范围的分支时改用两遍汇编
+        self.assertEqual(list(assemble(self.SOURCE, single_pass=True)), list(words))
+
+        sim = Simulator(trace="silent")
+        sim.load_words(words)
+        sim.run(max_steps=10000)
+        self.assertEqual((sim.regs[1], sim.regs[2]), (0, 600))
+        self.assertEqual(sim.dmem[0], 600)
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "displacement out of range: 300"):
+            assemble("BCOND UC, 300\n")
+        with self.assertRaisesRegex(ValueError, "Line 1: R15 is reserved"):
+            assemble("MOVI R15, 0x1\n" + self.SOURCE)
+        with self.assertRaisesRegex(ValueError, "Line 1: numeric BCOND displacement 205 spans"):
+            assemble("BCOND NE, 205\n" + self.SOURCE)
+        with self.assertRaisesRegex(ValueError, "Line 1: JCOND target addresses cannot be relocated"):
+            assemble("JCOND UC, R3\n" + self.SOURCE)
+        with self.assertRaisesRegex(ValueError, "Line 1: .word cannot be relocated"):
+            assemble(".word 0x40B1\n" + self.SOURCE)
+
+    def test_flag_warning(self):
+        # 去掉 loop 处的 CMPI：跳回 loop 后 BCOND EQ 读取被 LUI/ORI 改写的 N/Z
+        report = []
+        assemble(self.SOURCE.replace("loop: CMPI R1, 0\nBCOND", "loop: BCOND"), report=report)
+        self.assertEqual([entry for entry in report if "warning" in entry], [
+            "line 204: warning: line 2 reads N/Z after the relaxed jump overwrites them",
+            "line 205: warning: line 2 reads N/Z after the relaxed jump overwrites them"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.assemble_passes import BranchRangeError
+from src.assembler import assemble
+from src.assembler_session import AssemblerSession
+
+SOURCE = """; 累加 R2 次
+start: MOVI R1, 0x0
+MOVI R2, 0x3
+loop:
+ADD R1, R2
+SUBI R2, 1
+CMPI R2, 0
+BCOND NE, loop
+BCOND UC, end
+MOVI R3, 0x1
+end: STOR R1, R3
+"""
+
+
+class TestAssemblerSession(unittest.TestCase):
+    def assertMatchesFull(self, session):
+        source_map = {}
+        self.assertEqual(list(session.words), list(assemble(session.lines, source_map)))
+        self.assertEqual(session.source_map(), source_map)
+
+    def test_initial(self):
+        session = AssemblerSession(SOURCE)
+        self.assertMatchesFull(session)
+        self.assertEqual(session.symbols, {"START": 0, "LOOP": 2, "END": 8})
+
+    def test_same_size_edit(self):
+        session = AssemblerSession(SOURCE)
+        words = session.words
+        session.set_line(5, "ADD R1, R1")
+        # 地址没有变化：只重新编码这一行，机器码数组原地修改
+        self.assertEqual(session.last_encoded, 1)
+        self.assertIs(session.words, words)
+        self.assertMatchesFull(session)
+
+    def test_insert_and_delete(self):
+        session = AssemblerSession(SOURCE)
+        session.insert_lines(5, ["ADDI R4, 1", "ADDI R4, 2"])
+        # 新的两行 + 跨过插入点的 BCOND NE, loop（BCOND UC, end 的距离不变）
+        self.assertEqual(session.last_encoded, 2 + 1)
+        self.assertEqual(session.symbols["END"], 10)
+        self.assertMatchesFull(session)
+        session.delete_lines(2, 2)
+        self.assertMatchesFull(session)
+        session.replace_lines(1, 0, ["top:"])
+        self.assertMatchesFull(session)
+
+    def test_label_changes(self):
+        session = AssemblerSession(SOURCE)
+        # 把标签 loop 移到下一条指令：BCOND NE, loop 的位移随之修补
+        session.replace_lines(4, 3, ["ADD R1, R2", "loop: SUBI R2, 1"])
+        self.assertEqual(session.last_encoded, 2 + 1)
+        self.assertMatchesFull(session)
+        self.assertEqual(session.symbols["LOOP"], 3)
+
+    def test_error_rolls_back(self):
+        session = AssemblerSession(SOURCE)
+        words = list(session.words)
+        with self.assertRaises(ValueError):
+            session.set_line(4, "; loop 被删掉后 BCOND NE, loop 无法汇编")
+        with self.assertRaises(ValueError):
+            session.insert_lines(3, ["FOO R1, R2"])
+        self.assertEqual(session.text(), SOURCE)
+        self.assertEqual(list(session.words), words)
+        with self.assertRaises(IndexError):
+            session.set_line(100, "ADD R1, R2")
+        # 会话不做分支松弛：使 BCOND NE, loop 超出位移范围的插入同样被撤销
+        with self.assertRaisesRegex(BranchRangeError, "Line 208: .*LOOP is out of range"):
+            session.insert_lines(5, ["ADDI R1, 1"] * 200)
+        self.assertEqual(session.text(), SOURCE)
+        self.assertEqual(list(session.words), words)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batch import run_batch, expand_programs
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = []
+        # 三个程序：分别把 1..n 的和写入 DMEM[0]
+        for n in (3, 5, 10):
+            path = os.path.join(self.tmpdir.name, f"sum{n}.asm")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"""
+        MOVI R1, 0
+        MOVI R2, {n}
+LOOP:   ADD  R1, R2
+        SUBI R2, 1
+        CMPI R2, 0
+        BCOND NE, LOOP
+        MOVI R3, 0
+        STOR R1, R3
+""")
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_expand_programs(self):
+        pattern = os.path.join(self.tmpdir.name, "*.asm")
+        self.assertEqual(expand_programs([pattern]), sorted(self.paths))
+
+    def test_run_batch(self):
+        missing = os.path.join(self.tmpdir.name, "missing.asm")
+        results = run_batch(self.paths + [missing], workers=2)
+        self.assertEqual([r["program"] for r in results], self.paths + [missing])
+        self.assertEqual([r["dmem"][0] for r in results[:3]], [6, 15, 55])
+        self.assertEqual(results[2]["registers"][1], 55)
+        self.assertIn("error", results[3])
+        self.assertEqual(results[0]["stop_reason"], "pc out of range")
+
+    def test_limits(self):
+        spin = os.path.join(self.tmpdir.name, "spin.asm")
+        with open(spin, "w", encoding="utf-8") as f:
+            f.write("        MOVI R1, 7\nHERE:   BCOND UC, HERE\n")
+        results = run_batch([spin, self.paths[2]], workers=1,
+                            limits={"max_steps": 20, "detect_idle": True})
+        self.assertEqual((results[0]["stop_reason"], results[0]["pc"]), ("idle loop", 1))
+        self.assertEqual((results[1]["stop_reason"], results[1]["steps"]), ("max steps", 20))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.simulator import Simulator
+from src.block_engine import find_leaders
+
+# 斐波那契 + 子程序调用：覆盖 BCOND 回跳、JAL 调用和 JCOND 返回
+FIB_PROGRAM = [
+    "MOVI R1, 0x0",
+    "MOVI R2, 0x1",
+    "MOVI R3, 0x14",
+    "MOV R4, R1",       # 3: 循环体
+    "ADD R4, R2",
+    "MOV R1, R2",
+    "MOV R2, R4",
+    "STOR R4, R3",
+    "SUBI R3, 0x1",
+    "CMPI R3, 0x0",
+    "BCOND NE, -8",
+    "MOVI R9, 0x10",    # 11: 子程序地址
+    "JAL R8, R9",
+    "BCOND UC, 0x5",    # 13: 跳出程序
+    "WAIT",
+    "WAIT",
+    "LSHI R1, 0x2",     # 16: 子程序
+    "LOAD R5, R3",
+    "JCOND UC, R8",
+]
+
+
+class TestBlockEngine(unittest.TestCase):
+    def run_program(self, engine):
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(FIB_PROGRAM)
+        sim.run(engine=engine)
+        return sim
+
+    def test_leaders(self):
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(FIB_PROGRAM)
+        sim.decode_program()
+        leaders = find_leaders(sim.program)
+        self.assertTrue({0, 3, 11, 13, 14}.issubset(leaders))
+
+    def test_matches_interpreter(self):
+        interp = self.run_program("interp")
+        block = self.run_program("block")
+        self.assertEqual(block.regs, interp.regs)
+        self.assertEqual(block.dmem, interp.dmem)
+        self.assertEqual((block.flagF, block.flagN, block.flagZ),
+                         (interp.flagF, interp.flagN, interp.flagZ))
+        self.assertEqual((block.pc, block.steps), (interp.pc, interp.steps))
+        self.assertEqual(block.regs[1], 6765 * 4)
+
+    def test_full_trace_falls_back_to_interpreter(self):
+        sim = Simulator()
+        sim.program_lines = list(FIB_PROGRAM)
+        with redirect_stdout(io.StringIO()) as out:
+            sim.run(engine="block")
+        self.assertIn("[SIM] PC=3, executing: MOV R4, R1", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cache import Cache, CacheModels, parse_cache_spec
+from src.simulator import Simulator
+
+# 依次读 DMEM[0..7]，再把 R1 写到 DMEM[0x40]、DMEM[0]
+SCAN_PROGRAM = [
+    "MOVI R2, 0x0",
+    "LOAD R1, R2",
+    "ADDI R2, 0x1",
+    "CMPI R2, 0x8",
+    "BCOND NE, -4",
+    "MOVI R3, 0x40",
+    "STOR R1, R3",
+    "MOVI R3, 0x0",
+    "STOR R1, R3",
+]
+
+
+class TestCache(unittest.TestCase):
+    def test_direct_mapped_conflict(self):
+        cache = Cache(size=8, line_size=2, assoc=1, miss_penalty=5)
+        # 0 和 8 映射到同一组，互相替换
+        self.assertEqual([cache.access(0, addr, False) for addr in (0, 1, 8, 0, 9)],
+                         [False, True, False, False, False])
+        self.assertEqual(cache.misses["LOAD"], 4)
+        self.assertEqual(cache.miss_cycles["LOAD"], 20)
+        # 两路组相联可以同时容纳两行
+        cache = Cache(size=8, line_size=2, assoc=2)
+        self.assertEqual([cache.access(0, addr, False) for addr in (0, 8, 0, 8)],
+                         [False, False, True, True])
+
+    def test_replacement_policies(self):
+        lru = Cache(size=4, line_size=1, assoc=2, policy="lru")
+        fifo = Cache(size=4, line_size=1, assoc=2, policy="fifo")
+        # 同一组：0, 2, 0, 4 之后 LRU 保留 0，FIFO 替换掉 0
+        for addr in (0, 2, 0, 4):
+            lru.access(0, addr, False)
+            fifo.access(0, addr, False)
+        self.assertTrue(lru.access(0, 0, False))
+        self.assertFalse(fifo.access(0, 0, False))
+
+    def test_write_policies(self):
+        wb = Cache(size=2, line_size=1, assoc=1, miss_penalty=10)
+        wb.access(0, 0, True)          # 写分配，行变脏
+        wb.access(0, 2, False)         # 替换脏行：写回
+        self.assertEqual(wb.writebacks, 1)
+        self.assertEqual(wb.miss_cycles, {"LOAD": 20, "STOR": 10})
+        wt = Cache(size=2, line_size=1, assoc=1, write_back=False)
+        wt.access(0, 0, True)          # 写不分配
+        self.assertFalse(wt.access(0, 0, False))
+        self.assertEqual((wt.memory_writes, wt.writebacks), (1, 0))
+        self.assertEqual(wt.miss_cycles["STOR"], 0)
+
+    def test_several_configs_in_one_run(self):
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(SCAN_PROGRAM)
+        models = CacheModels([Cache(size=16, line_size=4), Cache(size=16, line_size=1),
+                              parse_cache_spec("size=64,line=8,assoc=2,write=through")])
+        sim.run(caches=models)
+        line4, line1, wt = models.caches
+        self.assertEqual((line4.hits["LOAD"], line4.misses["LOAD"]), (6, 2))
+        # DMEM[0x40] 与 DMEM[0] 映射到同一组：两次 STOR 都缺失，第二次写回脏行
+        self.assertEqual((line4.hits["STOR"], line4.misses["STOR"]), (0, 2))
+        self.assertEqual(line4.writebacks, 1)
+        self.assertEqual((line1.hits["LOAD"], line1.misses["LOAD"]), (0, 8))
+        self.assertEqual(wt.memory_writes, 2)
+        self.assertEqual(line4.worst_pcs(1), [(1, 2)])
+        self.assertIn("LOAD R1, R2", models.report(sim))
+
+    def test_bad_config(self):
+        with self.assertRaises(ValueError):
+            Cache(size=10, line_size=4)
+        with self.assertRaises(ValueError):
+            parse_cache_spec("size=64,ways=2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,14 @@ import unittest
 # 将项目根目录添加到 sys.path，以便能够导入 src 包
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.disassembler import disassemble_file
+import io
+import tempfile
+from src.disassembler import (build_decode_table, decode_table, disassemble_file, disassemble_hex,
+                              disassemble_instruction, disassemble_labeled, disassemble_stream,
+                              disassemble_words, iter_disassemble_stream, load_decode_table,
+                              mapping_hash, recover_control_flow)
+from src.assembler import assemble
+from src.memimage import write_image
 
 class TestDisassembler(unittest.TestCase):
     def setUp(self):
@@ -47,5 +54,126 @@ C2F8
         ]
         self.assertEqual(lines, expected)
 
+class TestDisassembleInMemory(unittest.TestCase):
+    def test_words(self):
+        self.assertEqual(disassemble_words([0x0152, 0x530A, 0x4647]),
+                         ["ADD R1, R2", "ADDI R3, 0xA", "STOR R6, R7"])
+
+    def test_hex_sources(self):
+        text = "0152\n\nzz\n4647\n"
+        expected = ["ADD R1, R2", "; Invalid line: zz", "STOR R6, R7"]
+        self.assertEqual(disassemble_hex(text), expected)
+        self.assertEqual(disassemble_hex(io.StringIO(text)), expected)
+
+class TestDisassembleStream(unittest.TestCase):
+    WORDS = [0x0152, 0x530A, 0x8415, 0xC1FE, 0x4647] * 7
+    EXPECTED = disassemble_words(WORDS)
+
+    def test_chunks(self):
+        text = "".join(f"{w:04X}\r\n" if i % 3 else f"\n{w:04x}\n"
+                       for i, w in enumerate(self.WORDS)) + "zz"
+        # 块很小：行和字都会跨块
+        for chunk_size in (1, 5, 4096):
+            lines = list(iter_disassemble_stream(io.BytesIO(text.encode()), chunk_size=chunk_size))
+            self.assertEqual(lines, self.EXPECTED + ["; Invalid line: zz"])
+            image = io.BytesIO(b"".join(w.to_bytes(2, "little") for w in self.WORDS))
+            self.assertEqual(list(iter_disassemble_stream(image, True, chunk_size)), self.EXPECTED)
+        with self.assertRaisesRegex(ValueError, "odd number of bytes"):
+            list(iter_disassemble_stream(io.BytesIO(b"\x52\x01\x0A"), True))
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            hex_file, bin_file = os.path.join(tmp, "p.hex"), os.path.join(tmp, "p.bin")
+            out = os.path.join(tmp, "p.asm")
+            with open(hex_file, "w") as f:
+                f.write("".join(f"{w:04X}\n" for w in self.WORDS))
+            write_image(bin_file, self.WORDS, "H")
+            for path in (hex_file, bin_file):
+                # 映射文件，每 4 行写一次
+                self.assertEqual(disassemble_stream(path, out, chunk_size=6, batch_lines=4),
+                                 len(self.WORDS))
+                with open(out) as f:
+                    self.assertEqual(f.read().splitlines(), self.EXPECTED)
+
+class TestLabeledDisassembly(unittest.TestCase):
+    SOURCE = """start: MOVI R1, 0x3
+loop: SUBI R1, 1
+CMPI R1, 0
+BCOND NE, loop
+LUI R2, 0x00
+ORI R2, 0x09
+JAL R14, R2          ; 调用 sub（地址由 LUI/ORI 装入）
+BCOND UC, end
+WAIT
+sub: ADDI R3, 1
+JCOND UC, R14
+end:
+"""
+
+    def test_control_flow(self):
+        flow = recover_control_flow(assemble(self.SOURCE))
+        self.assertEqual(flow.labels, {1: "L_0001", 9: "L_0009", 11: "L_000B"})
+        self.assertEqual(flow.jump_targets, {6: 9})
+        self.assertEqual(flow.blocks, [(0, 1, [1]), (1, 4, [1, 4]), (4, 7, [9]), (7, 8, []),
+                                       (8, 9, [9]), (9, 11, [])])
+
+    def test_reassembles(self):
+        words = assemble(self.SOURCE)
+        lines = disassemble_labeled(words)
+        self.assertIn("BCOND NE, L_0001", lines)
+        self.assertIn("JAL R14, R2    ; -> L_0009", lines)
+        self.assertEqual(lines[-1], "L_000B:")
+        self.assertEqual(list(assemble(lines)), list(words))
+
+        # 程序之外的目标保留数值位移；重新汇编得到不同机器码的字写成 .word
+        lines = disassemble_labeled([0xCEF0, 0x00F0])
+        self.assertEqual(lines[0], "BCOND UC, -16")
+        self.assertEqual(lines[-1], ".word 0x00F0    ; ??? (0x00F0)")
+
+    def test_raw_words_reassemble(self):
+        # 无法识别的字（0x00F0）和 EXCP 的未用位不为 0 的字（0x40B1）
+        words = [0xD105, 0x00F0, 0x40B1, 0xC1FD]
+        lines = disassemble_labeled(words)
+        self.assertIn("BCOND NE, L_0001", lines)
+        self.assertEqual(list(assemble(lines)), words)
+        self.assertEqual(list(assemble(lines, single_pass=True)), words)
+
+    def test_backward_jump_target(self):
+        # PC 6 跳回 PC 1：PC 1..2 是汇合点，第二次经过 PC 2 时 R5 = 9，目标未知
+        words = assemble("MOVI R5, 0x3\nADD R1, R1\nJCOND UC, R5\nADD R1, R1\n"
+                         "MOVI R5, 0x9\nMOVI R6, 0x1\nJCOND UC, R6\n"
+                         "ADD R1, R1\nADD R1, R1\nADD R2, R2\n")
+        flow = recover_control_flow(words)
+        self.assertEqual(flow.jump_targets, {6: 1})
+        self.assertEqual(flow.labels, {1: "L_0001"})
+        self.assertEqual(flow.blocks, [(0, 1, [1]), (1, 3, []), (3, 7, [1]), (7, 10, [])])
+        self.assertEqual(list(assemble(disassemble_labeled(words, flow))), list(words))
+
+class TestDecodeTable(unittest.TestCase):
+    def test_entries(self):
+        table = decode_table()
+        self.assertEqual(len(table.texts), 0x10000)
+        self.assertEqual(table.entries[0x0152], ("ADD", (1, 2)))
+        self.assertEqual(table.entries[0xC1FE], ("BCOND", (1, -2)))
+        self.assertEqual(table.entries[0x8415], ("LSHI", (4, -5)))
+        self.assertEqual(table.texts[0xC1FE], "BCOND NE, -2")
+        self.assertEqual(disassemble_instruction(0x00F0), "??? (0x00F0)")
+        self.assertEqual(disassemble_instruction(0x12345), "??? (0x12345)")
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, f"decode-{mapping_hash()}.table")
+            built = load_decode_table(cache_dir)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(load_decode_table(cache_dir), built)
+            with open(path, "rb") as f:
+                data = f.read()
+            # 损坏、截断或不是译码表格式的缓存文件被重新生成
+            for bad in (b"not a table", data[:-100], data[:1000], b"\xff\n" + data[5:],
+                        b"(S'echo'\ntR."):
+                with open(path, "wb") as f:
+                    f.write(bad)
+                self.assertEqual(load_decode_table(cache_dir), built)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import io
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.golden import GoldenChecker, GoldenWriter, parse_record
+from src.simulator import Simulator
+
+SUM_PROGRAM = [
+    "MOVI R1, 0x0",
+    "MOVI R2, 0x3",
+    "ADD R1, R2",
+    "SUBI R2, 0x1",
+    "CMPI R2, 0x0",
+    "BCOND NE, -4",
+    "MOVI R3, 0x3",
+    "STOR R1, R3",
+]
+
+GOLDEN = """# pc target value
+0 R1 0
+1 R2 3
+2 R1 3
+3 R2 2
+2 R1 5
+3 R2 1
+2 R1 6
+3 R2 0
+6 R3 3
+7 M3 0x0006
+"""
+
+
+class TestGolden(unittest.TestCase):
+    def run_with(self, golden):
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(SUM_PROGRAM)
+        sim.run(golden=golden)
+        return sim
+
+    def test_writer_round_trip(self):
+        out = io.StringIO()
+        self.run_with(GoldenWriter(out))
+        records = [parse_record(line) for line in out.getvalue().splitlines()]
+        expected = [parse_record(line) for line in GOLDEN.splitlines()[1:]]
+        self.assertEqual(records, expected)
+
+    def test_match(self):
+        checker = GoldenChecker(io.StringIO(GOLDEN))
+        sim = self.run_with(checker)
+        self.assertIsNone(checker.mismatch)
+        self.assertEqual(checker.checked, 10)
+        self.assertEqual(sim.stop_reason, "pc out of range")
+
+    def test_first_divergence_stops(self):
+        checker = GoldenChecker(io.StringIO(GOLDEN.replace("2 R1 5", "2 R1 7")), context=2)
+        sim = self.run_with(checker)
+        self.assertEqual(sim.stop_reason, "golden mismatch")
+        self.assertEqual(sim.pc, 3)
+        self.assertEqual(checker.mismatch["expected"], (2, "R", 1, 7))
+        self.assertEqual(checker.mismatch["actual"], (2, "R", 1, 5))
+        self.assertEqual(checker.mismatch["context"], [(2, "R", 1, 3), (3, "R", 2, 2)])
+        self.assertIn("expected: 2 R1 0x0007    ; ADD R1, R2", checker.report(sim))
+
+    def test_length_mismatch(self):
+        checker = GoldenChecker(io.StringIO(GOLDEN + "8 R4 1\n"))
+        self.run_with(checker)
+        self.assertEqual(checker.mismatch["reason"], "simulation ended early")
+        checker = GoldenChecker(io.StringIO(GOLDEN.rsplit("7 M3", 1)[0]))
+        self.run_with(checker)
+        self.assertEqual(checker.mismatch["reason"], "golden trace ended")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.simulator import Simulator
+
+# 1+2+...+10 写入 DMEM[3]
+SUM_PROGRAM = [
+    "MOVI R1, 0x0",
+    "MOVI R2, 0xA",
+    "ADD R1, R2",       # 2: 循环体
+    "SUBI R2, 0x1",
+    "CMPI R2, 0x0",
+    "BCOND NE, -4",
+    "MOVI R3, 0x3",
+    "STOR R1, R3",
+    "LOAD R4, R3",
+]
+
+
+class TestHooks(unittest.TestCase):
+    def make_sim(self):
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(SUM_PROGRAM)
+        return sim
+
+    def test_no_hooks_no_wrapping(self):
+        sim = self.make_sim()
+        self.assertFalse(sim.hooks)
+        sim.run(engine="block")
+        self.assertEqual(sim.dmem[3], 55)
+
+    def test_breakpoint_and_resume(self):
+        sim = self.make_sim()
+        sim.hooks.add_breakpoint(2, lambda s, pc: s.regs[2] == 7)
+        sim.run()
+        self.assertEqual((sim.stop_reason, sim.pc, sim.regs[1]), ("breakpoint", 2, 10 + 9 + 8))
+        self.assertEqual(sim.steps, 2 + 4 * 3)
+        sim.run()
+        self.assertEqual((sim.stop_reason, sim.dmem[3], sim.steps), ("pc out of range", 55, 45))
+
+    def test_watchpoints_and_events(self):
+        sim = self.make_sim()
+        accesses, writes, branches = [], [], []
+        sim.hooks.add_watchpoint(3, lambda s, pc, addr, value, w: accesses.append((pc, value, w)))
+        sim.hooks.add_watchpoint(4, lambda s, pc, addr, value, w: accesses.append(addr))
+        sim.hooks.on_register_write(lambda s, pc, reg, old, new: writes.append((old, new)), regs=[2])
+        sim.hooks.on_branch(lambda s, pc, target: branches.append(target))
+        sim.run()
+        self.assertEqual(accesses, [(7, 55, True), (8, 55, False)])
+        self.assertEqual(writes[:2], [(0, 10), (10, 9)])
+        self.assertEqual(len(writes), 11)
+        self.assertEqual(branches, [2] * 9)
+
+    def test_hook_stops_after_instruction(self):
+        sim = self.make_sim()
+        sim.hooks.on_register_write(lambda s, pc, reg, old, new: new == 5, regs=[2])
+        sim.run()
+        self.assertEqual((sim.stop_reason, sim.pc, sim.regs[2]), ("hook", 4, 5))
+        sim.run()
+        self.assertEqual((sim.stop_reason, sim.dmem[3]), ("pc out of range", 55))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.linker import build, link, object_path
+from src.objfile import ObjectModule, assemble_object, read_object, write_object
+from src.simulator import Simulator
+
+MAIN = """; 主模块：调用 lib 中的 double，然后跳到 finish
+.global main
+main: MOVI R1, 0x5
+LUI R2, double
+ORI R2, double
+JAL R14, R2
+STOR R1, R0
+BCOND UC, finish
+MOVI R1, 0x7F      ; 不会执行
+"""
+
+LIB = """.global double, finish
+double: ADD R1, R1
+JCOND UC, R14
+finish:
+MOVI R3, 0x1
+"""
+
+
+class TestObjectFile(unittest.TestCase):
+    def test_assemble_object(self):
+        module = assemble_object(MAIN, "main")
+        self.assertEqual(module.exports, {"MAIN": 0})
+        self.assertEqual(module.imports, ["DOUBLE", "FINISH"])
+        self.assertEqual(module.relocations, [(1, "HI8", "DOUBLE", 0), (2, "LO8", "DOUBLE", 0),
+                                              (5, "BCOND", "FINISH", 0)])
+        self.assertEqual(module.lines, [3, 4, 5, 6, 7, 8, 9])
+        # 模块内的标签作为地址常量时相对模块基址重定位
+        local = assemble_object("here: MOVI R1, here\n", "local")
+        self.assertEqual(local.relocations, [(0, "LO8", None, 0)])
+
+    def test_round_trip_and_errors(self):
+        module = assemble_object(LIB, "lib")
+        copy = ObjectModule.from_dict(module.to_dict())
+        self.assertEqual(copy.to_dict(), module.to_dict())
+        with self.assertRaises(ValueError):
+            assemble_object(".global nowhere\nADD R1, R2\n")
+        with self.assertRaisesRegex(ValueError, "Line 2"):
+            assemble_object("ADD R1, R2\nFOO R1\n")
+
+
+class TestLinker(unittest.TestCase):
+    def test_link_and_run(self):
+        words, symbols = link([assemble_object(MAIN, "main"), assemble_object(LIB, "lib")])
+        self.assertEqual(symbols, {"MAIN": 0, "DOUBLE": 7, "FINISH": 9})
+        sim = Simulator(trace="silent")
+        sim.load_words(words)
+        sim.run()
+        self.assertEqual((sim.regs[1], sim.regs[3], sim.dmem[0]), (10, 1, 10))
+
+    def test_link_errors(self):
+        main = assemble_object(MAIN, "main")
+        with self.assertRaisesRegex(ValueError, "Undefined symbols: DOUBLE"):
+            link([main])
+        with self.assertRaisesRegex(ValueError, "exported by both"):
+            link([main, assemble_object(LIB, "lib"), assemble_object(LIB, "lib2")])
+        far = assemble_object("BCOND UC, finish\n", "far")
+        padding = ObjectModule("pad", [0] * 200)
+        with self.assertRaisesRegex(ValueError, "out of range"):
+            link([far, padding, assemble_object(LIB, "lib")])
+
+    def test_build_skips_up_to_date_objects(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        sources = []
+        for name, text in (("main.asm", MAIN), ("lib.asm", LIB)):
+            sources.append(os.path.join(tmp, name))
+            with open(sources[-1], "w", encoding="utf-8") as f:
+                f.write(text)
+        obj_dir = os.path.join(tmp, "obj")
+        output = os.path.join(tmp, "prog.hex")
+        words, _, assembled = build(sources, output, workers=2, obj_dir=obj_dir)
+        self.assertEqual(assembled, sources)
+        self.assertEqual(len(words), 10)
+        self.assertEqual(read_object(object_path(sources[1], obj_dir)).exports,
+                         {"DOUBLE": 0, "FINISH": 2})
+        # 源文件没有变化时不再汇编；修改过的模块重新汇编
+        self.assertEqual(build(sources, output, obj_dir=obj_dir)[2], [])
+        later = time.time() + 10
+        os.utime(sources[1], (later, later))
+        self.assertEqual(build(sources, output, obj_dir=obj_dir)[2], [sources[1]])
+        # 也可以直接链接 .o
+        lib_o = os.path.join(obj_dir, "lib.o")
+        write_object(lib_o, assemble_object(LIB, "lib"))
+        self.assertEqual(list(build([sources[0], lib_o], output, obj_dir=obj_dir)[0]), list(words))
+
+    def test_build_same_name_in_two_directories(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        sources = []
+        for name, text in (("app/util.asm", MAIN), ("lib/util.asm", LIB)):
+            sources.append(os.path.join(tmp, name))
+            os.makedirs(os.path.dirname(sources[-1]), exist_ok=True)
+            with open(sources[-1], "w", encoding="utf-8") as f:
+                f.write(text)
+        obj_dir = os.path.join(tmp, "obj")
+        output = os.path.join(tmp, "prog.hex")
+        self.assertNotEqual(object_path(sources[0], obj_dir), object_path(sources[1], obj_dir))
+        words, symbols, _ = build(sources, output, workers=2, obj_dir=obj_dir)
+        self.assertEqual((len(words), symbols["FINISH"]), (10, 9))
+        self.assertEqual(build(sources, output, obj_dir=obj_dir)[2], [])
+        # 同一个源文件给出两次会写同一个 .o，直接报错
+        with self.assertRaisesRegex(ValueError, "both use object file"):
+            build([sources[0], sources[0]], output, obj_dir=obj_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
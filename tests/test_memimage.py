@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.assembler import assemble_file
+from src.memimage import read_image, write_image
+from src.simulator import Simulator
+
+# DMEM[0] + DMEM[1] -> DMEM[2]
+ADD_SOURCE = """
+        MOVI R1, 0
+        LOAD R2, R1
+        MOVI R1, 1
+        LOAD R3, R1
+        ADD  R2, R3
+        MOVI R1, 2
+        STOR R2, R1
+"""
+
+
+class TestMemImage(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dmem_path = self.path("data.bin")
+        write_image(self.dmem_path, [1000, -7] + [0] * 510)
+        asm_path = self.path("add.asm")
+        with open(asm_path, "w", encoding="utf-8") as f:
+            f.write(ADD_SOURCE)
+        self.imem_path = self.path("add.bin")
+        assemble_file(asm_path, self.imem_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_image_format(self):
+        with open(self.dmem_path, "rb") as f:
+            self.assertEqual(f.read(4), bytes([0xE8, 0x03, 0xF9, 0xFF]))
+        image = read_image(self.dmem_path, "h", words=512)
+        self.assertEqual(list(image[:3]), [1000, -7, 0])
+        short = self.path("short.bin")
+        write_image(short, [5])
+        self.assertEqual(list(read_image(short, "h", words=4)), [5, 0, 0, 0])
+        with self.assertRaises(ValueError):
+            read_image(short, "h", words=4, share=True)
+
+    def test_run_with_images(self):
+        for share in (False, True):
+            sim = Simulator(trace="silent")
+            sim.load_imem_image(self.imem_path)
+            sim.load_dmem_image(self.dmem_path, share=share)
+            sim.run()
+            self.assertEqual(sim.dmem[2], 993)
+            out = self.path(f"out{share}.bin")
+            sim.write_dmem_image(out)
+            self.assertEqual(list(read_image(out, "h")[:3]), [1000, -7, 993])
+        # 写时复制映射不会改动原映像文件
+        self.assertEqual(list(read_image(self.dmem_path, "h")[:3]), [1000, -7, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
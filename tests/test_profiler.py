@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.assembler import assemble_lines
+from src.profiler import Profiler
+from src.simulator import Simulator
+
+LOOP_SOURCE = """; 求和 1..10
+        MOVI R1, 0x0
+        MOVI R2, 0xA
+
+LOOP:   ADD R1, R2
+        SUBI R2, 0x1
+        CMPI R2, 0x0
+        BCOND NE, LOOP
+DONE:   MOVI R3, 0x3
+        STOR R1, R3
+""".splitlines(True)
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.source_map = {}
+        machine_codes = assemble_lines(LOOP_SOURCE, self.source_map)
+        self.sim = Simulator(trace="silent")
+        self.sim.load_words(code for sublist in machine_codes for code in sublist)
+        self.profiler = Profiler(self.source_map)
+        self.sim.run(profiler=self.profiler)
+
+    def test_source_map(self):
+        self.assertEqual(self.source_map["symbols"], {"LOOP": 2, "DONE": 6})
+        self.assertEqual(self.source_map["lines"], [2, 3, 5, 6, 7, 8, 9, 10])
+
+    def test_counts(self):
+        prof = self.profiler
+        self.assertEqual(list(prof.counts), [1, 1, 10, 10, 10, 10, 1, 1])
+        self.assertEqual(prof.total, self.sim.steps)
+        self.assertEqual((prof.taken[5], prof.not_taken(5)), (9, 1))
+        self.assertEqual(prof.loops(self.sim.program), [(2, 5, 40)])
+        self.assertEqual(prof.label(4), "LOOP+2")
+
+    def test_report(self):
+        report = self.profiler.report(self.sim)
+        self.assertIn("loop at label LOOP, source line 5, PC 2-5, 90.9% of cycles", report)
+        self.assertIn("taken        9  not taken        1", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.disassembler import disassemble_instruction
+from src.simulator import Simulator, decode_line, decode_word, OP_ADDI, OP_BCOND, OP_UNSUPPORTED
+from src.trace import TRACE_SILENT, TRACE_BRANCHES, TraceWriter
+
+# 反汇编器输出格式的小程序：计算 1+2+...+10，结果写入 DMEM[3]
+SUM_PROGRAM = [
+    "MOVI R1, 0x0",
+    "MOVI R2, 0xA",
+    "ADD R1, R2",
+    "SUBI R2, 0x1",
+    "CMPI R2, 0x0",
+    "BCOND NE, -4",
+    "MOVI R3, 0x3",
+    "STOR R1, R3",
+]
+
+
+class TestSimulator(unittest.TestCase):
+    def run_program(self, lines, **kwargs):
+        sim = Simulator(**kwargs)
+        sim.program_lines = list(lines)
+        with redirect_stdout(io.StringIO()):
+            sim.run()
+        return sim
+
+    def test_decode_line(self):
+        self.assertEqual(decode_line("ADDI R3, 0xA ; comment"), (OP_ADDI, 3, 10))
+        self.assertEqual(decode_line("BCOND NE, -4"), (OP_BCOND, 1, -4))
+        self.assertEqual(decode_line("MUL R1, R2"), (OP_UNSUPPORTED, "MUL", 0))
+        self.assertIsNone(decode_line("   ; only comment"))
+
+    def test_run_sum_loop(self):
+        sim = self.run_program(SUM_PROGRAM, trace=TRACE_SILENT)
+        self.assertEqual(sim.regs[1], 55)
+        self.assertEqual(sim.dmem[3], 55)
+        self.assertEqual(sim.pc, len(SUM_PROGRAM))
+
+    def test_predecoded_matches_execute_line(self):
+        # 逐行 execute_line 与预解码执行得到相同的体系结构状态
+        fast = self.run_program(SUM_PROGRAM)
+        slow = Simulator()
+        with redirect_stdout(io.StringIO()):
+            while 0 <= slow.pc < len(SUM_PROGRAM):
+                slow.execute_line(SUM_PROGRAM[slow.pc])
+                slow.pc += 1
+        self.assertEqual(fast.regs, slow.regs)
+        self.assertEqual(fast.dmem, slow.dmem)
+        self.assertEqual((fast.flagF, fast.flagN, fast.flagZ),
+                         (slow.flagF, slow.flagN, slow.flagZ))
+
+    def test_decode_word_matches_disassembly(self):
+        # 按位解码与 “反汇编后再解析” 对所有 16 位机器码一致
+        for word in range(0x10000):
+            self.assertEqual(decode_word(word), decode_line(disassemble_instruction(word)))
+
+    def test_run_machine_code(self):
+        words = [0xD100, 0xD20A, 0x0152, 0x9201, 0xB200, 0xC1FC, 0xD303, 0x4143]
+        sim = Simulator(trace=TRACE_SILENT)
+        sim.load_words(words)
+        with redirect_stdout(io.StringIO()):
+            sim.run()
+        text = self.run_program(SUM_PROGRAM, trace=TRACE_SILENT)
+        self.assertEqual(sim.regs, text.regs)
+        self.assertEqual(sim.dmem[3], 55)
+
+    def test_trace_levels(self):
+        out = io.StringIO()
+        sim = Simulator(trace=TRACE_BRANCHES, trace_sink=TraceWriter(out))
+        sim.program_lines = list(SUM_PROGRAM)
+        sim.run()
+        text = out.getvalue()
+        self.assertIn("[SIM] PC=5: BCOND => cond NE true", text)
+        self.assertNotIn("[DEBUG]", text)
+        self.assertIn("Instructions executed: 44", text)
+
+        out = io.StringIO()
+        sim = Simulator(trace="silent", trace_sink=TraceWriter(out))
+        sim.program_lines = list(SUM_PROGRAM)
+        sim.run()
+        self.assertEqual(out.getvalue(), "")
+
+    def test_trace_writer_buffers(self):
+        out = io.StringIO()
+        writer = TraceWriter(out, buffer_size=16)
+        writer.line("short")
+        self.assertEqual(out.getvalue(), "")
+        writer.line("long enough to flush")
+        self.assertEqual(out.getvalue(), "short\nlong enough to flush\n")
+
+    def test_bad_operand_raises_when_executed(self):
+        sim = Simulator()
+        sim.program_lines = ["ADD R1, R99"]
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(ValueError):
+                sim.run()
+
+    def test_termination_controls(self):
+        sim = self.run_program(SUM_PROGRAM, trace=TRACE_SILENT)
+        self.assertEqual(sim.stop_reason, "pc out of range")
+
+        for engine in ("interp", "block"):
+            sim = Simulator(trace=TRACE_SILENT)
+            sim.program_lines = list(SUM_PROGRAM)
+            sim.run(engine=engine, max_steps=17)
+            self.assertEqual((sim.steps, sim.stop_reason), (17, "max steps"))
+
+            # 预算恰好在最后一条指令用完：按 PC 越界正常结束，不能卡住
+            sim = Simulator(trace=TRACE_SILENT)
+            sim.program_lines = ["MOVI R1, 0x1", "MOVI R2, 0x2"]
+            sim.run(engine=engine, max_steps=2)
+            self.assertEqual((sim.steps, sim.stop_reason), (2, "pc out of range"))
+
+        # 状态不再变化的自循环：第二次回到循环头时停止
+        spin = ["MOVI R1, 0x5", "MOVI R2, 0x0", "CMPI R2, 0x0", "BCOND EQ, -2"]
+        sim = Simulator(trace=TRACE_SILENT)
+        sim.program_lines = spin
+        sim.run(detect_idle=True)
+        self.assertEqual((sim.pc, sim.steps, sim.stop_reason), (2, 6, "idle loop"))
+
+        sim = Simulator(trace=TRACE_SILENT)
+        sim.program_lines = spin
+        sim.run(timeout=0.05)
+        self.assertEqual(sim.stop_reason, "timeout")
+
+    def test_snapshot_restore(self):
+        sim = Simulator(trace=TRACE_SILENT)
+        sim.program_lines = list(SUM_PROGRAM)
+        sim.flagC = True
+        sim.run(snapshot_every=10)
+        self.assertEqual(len(sim.snapshots), 4)
+
+        # 从第 20 条指令处的快照分叉，继续执行得到相同的最终状态
+        fork = Simulator(trace=TRACE_SILENT)
+        fork.program_lines = list(SUM_PROGRAM)
+        fork.restore(sim.snapshots[1])
+        self.assertEqual(fork.steps, 20)
+        self.assertTrue(fork.flagC)
+        fork.run()
+        self.assertEqual(fork.snapshot(), sim.snapshot())
+        self.assertEqual((fork.regs, fork.dmem, fork.pc), (sim.regs, sim.dmem, sim.pc))
+
+        with self.assertRaises(ValueError):
+            fork.restore(sim.snapshot()[:-2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.simulator import Simulator
+from src.timetravel import TimeTravel
+
+# 斐波那契数列写入 DMEM[20..1]
+FIB_PROGRAM = [
+    "MOVI R1, 0x0",
+    "MOVI R2, 0x1",
+    "MOVI R3, 0x14",
+    "MOV R4, R1",       # 3: 循环体
+    "ADD R4, R2",
+    "MOV R1, R2",
+    "MOV R2, R4",
+    "STOR R4, R3",
+    "SUBI R3, 0x1",
+    "CMPI R3, 0x0",
+    "BCOND NE, -8",
+]
+
+
+def state(sim):
+    return (list(sim.regs), list(sim.dmem), sim.pc, sim.steps,
+            (sim.flagF, sim.flagN, sim.flagZ, sim.flagC, sim.flagL))
+
+
+class TestTimeTravel(unittest.TestCase):
+    def make_sim(self):
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(FIB_PROGRAM)
+        return sim
+
+    def reference(self, steps):
+        sim = self.make_sim()
+        sim.run(max_steps=steps)
+        return state(sim)
+
+    def test_step_back_within_buffer(self):
+        sim = self.make_sim()
+        tt = TimeTravel(sim)
+        sim.run()
+        final = state(sim)
+        self.assertTrue(tt.step_back())
+        self.assertEqual(state(sim), self.reference(sim.steps))
+        self.assertTrue(tt.reverse_continue({7}))
+        self.assertEqual((sim.pc, sim.regs[3]), (7, 1))
+        self.assertEqual(state(sim), self.reference(sim.steps))
+        sim.run()
+        self.assertEqual(state(sim), final)
+
+    def test_back_to_through_checkpoints(self):
+        # 缓冲区只有 16 条记录，更早的时刻需要从检查点重新执行
+        sim = self.make_sim()
+        tt = TimeTravel(sim, max_records=16, checkpoint_every=10, max_checkpoints=4)
+        sim.run()
+        self.assertLessEqual(len(tt.checkpoints), 4)
+        for steps in (150, 57, 3, 0):
+            self.assertTrue(tt.back_to(steps))
+            self.assertEqual(state(sim), self.reference(steps))
+        self.assertFalse(tt.step_back())
+
+
+if __name__ == '__main__':
+    unittest.main()
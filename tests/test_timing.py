@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.simulator import Simulator
+from src.timing import PipelineTiming
+
+LOAD_USE = [
+    "MOVI R2, 0x0",
+    "LOAD R1, R2",
+    "ADD R3, R1",
+]
+
+SUM_PROGRAM = [
+    "MOVI R1, 0x0",
+    "MOVI R2, 0x3",
+    "ADD R1, R2",
+    "SUBI R2, 0x1",
+    "CMPI R2, 0x0",
+    "BCOND NE, -4",
+    "MOVI R3, 0x3",
+    "STOR R1, R3",
+]
+
+
+class TestTiming(unittest.TestCase):
+    def run_with(self, lines, **kwargs):
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(lines)
+        timing = PipelineTiming(**kwargs)
+        sim.run(timing=timing)
+        return sim, timing
+
+    def test_no_hazards(self):
+        _, timing = self.run_with(["MOVI R1, 0x1", "MOVI R2, 0x2", "ADD R1, R2"])
+        # 3 条指令填满 5 级流水线：3 + 4 个周期
+        self.assertEqual(timing.cycles, 7)
+        self.assertEqual(sum(timing.stalls.values()), 0)
+
+    def test_load_use(self):
+        _, timing = self.run_with(LOAD_USE)
+        self.assertEqual(timing.stalls, {"load-use": 1, "data": 0, "control": 0})
+        self.assertEqual(timing.cycles, 8)
+
+    def test_without_forwarding(self):
+        _, timing = self.run_with(LOAD_USE, forwarding=False)
+        self.assertEqual(timing.stalls, {"load-use": 2, "data": 2, "control": 0})
+        self.assertEqual(timing.cycles, 11)
+
+    def test_branch_penalty(self):
+        sim, timing = self.run_with(SUM_PROGRAM)
+        self.assertEqual(sim.dmem[3], 6)
+        self.assertEqual(timing.instructions, sim.steps)
+        # BCOND 跳转两次，在 EX 解析每次损失 2 个周期
+        self.assertEqual(timing.stalls["control"], 4)
+        self.assertEqual(timing.stalls["data"], 0)
+        self.assertEqual(timing.cycles, sim.steps + 4 + 4)
+        # 在 ID 解析：跳转损失变小，但 CMPI 的结果要等一个周期
+        _, early = self.run_with(SUM_PROGRAM, branch_stage="ID")
+        self.assertEqual(early.stalls["control"], 2)
+        self.assertEqual(early.stalls["data"], 3)
+        self.assertIn("CPI:", timing.report())
+
+    def test_bad_stage(self):
+        with self.assertRaises(ValueError):
+            PipelineTiming(branch_stage="WB")
+
+
+if __name__ == '__main__':
+    unittest.main()
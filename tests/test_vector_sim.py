@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import os
+import random
+import sys
+import unittest
+
+# 将项目根目录添加到 sys.path，以便能够导入 src 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.simulator import Simulator
+from src.vector_sim import VectorSimulator, np
+
+# 对 DMEM[1..DMEM[0]] 求和并存到 DMEM[100]：循环次数由数据决定，各通道的分支结果不同
+SUM_DATA_PROGRAM = [
+    "MOVI R1, 0x0",
+    "LOAD R3, R1",
+    "MOVI R2, 0x0",
+    "MOVI R4, 0x1",
+    "CMPI R3, 0x0",     # 4: 循环判断
+    "BCOND EQ, 0x6",
+    "LOAD R5, R4",
+    "ADD R2, R5",
+    "ADDI R4, 0x1",
+    "SUBI R3, 0x1",
+    "BCOND UC, -7",
+    "WAIT",
+    "MOVI R6, 0x64",    # 12: 循环出口
+    "STOR R2, R6",
+    "MOV R7, R2",
+    "LSH R7, R5",
+    "XORI R7, 0x5A",
+]
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestVectorSimulator(unittest.TestCase):
+    def make_images(self, count):
+        rng = random.Random(427)
+        images = []
+        for _ in range(count):
+            image = [rng.randint(-32768, 32767) for _ in range(512)]
+            image[0] = rng.randint(0, 20)
+            images.append(image)
+        return images
+
+    def test_matches_scalar_runs(self):
+        images = self.make_images(32)
+        sim = Simulator(trace="silent")
+        sim.program_lines = list(SUM_DATA_PROGRAM)
+        sim.decode_program()
+        vec = VectorSimulator.from_simulator(sim, images)
+        vec.run()
+
+        for lane, image in enumerate(images):
+            ref = Simulator(trace="silent")
+            ref.program_lines = list(SUM_DATA_PROGRAM)
+            ref.dmem = list(image)
+            ref.run()
+            state = vec.lane_state(lane)
+            self.assertEqual(state["registers"], ref.regs)
+            self.assertEqual(state["dmem"], ref.dmem)
+            self.assertEqual((state["pc"], state["steps"]), (ref.pc, ref.steps))
+            self.assertEqual(state["flags"],
+                             {"F": ref.flagF, "N": ref.flagN, "Z": ref.flagZ,
+                              "C": ref.flagC, "L": ref.flagL})
+
+    def test_max_issues(self):
+        sim = Simulator(trace="silent")
+        sim.program_lines = ["BCOND UC, -1"]
+        sim.decode_program()
+        vec = VectorSimulator.from_simulator(sim, [[0] * 512] * 4)
+        self.assertEqual(vec.run(max_issues=10), 10)
+        self.assertEqual(vec.steps.tolist(), [10] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()